@@ -1,27 +1,82 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-# Секретный ключ для JWT (в продакшене использовать переменную окружения)
-SECRET_KEY = "your-secret-key-change-in-production"
+from cache import token_cache, token_denylist
+
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 дней
+# Ключ, которым подписываются токены без JWT_KEYS (kid "default")
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+DEFAULT_KID = "default"
+
+
+def parse_keyring(value: str) -> Dict[str, str]:
+    """"kid1:secret1,kid2:secret2" -> {"kid1": "secret1", "kid2": "secret2"}"""
+    keys = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        kid, sep, secret = item.strip().partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError(f"JWT_KEYS: ожидается kid:secret, получено {item!r}")
+        keys[kid] = secret
+    return keys
+
+
+# Связка ключей для ротации: токен подписывается активным ключом (JWT_ACTIVE_KID,
+# по умолчанию последний в JWT_KEYS), а проверяется ключом из заголовка kid.
+# Старый ключ убирают из JWT_KEYS, когда истекут выданные им refresh-токены
+JWT_KEYS = parse_keyring(os.getenv("JWT_KEYS", "")) or {DEFAULT_KID: SECRET_KEY}
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID") or list(JWT_KEYS)[-1]
+if JWT_ACTIVE_KID not in JWT_KEYS:
+    raise ValueError(f"JWT_ACTIVE_KID={JWT_ACTIVE_KID!r} нет в JWT_KEYS")
+
+# Короткий access-токен проверяется без обращения к БД; refresh-токен
+# обменивается на новую пару в /api/auth/refresh
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+TOKEN_LIFETIMES = {
+    ACCESS_TOKEN: timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES).total_seconds(),
+    REFRESH_TOKEN: timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS).total_seconds(),
+}
+
+# Число раундов pbkdf2. При изменении старые хэши прозрачно пересчитываются при входе
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# Размер пула потоков для хэширования и максимальное число ожидающих задач
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
 
 # Исправляем проблему с совместимостью passlib и bcrypt
 # Используем pbkdf2_sha256 как более стабильную альтернативу
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min/max rounds совпадают с default, чтобы needs_update срабатывал при любом изменении раундов
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=PASSWORD_HASH_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
 
-class TokenData(BaseModel):
-    email: Optional[str] = None
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class User(BaseModel):
     id: str
@@ -56,23 +111,125 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+# pbkdf2 из hashlib отпускает GIL, поэтому пула потоков достаточно,
+# чтобы хэширование шло параллельно и не блокировало event loop
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending_hash_jobs = 0
+
+async def _run_in_hash_pool(func, *args):
+    """Выполняет хэширование в пуле; при переполненной очереди отвечает 503"""
+    global _pending_hash_jobs
+    if _pending_hash_jobs >= PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing queue is full, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _pending_hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _pending_hash_jobs -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Проверяет пароль и, если параметры хэша устарели, возвращает новый хэш"""
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def password_hash_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+        "pending": _pending_hash_jobs,
+        "rounds": PASSWORD_HASH_ROUNDS,
+    }
+
+def create_token(data: dict, token_type: str = ACCESS_TOKEN) -> str:
+    """Подписывает токен активным ключом; jti нужен для отзыва, iat - для отзыва всех токенов пользователя"""
+    now = time.time()
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def decode_token(token: str) -> Optional[TokenData]:
+    to_encode.update({
+        "typ": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": int(now + TOKEN_LIFETIMES[token_type]),
+    })
+    return jwt.encode(to_encode, JWT_KEYS[JWT_ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": JWT_ACTIVE_KID})
+
+def user_claims(user: User) -> dict:
+    """Данные пользователя в access-токене: по ним запрос аутентифицируется без БД"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.full_name,
+        "pos": user.position,
+        "adm": user.is_super_admin,
+    }
+
+def user_from_claims(claims: dict) -> User:
+    return User(
+        id=claims["uid"],
+        email=claims["sub"],
+        full_name=claims["name"],
+        position=claims["pos"],
+        is_super_admin=claims["adm"],
+    )
+
+def issue_tokens(user: User) -> dict:
+    """Пара access/refresh для ответа /api/auth/login и /api/auth/refresh"""
+    return {
+        "access_token": create_token(user_claims(user), ACCESS_TOKEN),
+        "token_type": "bearer",
+        "refresh_token": create_token({"sub": user.email, "uid": user.id}, REFRESH_TOKEN),
+        "expires_in": int(TOKEN_LIFETIMES[ACCESS_TOKEN]),
+    }
+
+def _verify_signature(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        kid = jwt.get_unverified_header(token).get("kid", DEFAULT_KID)
+        key = JWT_KEYS.get(kid)
+        if key is None:
             return None
-        return TokenData(email=email)
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
+async def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> Optional[dict]:
+    """Claims действующего токена нужного типа; None, если токен недействителен, истек или отозван.
+
+    Подпись проверяется при первом предъявлении токена, дальше claims берутся из кэша.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = _verify_signature(token)
+        if claims is None:
+            return None
+        token_cache.set(token, claims)
+    elif claims["exp"] <= time.time():
+        return None
+    if claims.get("typ") != token_type or "uid" not in claims:
+        return None
+    if await token_denylist.is_revoked(claims.get("jti"), claims["uid"], token_type, claims.get("iat", 0)):
+        return None
+    return claims
+
+async def revoke_token(claims: dict) -> None:
+    await token_denylist.revoke_token(claims["jti"], claims["exp"])
+
+async def revoke_user_tokens(user_id: str, refresh: bool = True) -> None:
+    """Отзывает access-токены пользователя (и refresh-токены, если refresh=True), выданные до этого момента"""
+    await token_denylist.revoke_user(user_id, ACCESS_TOKEN, TOKEN_LIFETIMES[ACCESS_TOKEN])
+    if refresh:
+        await token_denylist.revoke_user(user_id, REFRESH_TOKEN, TOKEN_LIFETIMES[REFRESH_TOKEN])
+
+def token_stats() -> dict:
+    return {
+        "active_kid": JWT_ACTIVE_KID,
+        "kids": list(JWT_KEYS),
+        "cache": token_cache.stats(),
+    }
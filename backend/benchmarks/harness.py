@@ -0,0 +1,439 @@
+"""Бенчмарк API: генератор данных, сценарии нагрузки, JSON-отчет и сравнение с базовым замером
+
+    python benchmarks/harness.py run --users 20 --tasks 5000 --output bench.json
+    python benchmarks/harness.py run --users 20 --tasks 5000 --baseline bench.json
+    python benchmarks/harness.py compare bench.json new.json --tolerance 0.2
+
+Без --url приложение запускается в процессе (httpx.ASGITransport, без сети),
+а данные генерируются во временную SQLite базу или в базу --database-url
+(например, postgresql://localhost/gantt_bench). Против уже запущенного сервера:
+
+    DATABASE_URL=postgresql://localhost/gantt_bench python benchmarks/harness.py seed --users 20 --tasks 5000
+    python benchmarks/harness.py run --url http://localhost:8001 --no-seed
+
+Сценарии (--workloads):
+    login  - шквал входов (проверка пароля - самая дорогая операция)
+    list   - чтение списков: весь список, страница, проекция, календарь, раскладка, статистика
+    crud   - создание, чтение, частичное обновление и удаление задач вперемешку
+    export - потоковый экспорт в CSV
+
+Отчет - JSON с пропускной способностью и перцентилями задержки по сценариям.
+С --baseline отчет сравнивается с прошлым замером: рост p95 или падение
+пропускной способности больше допуска считается регрессией (код выхода 1).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_PASSWORD = "bench123"
+WORKLOADS = ("login", "list", "crud", "export")
+
+
+def bench_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+# ========== ГЕНЕРАТОР ДАННЫХ ==========
+
+def seed(users: int, tasks: int, subtasks: int, seed_value: int = 42) -> None:
+    """Заполняет базу DATABASE_URL: users пользователей, tasks задач, по subtasks подзадач на задачу.
+
+    Половина задач в режиме месяцев, половина - в режиме дней; маски месяцев
+    считаются сразу, чтобы при старте приложения не было пересчета.
+    """
+    from sqlalchemy import delete, insert
+    from auth import get_password_hash
+    from database import SessionLocal, init_db, AppSetting, User, Tag, Task as TaskDB, SubTask as SubTaskDB
+    from db_helpers import MONTH_WINDOW_SETTING
+    from months import AVAILABLE_MONTHS, MONTH_WINDOW_KEY, period_mask
+    from tags import rebuild_tag_counts
+
+    init_db()
+    rng = random.Random(seed_value)
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    now = datetime(2025, 1, 1)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {
+                "id": user_id, "email": bench_email(i), "full_name": f"Bench {i}",
+                "position": "Bench", "is_super_admin": False, "password_hash": password_hash,
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+        tag_names = [f"Проект {i}" for i in range(50)]
+        db.execute(insert(Tag), [{"id": i + 1, "name": name} for i, name in enumerate(tag_names)])
+        task_rows, subtask_rows = [], []
+        for i in range(tasks):
+            task_id = str(uuid.uuid4())
+            if i % 2:
+                start_month, end_month = rng.choice(AVAILABLE_MONTHS), rng.choice(AVAILABLE_MONTHS)
+                period = {
+                    "duration_type": "months", "start_month": start_month, "end_month": end_month,
+                    "start_date": None, "end_date": None,
+                }
+            else:
+                start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+                period = {
+                    "duration_type": "days", "start_month": None, "end_month": None,
+                    "start_date": start, "end_date": start + timedelta(days=rng.randrange(1, 45)),
+                }
+            mask = period_mask(**period)
+            completed = rng.random() < 0.3
+            task_rows.append({
+                "id": task_id, "name": f"Задача {i}", "tag_id": rng.randrange(50) + 1,
+                **period, "month_mask": mask, "end_time": "18:00",
+                "completed": completed, "completed_at": now if completed else None,
+                "user_id": user_ids[i % users], "created_at": now + timedelta(seconds=i), "updated_at": now,
+            })
+            subtask_period = {key: value for key, value in period.items() if key != "duration_type"}
+            for j in range(subtasks):
+                subtask_rows.append({
+                    "id": str(uuid.uuid4()), "name": f"Подзадача {i}.{j}", "task_id": task_id,
+                    **subtask_period, "month_mask": mask,
+                })
+        for start in range(0, len(task_rows), 5000):
+            db.execute(insert(TaskDB), task_rows[start:start + 5000])
+        for start in range(0, len(subtask_rows), 5000):
+            db.execute(insert(SubTaskDB), subtask_rows[start:start + 5000])
+        rebuild_tag_counts(db)
+        db.execute(delete(AppSetting).where(AppSetting.key == MONTH_WINDOW_SETTING))
+        db.add(AppSetting(key=MONTH_WINDOW_SETTING, value=MONTH_WINDOW_KEY))
+        db.commit()
+
+
+# ========== ИЗМЕРЕНИЕ ==========
+
+def percentile(values, p):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+    }
+
+
+async def measure(operation, requests: int, concurrency: int, warmup: int) -> dict:
+    """Выполняет operation(i) requests раз не больше чем по concurrency одновременно.
+
+    operation возвращает HTTP ответ; статус >= 400 и исключения считаются ошибками.
+    """
+    for i in range(warmup):
+        await operation(i)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await operation(i)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+# ========== СЦЕНАРИИ ==========
+
+class Context:
+    def __init__(self, client, users: int, seed_value: int):
+        self.client = client
+        self.users = users
+        self.rng = random.Random(seed_value)
+        self.tokens = []
+        # Задачи для чтения и изменения (не удаляются) и созданные сценарием (удаляются)
+        self.stable = []
+        self.created = []
+
+    def headers(self, i: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[i % len(self.tokens)]}"}
+
+
+async def login(ctx: Context, index: int):
+    return await ctx.client.post(
+        "/api/auth/login",
+        data={"username": bench_email(index % ctx.users), "password": BENCH_PASSWORD},
+    )
+
+
+LIST_REQUESTS = (
+    ("/api/tasks", {}),
+    ("/api/tasks", {"limit": "100"}),
+    ("/api/tasks", {"fields": "id,name,tag,start_month,end_month,completed"}),
+    ("/api/tasks/calendar", {"from": "2025-03-01", "to": "2025-03-31"}),
+    ("/api/tasks/layout", {"group_by": "tag"}),
+    ("/api/tasks/stats", {}),
+)
+
+
+async def list_reads(ctx: Context, i: int):
+    path, params = LIST_REQUESTS[i % len(LIST_REQUESTS)]
+    return await ctx.client.get(path, params=params, headers=ctx.headers(i))
+
+
+async def create_task(ctx: Context, i: int):
+    headers = ctx.headers(i)
+    response = await ctx.client.post("/api/tasks", headers=headers, json={
+        "name": f"CRUD {i}", "tag": "Бенчмарк", "start_month": 12, "end_month": 2,
+        "subtasks": [{"name": "a"}, {"name": "b"}],
+    })
+    if response.status_code < 400:
+        return response, (response.json()["id"], headers)
+    return response, None
+
+
+async def crud(ctx: Context, i: int):
+    """Одна операция вперемешку: создание, чтение, частичное обновление или удаление"""
+    step = i % 4
+    if step == 0 or (step == 3 and not ctx.created):
+        response, created = await create_task(ctx, i)
+        if created is not None:
+            ctx.created.append(created)
+        return response
+    if step == 3:
+        task_id, headers = ctx.created.pop(ctx.rng.randrange(len(ctx.created)))
+        return await ctx.client.delete(f"/api/tasks/{task_id}", headers=headers)
+    task_id, headers = ctx.rng.choice(ctx.stable)
+    if step == 1:
+        return await ctx.client.get(f"/api/tasks/{task_id}", headers=headers)
+    return await ctx.client.patch(f"/api/tasks/{task_id}", headers=headers, json={"completed": i % 8 == 2})
+
+
+async def export(ctx: Context, i: int):
+    response = await ctx.client.get("/api/tasks/export", params={"format": "csv"}, headers=ctx.headers(i))
+    response.read()
+    return response
+
+
+OPERATIONS = {"login": login, "list": list_reads, "crud": crud, "export": export}
+
+
+async def run_workloads(client, args) -> dict:
+    ctx = Context(client, args.users, args.seed)
+    for i in range(min(args.users, args.concurrency)):
+        response = await login(ctx, i)
+        response.raise_for_status()
+        ctx.tokens.append(response.json()["access_token"])
+    if "crud" in args.workloads:
+        for i in range(len(ctx.tokens)):
+            response, created = await create_task(ctx, i)
+            response.raise_for_status()
+            ctx.stable.append(created)
+
+    results = {}
+    for name in args.workloads:
+        requests = args.requests if name != "login" else min(args.requests, args.login_requests)
+        operation = OPERATIONS[name]
+        results[name] = await measure(lambda i: operation(ctx, i), requests, args.concurrency, args.warmup)
+        print(f"{name:7s} {json.dumps(results[name], ensure_ascii=False)}", file=sys.stderr)
+    return results
+
+
+async def run_in_process(args) -> dict:
+    import httpx
+    from main import app
+
+    # lifespan_context выполняет обработчики startup/shutdown (сид супер-админа, маски, брокер)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            return await run_workloads(client, args)
+
+
+async def run_remote(args) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120.0) as client:
+        return await run_workloads(client, args)
+
+
+# ========== СРАВНЕНИЕ С БАЗОВЫМ ЗАМЕРОМ ==========
+
+def compare(baseline: dict, current: dict, tolerance: float) -> dict:
+    """Регрессии по сценариям, которые есть в обоих отчетах.
+
+    p95 выросла больше чем на tolerance, пропускная способность упала больше
+    чем на tolerance или появились ошибки, которых не было.
+    """
+    workloads = {}
+    regressions = []
+    for name, now in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            continue
+        p95_ratio = now["latency_ms"]["p95"] / base["latency_ms"]["p95"] if base["latency_ms"]["p95"] else 1.0
+        rps_ratio = now["throughput_rps"] / base["throughput_rps"] if base["throughput_rps"] else 1.0
+        problems = []
+        if p95_ratio > 1 + tolerance:
+            problems.append(f"p95 x{p95_ratio:.2f}")
+        if rps_ratio < 1 - tolerance:
+            problems.append(f"throughput x{rps_ratio:.2f}")
+        if now["errors"] > base["errors"]:
+            problems.append(f"errors {base['errors']} -> {now['errors']}")
+        workloads[name] = {
+            "p95_ratio": round(p95_ratio, 3),
+            "throughput_ratio": round(rps_ratio, 3),
+            "regressions": problems,
+        }
+        regressions.extend(f"{name}: {problem}" for problem in problems)
+    return {"tolerance": tolerance, "workloads": workloads, "regressions": regressions}
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def finish_comparison(baseline: dict, report: dict, tolerance: float) -> int:
+    comparison = compare(baseline, report, tolerance)
+    for line in comparison["regressions"]:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if not comparison["regressions"]:
+        print("no regressions", file=sys.stderr)
+    report["comparison"] = comparison
+    return 1 if comparison["regressions"] else 0
+
+
+# ========== CLI ==========
+
+def prepare_environment(database_url: str) -> None:
+    """DATABASE_URL должен быть задан до импорта модулей приложения"""
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    elif "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def command_seed(args) -> int:
+    prepare_environment(args.database_url)
+    started = time.perf_counter()
+    seed(args.users, args.tasks, args.subtasks, args.seed)
+    print(f"seeded users={args.users} tasks={args.tasks} subtasks={args.tasks * args.subtasks} "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+def command_run(args) -> int:
+    unknown = [name for name in args.workloads if name not in OPERATIONS]
+    if unknown:
+        raise SystemExit(f"Неизвестные сценарии: {', '.join(unknown)}")
+    if not args.url:
+        prepare_environment(args.database_url)
+        if not args.no_seed:
+            seed(args.users, args.tasks, args.subtasks, args.seed)
+        results = asyncio.run(run_in_process(args))
+    else:
+        results = asyncio.run(run_remote(args))
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "target": args.url or "in-process",
+            "database": "remote" if args.url else os.environ["DATABASE_URL"].split(":", 1)[0],
+            "python": platform.python_version(),
+            "users": args.users,
+            "tasks": args.tasks,
+            "subtasks_per_task": args.subtasks,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "workloads": results,
+    }
+    status = 0
+    if args.baseline:
+        status = finish_comparison(load_report(args.baseline), report, args.tolerance)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return status
+
+
+def command_compare(args) -> int:
+    report = load_report(args.current)
+    status = finish_comparison(load_report(args.baseline), report, args.tolerance)
+    print(json.dumps(report["comparison"], ensure_ascii=False, indent=2))
+    return status
+
+
+def add_data_arguments(parser) -> None:
+    parser.add_argument("--database-url", default="", help="база для данных (по умолчанию временная SQLite)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--subtasks", type=int, default=3, help="подзадач на задачу")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="только заполнить базу")
+    add_data_arguments(seed_parser)
+    seed_parser.set_defaults(handler=command_seed)
+
+    run_parser = commands.add_parser("run", help="заполнить базу и выполнить сценарии")
+    add_data_arguments(run_parser)
+    run_parser.add_argument("--url", default="", help="адрес запущенного сервера вместо запуска в процессе")
+    run_parser.add_argument("--no-seed", action="store_true", help="база уже заполнена командой seed")
+    run_parser.add_argument("--workloads", type=lambda value: value.split(","), default=list(WORKLOADS))
+    run_parser.add_argument("--requests", type=int, default=300, help="запросов на сценарий")
+    run_parser.add_argument("--login-requests", type=int, default=100, help="входов в сценарии login")
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--warmup", type=int, default=5, help="прогревочных запросов (не учитываются)")
+    run_parser.add_argument("--output", default="", help="файл отчета (по умолчанию stdout)")
+    run_parser.add_argument("--baseline", default="", help="отчет прошлого замера для сравнения")
+    run_parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение (0.2 = 20%%)")
+    run_parser.set_defaults(handler=command_run)
+
+    compare_parser = commands.add_parser("compare", help="сравнить два отчета")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.2)
+    compare_parser.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Планы и время типичных запросов к задачам до и после миграции 0002
+
+Создает SQLite базу на схеме ревизии 0001 (строковые даты, без индексов),
+заполняет ее, замеряет запросы, затем применяет миграции до head и
+повторяет замер на той же базе:
+
+    python benchmarks/query_plans.py --tasks 100000 --users 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = {
+    "tasks of user (keyset page)": (
+        "SELECT id FROM tasks WHERE user_id = :user_id ORDER BY created_at, id LIMIT 100",
+        {},
+    ),
+    "tasks of user in date window": (
+        "SELECT id FROM tasks WHERE user_id = :user_id AND start_date <= :date_to AND end_date >= :date_from",
+        {"date_from": "2025-03-01", "date_to": "2025-03-07"},
+    ),
+    "open tasks of user": (
+        "SELECT id FROM tasks WHERE user_id = :user_id AND completed = 0",
+        {},
+    ),
+    "tasks by tag": (
+        "SELECT id FROM tasks WHERE tag = :tag",
+        {"tag": "Проект 7"},
+    ),
+    "subtasks of one task": (
+        "SELECT id FROM subtasks WHERE task_id = :task_id",
+        {},
+    ),
+}
+
+# Запросы, которые на схеме head пишутся иначе (0006: проект - ссылка на справочник tags)
+HEAD_QUERIES = {
+    "tasks by tag": "SELECT id FROM tasks WHERE tag_id = (SELECT id FROM tags WHERE name = :tag)",
+}
+
+
+def seed(path: str, users: int, tasks: int, subtasks: int):
+    conn = sqlite3.connect(path)
+    now = datetime(2025, 1, 1)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    conn.executemany(
+        "INSERT INTO users (id, email, full_name, position, is_super_admin, password_hash, created_at) "
+        "VALUES (?, ?, ?, ?, 0, 'x', ?)",
+        [(uid, f"user{i}@example.com", f"User {i}", "Bench", now) for i, uid in enumerate(user_ids)],
+    )
+    rng = random.Random(42)
+    task_rows, subtask_rows = [], []
+    for i in range(tasks):
+        task_id = str(uuid.uuid4())
+        start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        end = start + timedelta(days=rng.randrange(1, 30))
+        task_rows.append((
+            task_id, f"Задача {i}", f"Проект {rng.randrange(100)}", "days",
+            start.isoformat(), end.isoformat(), "18:00", rng.random() < 0.3,
+            rng.choice(user_ids), (now + timedelta(seconds=i)).isoformat(sep=" "),
+        ))
+        for j in range(subtasks):
+            subtask_rows.append((str(uuid.uuid4()), f"Подзадача {i}.{j}", task_id, start.isoformat(), end.isoformat()))
+    conn.executemany(
+        "INSERT INTO tasks (id, name, tag, duration_type, start_date, end_date, end_time, completed, user_id, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        task_rows,
+    )
+    conn.executemany(
+        "INSERT INTO subtasks (id, name, task_id, start_date, end_date) VALUES (?, ?, ?, ?, ?)",
+        subtask_rows,
+    )
+    conn.commit()
+    sample = conn.execute("SELECT user_id, id FROM tasks LIMIT 1").fetchone()
+    conn.close()
+    return {"user_id": sample[0], "task_id": sample[1]}
+
+
+def measure(path: str, params: dict, repeat: int, overrides: dict = None):
+    conn = sqlite3.connect(path)
+    conn.execute("ANALYZE")
+    results = {}
+    for name, (sql, extra) in QUERIES.items():
+        sql = (overrides or {}).get(name, sql)
+        bound = {**params, **extra}
+        plan = "; ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, bound))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, bound).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (plan, statistics.median(timings))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--subtasks", type=int, default=3, help="подзадач на задачу")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, BACKEND_DIR)
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+
+    command.upgrade(config, "0001")
+    params = seed(path, args.users, args.tasks, args.subtasks)
+    before = measure(path, params, args.repeat)
+    command.upgrade(config, "head")
+    after = measure(path, params, args.repeat, HEAD_QUERIES)
+
+    print(f"tasks={args.tasks} subtasks={args.tasks * args.subtasks} users={args.users}")
+    for name in QUERIES:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f"\n{name}: {ms_before:.2f}ms -> {ms_after:.2f}ms")
+        print(f"  before: {plan_before}")
+        print(f"  after:  {plan_after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Микробенчмарк сериализации списка задач: Pydantic путь против быстрого пути
+
+Заполняет временную SQLite базу и сравнивает два способа отдать GET /api/tasks:
+
+    pydantic - ORM-объекты с selectinload, task_db_to_pydantic на каждую задачу,
+               затем повторная валидация по response_model=List[Task] и json.dumps
+               (то, что делал FastAPI до быстрого пути);
+    fast     - select по колонкам, словари из строк и orjson (FastJSONResponse).
+
+    python benchmarks/serialization.py --tasks 10000 --subtasks 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(tasks: int, subtasks: int) -> str:
+    from sqlalchemy import insert
+    from database import SessionLocal, User, Task as TaskDB, SubTask as SubTaskDB
+
+    user_id = str(uuid.uuid4())
+    now = datetime(2025, 1, 1)
+    task_rows, subtask_rows = [], []
+    for i in range(tasks):
+        task_id = str(uuid.uuid4())
+        task_rows.append({
+            "id": task_id, "name": f"Задача {i}", "tag": f"Проект {i % 50}",
+            "duration_type": "months", "start_month": 12, "end_month": 3,
+            "end_time": "18:00", "completed": i % 3 == 0,
+            "completed_at": now if i % 3 == 0 else None,
+            "user_id": user_id, "created_at": now + timedelta(seconds=i),
+        })
+        for j in range(subtasks):
+            subtask_rows.append({
+                "id": str(uuid.uuid4()), "name": f"Подзадача {i}.{j}", "task_id": task_id,
+                "start_month": 12, "end_month": 3,
+            })
+    with SessionLocal() as db:
+        db.add(User(id=user_id, email="bench@example.com", full_name="Bench", position="Bench", password_hash="x"))
+        db.flush()
+        db.execute(insert(TaskDB), task_rows)
+        if subtask_rows:
+            db.execute(insert(SubTaskDB), subtask_rows)
+        db.commit()
+    return user_id
+
+
+async def pydantic_path(user_id: str) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from database import AsyncSessionLocal, Task as TaskDB
+    from db_helpers import task_db_to_pydantic
+    from models import Task
+    from typing import List
+
+    field = create_response_field(name="response", type_=List[Task])
+    async with AsyncSessionLocal() as db:
+        tasks = (await db.scalars(
+            select(TaskDB).options(selectinload(TaskDB.subtasks))
+            .where(TaskDB.user_id == user_id).order_by(TaskDB.created_at, TaskDB.id)
+        )).all()
+        content = await serialize_response(field=field, response_content=[task_db_to_pydantic(t) for t in tasks])
+    return JSONResponse(content).body
+
+
+async def fast_path(user_id: str) -> bytes:
+    from sqlalchemy import select
+    from database import AsyncSessionLocal, Task as TaskDB
+    from db_helpers import TASK_COLUMNS, task_row_to_dict, load_subtask_dicts
+    from responses import FastJSONResponse
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(*TASK_COLUMNS).where(TaskDB.user_id == user_id).order_by(TaskDB.created_at, TaskDB.id)
+        )).all()
+        tasks = [task_row_to_dict(row) for row in rows]
+        subtasks = await load_subtask_dicts(db, [task["id"] for task in tasks])
+        for task in tasks:
+            task["subtasks"] = subtasks.get(task["id"], [])
+    return FastJSONResponse(tasks).body
+
+
+async def measure(path, user_id: str, repeat: int):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await path(user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), min(timings), body
+
+
+async def run(args):
+    user_id = seed(args.tasks, args.subtasks)
+    results = {}
+    for name, path in (("pydantic", pydantic_path), ("fast", fast_path)):
+        await path(user_id)  # прогрев
+        results[name] = await measure(path, user_id, args.repeat)
+    if json.loads(results["pydantic"][2]) != json.loads(results["fast"][2]):
+        raise SystemExit("Ответы путей различаются")
+
+    print(f"tasks={args.tasks} subtasks={args.tasks * args.subtasks} repeat={args.repeat}")
+    for name, (median, best, body) in results.items():
+        print(f"{name:9s} median={median:.1f}ms min={best:.1f}ms body={len(body)} bytes")
+    print(f"speedup x{results['pydantic'][0] / results['fast'][0]:.2f}")
+    from database import async_engine
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--subtasks", type=int, default=3, help="подзадач на задачу")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, BACKEND_DIR)
+    from database import init_db
+    init_db()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
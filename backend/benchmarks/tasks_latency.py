@@ -0,0 +1,112 @@
+"""Нагрузочный бенчмарк: задержка конкурентных GET /api/tasks
+
+Запускается против уже работающего сервера:
+
+    python benchmarks/tasks_latency.py --url http://localhost:8001 --seed 500 \
+        --requests 400 --concurrency 50
+
+Печатает p50/p95/p99 задержки в миллисекундах и пропускную способность.
+Параллельно с нагрузкой опрашивается лёгкий эндпоинт (--probe), чтобы было
+видно, насколько тяжёлые запросы списка задерживают остальной трафик.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, p):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(
+        "/api/auth/login",
+        data={"username": email, "password": password},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def seed_tasks(client: httpx.AsyncClient, count: int):
+    """Создает задачи через API, чтобы список был не пустым"""
+    for i in range(count):
+        response = await client.post("/api/tasks", json={
+            "name": f"Задача {i}",
+            "tag": f"Проект {i % 10}",
+            "duration_type": "months",
+            "start_month": 12,
+            "end_month": 3,
+            "subtasks": [{"name": f"Подзадача {i}.{j}"} for j in range(3)],
+        })
+        response.raise_for_status()
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0) as client:
+        token = await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        if args.seed:
+            await seed_tasks(client, args.seed)
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        probe_latencies = []
+        done = asyncio.Event()
+
+        async def one_request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/api/tasks")
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                response = await client.get(args.probe)
+                response.raise_for_status()
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        async def load():
+            await asyncio.gather(*(one_request() for _ in range(args.requests)))
+            done.set()
+
+        started = time.perf_counter()
+        await asyncio.gather(load(), probe())
+        elapsed = time.perf_counter() - started
+
+    print(f"requests={len(latencies)} concurrency={args.concurrency}")
+    print(f"throughput={len(latencies) / elapsed:.1f} req/s")
+    print(f"mean={statistics.mean(latencies):.1f}ms "
+          f"p50={percentile(latencies, 50):.1f}ms "
+          f"p95={percentile(latencies, 95):.1f}ms "
+          f"p99={percentile(latencies, 99):.1f}ms")
+    if probe_latencies:
+        print(f"probe {args.probe}: n={len(probe_latencies)} "
+              f"p50={percentile(probe_latencies, 50):.1f}ms "
+              f"p99={percentile(probe_latencies, 99):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--email", default="admin@admin.ru")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--seed", type=int, default=0, help="сколько задач создать перед замером")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe", default="/api/auth/me", help="лёгкий эндпоинт для замера задержки под нагрузкой")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
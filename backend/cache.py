@@ -0,0 +1,233 @@
+"""Ограниченные in-process кэши с TTL и LRU-вытеснением
+
+Кэши здесь локальны для воркера: их ключи включают версии из общего
+хранилища (store.py), поэтому после записи в любом воркере устаревшие
+записи просто перестают запрашиваться.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from store import shared_store
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш с ограничением по числу записей и временем жизни записи.
+
+    Считает попадания, промахи и вытеснения, чтобы эффективность кэша
+    можно было посмотреть через /api/health.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable]) -> None:
+        if key is not None:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Кэш проверенных токенов: строка токена -> claims. Подпись проверяется один раз,
+# срок действия (exp) и отзыв - при каждом запросе
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", "300")),
+)
+
+# Кэш статистики дашборда: (область видимости задач, версия области) -> агрегаты.
+# Версия меняется при записи задач; TTL ограничивает устаревание счетчика просроченных
+stats_cache = TTLCache(
+    maxsize=int(os.getenv("STATS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("STATS_CACHE_TTL", "60")),
+)
+
+# Кэш раскладок Gantt: (область, фильтры, версия области) -> готовое тело ответа.
+# Версия входит в ключ, поэтому записи после изменения задач просто перестают
+# запрашиваться и вытесняются по LRU/TTL
+layout_cache = TTLCache(
+    maxsize=int(os.getenv("LAYOUT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("LAYOUT_CACHE_TTL", "300")),
+)
+
+
+class SnapshotCache:
+    """Готовые тела полного списка задач по (область, формат) с ограничением по байтам.
+
+    Запись хранит версию области, для которой собрано тело: чтение с другой
+    версией - промах, поэтому запись в другом воркере (версии в общем
+    хранилище) тоже делает снимок устаревшим. Запись в этом воркере удаляет
+    снимки области сразу (invalidate_scopes), не дожидаясь вытеснения.
+    При превышении max_bytes вытесняются давно не читавшиеся снимки.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, scope: Hashable, fmt: str, version: tuple) -> Optional[bytes]:
+        key = (scope, fmt)
+        item = self._data.get(key)
+        if item is None or item[0] != version:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, scope: Hashable, fmt: str, version: tuple, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        self._pop((scope, fmt))
+        self._data[(scope, fmt)] = (version, body)
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate_scopes(self, *scopes: Hashable) -> None:
+        """Удаляет снимки областей во всех форматах (после записи задач)"""
+        for key in [key for key in self._data if key[0] in scopes]:
+            self._pop(key)
+            self.invalidations += 1
+
+    def _pop(self, key: Hashable) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[1])
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Снимки GET /api/tasks без фильтров: (область, формат) -> тело ответа.
+# Ключ версии - (epoch, версия области), как у остальных кэшей
+snapshot_cache = SnapshotCache(max_bytes=int(os.getenv("SNAPSHOT_CACHE_BYTES", str(64 * 1024 * 1024))))
+
+
+class RevocationList:
+    """Отозванные токены: отдельные jti и "все токены пользователя, выданные до момента".
+
+    Запись хранится в общем хранилище (store.py), пока не истечет самый
+    долгий токен, который она может отклонить.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    async def revoke_token(self, jti: str, expires_at: float) -> None:
+        await self.store.set(f"revoked:jti:{jti}", "1", expires_at - time.time())
+
+    async def revoke_user(self, user_id: str, token_type: str, ttl: float) -> None:
+        """Отзывает токены типа token_type, выданные пользователю до текущего момента"""
+        await self.store.set(f"revoked:user:{user_id}:{token_type}", repr(time.time()), ttl)
+
+    async def is_revoked(self, jti: Optional[str], user_id: Optional[str], token_type: str, issued_at: float) -> bool:
+        # Одно обращение к хранилищу на обе проверки
+        token_mark, revoked_at = await self.store.get_many(
+            [f"revoked:jti:{jti}", f"revoked:user:{user_id}:{token_type}"]
+        )
+        return token_mark is not None or (revoked_at is not None and issued_at <= float(revoked_at))
+
+
+# Отзыв токенов (выход, смена пароля, удаление пользователя)
+token_denylist = RevocationList(shared_store)
+
+
+class VersionCounter:
+    """Счетчики версий данных по областям видимости (user_id, "*", ...).
+
+    Версия увеличивается при каждой записи и входит в ETag ответов и ключи
+    кэшей. Счетчики лежат в общем хранилище, поэтому с несколькими воркерами
+    запись в одном из них меняет ETag во всех. epoch хранилища отличает
+    счетчики после перезапуска (MemoryStore начинает их заново).
+    """
+
+    def __init__(self, store, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    @property
+    def epoch(self) -> str:
+        return self.store.epoch
+
+    async def get(self, scope: Hashable) -> int:
+        return await self.store.get_counter(f"version:{self.namespace}:{scope}")
+
+    async def bump(self, *scopes: Hashable) -> None:
+        for scope in scopes:
+            await self.store.incr(f"version:{self.namespace}:{scope}")
+
+
+# Версии списков задач: user_id владельца и "*" (все задачи, для супер-админа)
+task_versions = VersionCounter(shared_store, "tasks")
+# Версия списка пользователей (одна область)
+user_versions = VersionCounter(shared_store, "users")
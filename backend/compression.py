@@ -0,0 +1,175 @@
+"""Сжатие ответов по Accept-Encoding: br (если установлен пакет brotli) или gzip
+
+Сжимаются ответы не короче COMPRESSION_MIN_SIZE байт с текстовыми типами,
+JSON и MessagePack. text/event-stream не сжимается: буфер компрессора
+задерживал бы события ленты изменений. Потоковые ответы (экспорт)
+сжимаются по частям, без Content-Length.
+
+ETag сжатого ответа становится слабым (W/"..."): байты другие, а
+If-None-Match сравнивается слабо (etag.etag_matches), так что 304 работает
+для любой кодировки.
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import Counter, registry
+
+try:
+    import brotli
+except ImportError:  # без brotli - только gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Типы, которые сжимаются хорошо (xlsx - уже zip, картинок в API нет)
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-msgpack")
+NEVER_COMPRESS = ("text/event-stream",)
+
+response_bytes = registry.register(Counter(
+    "http_response_body_bytes_total", "Response body bytes before and after compression", ("encoding", "stage")))
+
+
+def supported_encodings() -> tuple:
+    """Кодировки в порядке предпочтения сервера"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Лучшая кодировка из Accept-Encoding (q=0 запрещает кодировку, * - любая)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in NEVER_COMPRESS:
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+class _Compressor:
+    """Потоковый компрессор: compress() для частей, finish() в конце"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 - формат gzip (заголовок и CRC), а не голый deflate
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """ASGI middleware: сжатие тела ответа выбранной по Accept-Encoding кодировкой"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSender(send, encoding, self.minimum_size))
+
+
+class _CompressingSender:
+    """Откладывает начало ответа до первой части тела и решает, сжимать ли его"""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            headers = Headers(raw=self.start_message["headers"])
+            short = not more_body and len(body) < self.minimum_size
+            if (
+                short
+                or self.start_message["status"] in (204, 206, 304)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            ):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding)
+            self._set_headers()
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        if self.start_message is not None:
+            if not more_body:
+                MutableHeaders(raw=self.start_message["headers"])["content-length"] = str(len(data))
+            await self.send(self.start_message)
+            self.start_message = None
+        response_bytes.inc((self.encoding, "identity"), len(body))
+        response_bytes.inc((self.encoding, "encoded"), len(data))
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _set_headers(self) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["etag"] = weak_etag(headers["etag"])
+        if "content-length" in headers:
+            # Длина сжатого ответа одной частью выставляется после сжатия, потокового - неизвестна
+            del headers["content-length"]
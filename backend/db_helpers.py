@@ -1,8 +1,28 @@
 """Вспомогательные функции для работы с базой данных"""
-from database import Task as TaskDB, SubTask as SubTaskDB, User as UserDB
+import base64
+import json
+import uuid
+from datetime import date, datetime
+from database import Tag, Task as TaskDB, SubTask as SubTaskDB, User as UserDB, AppSetting
 from models import Task, SubTask
+from months import MONTH_WINDOW_KEY, masks_touching, period_mask
 from auth import UserResponse
-from typing import List
+from logging_config import get_logger
+from sqlalchemy import and_, or_, tuple_, delete, insert, select, update
+from sqlalchemy.engine import Row
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = get_logger("db")
+
+
+def format_date(value: Optional[date]) -> Optional[str]:
+    """Date из БД -> строка YYYY-MM-DD для API"""
+    return value.isoformat() if value is not None else None
+
+
+def format_datetime(value: Optional[datetime]) -> Optional[str]:
+    """DateTime из БД -> строка YYYY-MM-DD HH:MM для API"""
+    return value.strftime("%Y-%m-%d %H:%M") if value is not None else None
 
 
 def task_db_to_pydantic(task_db: TaskDB) -> Task:
@@ -13,8 +33,9 @@ def task_db_to_pydantic(task_db: TaskDB) -> Task:
             name=st.name,
             start_month=st.start_month,
             end_month=st.end_month,
-            start_date=st.start_date,
-            end_date=st.end_date
+            start_date=format_date(st.start_date),
+            end_date=format_date(st.end_date),
+            month_mask=st.month_mask
         )
         for st in task_db.subtasks
     ]
@@ -26,11 +47,12 @@ def task_db_to_pydantic(task_db: TaskDB) -> Task:
         duration_type=task_db.duration_type,
         start_month=task_db.start_month,
         end_month=task_db.end_month,
-        start_date=task_db.start_date,
-        end_date=task_db.end_date,
+        start_date=format_date(task_db.start_date),
+        end_date=format_date(task_db.end_date),
         end_time=task_db.end_time,
+        month_mask=task_db.month_mask,
         completed=task_db.completed,
-        completed_at=task_db.completed_at,
+        completed_at=format_datetime(task_db.completed_at),
         user_id=task_db.user_id,
         subtasks=subtasks
     )
@@ -46,3 +68,254 @@ def user_db_to_pydantic(user_db: UserDB) -> UserResponse:
         is_super_admin=user_db.is_super_admin
     )
 
+
+
+# Колонки быстрого пути чтения - в порядке полей models.Task / models.SubTask
+TASK_COLUMNS = (
+    TaskDB.id, TaskDB.name, TaskDB.tag, TaskDB.duration_type,
+    TaskDB.start_month, TaskDB.end_month, TaskDB.start_date, TaskDB.end_date,
+    TaskDB.end_time, TaskDB.month_mask, TaskDB.completed, TaskDB.completed_at, TaskDB.user_id,
+)
+SUBTASK_COLUMNS = (
+    SubTaskDB.task_id, SubTaskDB.id, SubTaskDB.name,
+    SubTaskDB.start_month, SubTaskDB.end_month, SubTaskDB.start_date, SubTaskDB.end_date,
+    SubTaskDB.month_mask,
+)
+
+
+def task_row_to_dict(row) -> dict:
+    """Строка select(*TASK_COLUMNS) -> словарь ответа API без создания Pydantic моделей.
+
+    Результат совпадает с task_db_to_pydantic(...).model_dump() (кроме subtasks).
+    """
+    return {
+        "id": row.id,
+        "name": row.name,
+        "tag": row.tag,
+        "duration_type": row.duration_type,
+        "start_month": row.start_month,
+        "end_month": row.end_month,
+        "start_date": format_date(row.start_date),
+        "end_date": format_date(row.end_date),
+        "end_time": row.end_time,
+        "month_mask": row.month_mask,
+        "completed": row.completed,
+        "completed_at": format_datetime(row.completed_at),
+        "user_id": row.user_id,
+    }
+
+
+async def load_subtask_dicts(db, task_ids: List[str], where=None) -> Dict[str, List[dict]]:
+    """Подзадачи задач списком словарей, сгруппированные по task_id.
+
+    where - дополнительное условие на подзадачи (например, period_overlap окна календаря).
+    """
+    result: Dict[str, List[dict]] = {}
+    for ids in chunked(task_ids):
+        query = select(*SUBTASK_COLUMNS).where(SubTaskDB.task_id.in_(ids))
+        if where is not None:
+            query = query.where(where)
+        rows = await db.execute(query)
+        for task_id, subtask_id, name, start_month, end_month, start_date, end_date, month_mask in rows:
+            result.setdefault(task_id, []).append({
+                "id": subtask_id,
+                "name": name,
+                "start_month": start_month,
+                "end_month": end_month,
+                "start_date": format_date(start_date),
+                "end_date": format_date(end_date),
+                "month_mask": month_mask,
+            })
+    return result
+
+
+def encode_cursor(row: Row) -> str:
+    """Курсор keyset-пагинации: позиция строки задачи (created_at, id) в этом порядке"""
+    raw = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Разбирает курсор, выданный encode_cursor. Бросает ValueError на мусор"""
+    try:
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(task_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def apply_task_filters(
+    query,
+    tag: Optional[str] = None,
+    completed: Optional[bool] = None,
+    duration_type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    months: Optional[List[int]] = None,
+):
+    """Добавляет к запросу задач серверные фильтры.
+
+    date_from/date_to - окно для задач в режиме дней (пересечение с start_date..end_date),
+    months - окно для задач в режиме месяцев (пересечение с start_month..end_month).
+    Если заданы оба окна, задача подходит при попадании в любое из них.
+    """
+    if tag:
+        # Сравнение по id проекта - по индексу (user_id, tag_id)
+        query = query.where(TaskDB.tag_id == select(Tag.id).where(Tag.name == tag).scalar_subquery())
+    if completed is not None:
+        query = query.where(TaskDB.completed == completed)
+    if duration_type:
+        query = query.where(TaskDB.duration_type == duration_type)
+
+    window = period_overlap(TaskDB, date_from, date_to, months, mode_column=TaskDB.duration_type)
+    if window is not None:
+        query = query.where(window)
+    return query
+
+
+def period_overlap(
+    model,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    months: Optional[List[int]] = None,
+    mode_column=None,
+):
+    """Условие пересечения периода записи (задачи или подзадачи) с окном дат и/или месяцев.
+
+    Пересечение интервалов: start <= to и end >= from - оба сравнения идут по
+    индексированным колонкам; окно месяцев - month_mask IN (маски, задевающие окно). mode_column (duration_type задачи) ограничивает
+    каждое окно записями своего режима. None, если окно не задано.
+    """
+    windows = []
+    if date_from is not None or date_to is not None:
+        conditions = [] if mode_column is None else [mode_column == "days"]
+        if date_to is not None:
+            conditions.append(model.start_date <= date_to)
+        if date_from is not None:
+            conditions.append(model.end_date >= date_from)
+        windows.append(and_(*conditions))
+    if months:
+        conditions = [] if mode_column is None else [mode_column == "months"]
+        conditions.append(model.month_mask.in_(masks_touching(months)))
+        windows.append(and_(*conditions))
+    return or_(*windows) if windows else None
+
+
+def apply_task_cursor(query, cursor: Optional[str]):
+    """Сортирует задачи в порядке (created_at, id) и продолжает выборку после курсора"""
+    if cursor:
+        created_at, task_id = decode_cursor(cursor)
+        query = query.where(tuple_(TaskDB.created_at, TaskDB.id) > tuple_(created_at, task_id))
+    return query.order_by(TaskDB.created_at, TaskDB.id)
+
+
+# Сколько значений подставлять в один IN (...): у старых SQLite лимит 999 параметров
+IN_CHUNK_SIZE = 500
+
+
+def chunked(values: List, size: int = IN_CHUNK_SIZE) -> Iterable[List]:
+    """Режет список на части для запросов с IN (...)"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def diff_subtasks(task_db: TaskDB, subtasks: List[SubTask], period: dict) -> Tuple[List[dict], List[dict], List[str]]:
+    """Сравнивает загруженные подзадачи задачи с переданным списком по id.
+
+    Возвращает строки для INSERT, строки для UPDATE по первичному ключу
+    и id подзадач на удаление. Неизменные подзадачи в результат не попадают.
+    period - унаследованный от задачи период (start/end month/date).
+    """
+    existing = {st.id: st for st in task_db.subtasks}
+    to_insert, to_update, seen = [], [], set()
+    for subtask_data in subtasks:
+        values = {"name": subtask_data.name, **period}
+        current = existing.get(subtask_data.id) if subtask_data.id not in seen else None
+        if current is None:
+            subtask_id = subtask_data.id if subtask_data.id and subtask_data.id not in seen else str(uuid.uuid4())
+            seen.add(subtask_id)
+            to_insert.append({"id": subtask_id, "task_id": task_db.id, **values})
+            continue
+        seen.add(current.id)
+        if any(getattr(current, field) != value for field, value in values.items()):
+            to_update.append({"id": current.id, **values})
+    to_delete = [subtask_id for subtask_id in existing if subtask_id not in seen]
+    return to_insert, to_update, to_delete
+
+
+async def write_subtask_changes(db, to_insert: List[dict], to_update: List[dict], to_delete: List[str]) -> None:
+    """Применяет результат diff_subtasks: не больше трех запросов на любое число подзадач"""
+    for ids in chunked(to_delete):
+        await db.execute(delete(SubTaskDB).where(SubTaskDB.id.in_(ids)))
+    if to_update:
+        await db.execute(update(SubTaskDB), to_update)
+    if to_insert:
+        await db.execute(insert(SubTaskDB), to_insert)
+
+
+async def sync_subtasks(db, task_db: TaskDB, subtasks: List[SubTask], period: dict) -> None:
+    """Приводит подзадачи задачи к переданному списку минимальным числом запросов.
+
+    Новые подзадачи добавляются одним INSERT, изменившиеся обновляются
+    одним executemany UPDATE, исчезнувшие удаляются одним DELETE.
+    task_db.subtasks должны быть загружены.
+    """
+    await write_subtask_changes(db, *diff_subtasks(task_db, subtasks, period))
+
+
+MONTH_WINDOW_SETTING = "month_window"
+
+
+async def _recompute_masks(db, model, columns, mask_of) -> int:
+    """Пересчитывает month_mask всех строк таблицы пачками по первичному ключу"""
+    changed = 0
+    last_id = None
+    while True:
+        query = select(model.id, model.month_mask, *columns).order_by(model.id).limit(IN_CHUNK_SIZE)
+        if last_id is not None:
+            query = query.where(model.id > last_id)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return changed
+        updates = [
+            {"id": row.id, "month_mask": mask}
+            for row in rows
+            if (mask := mask_of(row)) != row.month_mask
+        ]
+        if updates:
+            await db.execute(update(model), updates)
+            changed += len(updates)
+        last_id = rows[-1].id
+
+
+async def sync_month_masks(db) -> None:
+    """Приводит month_mask задач и подзадач к текущему окну месяцев (GANTT_MONTHS).
+
+    Окно, по которому посчитаны маски, хранится в app_settings: пока оно
+    не меняется, проверка стоит один запрос. Маски новых и измененных записей
+    пишут обработчики, здесь они пересчитываются только после смены окна
+    (и один раз после миграции, добавившей колонку).
+    """
+    setting = await db.get(AppSetting, MONTH_WINDOW_SETTING)
+    if setting is not None and setting.value == MONTH_WINDOW_KEY:
+        return
+    tasks = await _recompute_masks(
+        db, TaskDB,
+        (TaskDB.duration_type, TaskDB.start_month, TaskDB.end_month, TaskDB.start_date, TaskDB.end_date),
+        lambda row: period_mask(row.duration_type, row.start_month, row.end_month, row.start_date, row.end_date),
+    )
+    # У подзадачи нет режима: период задан либо датами, либо месяцами
+    subtasks = await _recompute_masks(
+        db, SubTaskDB,
+        (SubTaskDB.start_month, SubTaskDB.end_month, SubTaskDB.start_date, SubTaskDB.end_date),
+        lambda row: period_mask(
+            "days" if row.start_date is not None else "months",
+            row.start_month, row.end_month, row.start_date, row.end_date,
+        ),
+    )
+    if setting is None:
+        db.add(AppSetting(key=MONTH_WINDOW_SETTING, value=MONTH_WINDOW_KEY))
+    else:
+        setting.value = MONTH_WINDOW_KEY
+    await db.commit()
+    logger.info("month masks recomputed", extra={"window": MONTH_WINDOW_KEY, "tasks": tasks, "subtasks": subtasks})
@@ -0,0 +1,43 @@
+"""Сильные ETag для списков и условные GET (If-None-Match -> 304)"""
+import hashlib
+from typing import Hashable
+
+from fastapi import Request, Response
+
+from cache import VersionCounter
+
+
+async def listing_etag(request: Request, versions: VersionCounter, scope: Hashable, variant: str = "") -> str:
+    """ETag списка: версия области видимости + область и параметры запроса.
+
+    Параметры сортируются, чтобы ?a=1&b=2 и ?b=2&a=1 давали один ETag.
+    variant - формат ответа (responses.negotiate_format): у разных форматов разные байты.
+    """
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    key = f"{scope}|{request.url.path}|{query}|{variant}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{versions.epoch}-{await versions.get(scope)}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, как требует RFC 9110 для GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def etag_headers(etag: str) -> dict:
+    # Браузер хранит ответ, но перед использованием всегда перепроверяет его по ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers.update(etag_headers(etag))
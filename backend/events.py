@@ -0,0 +1,202 @@
+"""Лента изменений задач: брокер событий для /api/tasks/stream (Server-Sent Events)
+
+Обработчики записи публикуют событие в брокер, брокер через backend
+раздает его подписчикам. LocalBackend работает в пределах процесса;
+RedisBackend (EVENTS_BROKER_URL=redis://...) связывает несколько воркеров
+через Redis pub/sub - пакет redis нужен только в этом режиме.
+
+У каждого подписчика ограниченный буфер. Если клиент не успевает
+читать и буфер переполнился, накопленные события отбрасываются и клиенту
+уходит событие resync: он перезагружает список целиком (дешево благодаря ETag).
+"""
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Callable, Optional, Set
+
+from logging_config import get_logger
+
+EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", "256"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_BROKER_URL = os.getenv("EVENTS_BROKER_URL", "")
+EVENTS_CHANNEL = "gantt:task-events"
+
+# Область видимости подписчика, получающего события всех пользователей
+ALL_SCOPE = "*"
+
+logger = get_logger("events")
+
+_RESYNC = {"type": "resync"}
+_CLOSE = object()
+
+
+class Subscription:
+    """Подписчик с ограниченной очередью событий"""
+
+    def __init__(self, scope: str, maxsize: int):
+        self.scope = scope
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def wants(self, event: dict) -> bool:
+        owners = event.get("user_ids") or [event.get("user_id")]
+        return self.scope == ALL_SCOPE or self.scope in owners
+
+    def _replace_pending(self, event) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def offer(self, event: dict) -> bool:
+        """Кладет событие, не блокируя публикующего.
+
+        При переполнении буфера заменяет накопленное событием resync и возвращает False.
+        """
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._replace_pending(_RESYNC)
+            return False
+
+    def close(self) -> None:
+        self._replace_pending(_CLOSE)
+
+
+class LocalBackend:
+    """Доставка в пределах процесса - для одного воркера и для тестов"""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self._deliver = deliver
+
+    async def publish(self, message: str) -> None:
+        if self._deliver is not None:
+            self._deliver(message)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class RedisBackend:
+    """Redis pub/sub: событие, опубликованное любым воркером, получают подписчики всех воркеров"""
+
+    def __init__(self, url: str, channel: str = EVENTS_CHANNEL):
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("Для EVENTS_BROKER_URL=redis://... установите пакет redis")
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.channel)
+
+        async def listen():
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    deliver(message["data"])
+
+        self._listener = asyncio.create_task(listen())
+
+    async def publish(self, message: str) -> None:
+        await self._redis.publish(self.channel, message)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._redis is not None:
+            await self._redis.close()
+
+
+def make_backend(url: str = EVENTS_BROKER_URL):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    return LocalBackend()
+
+
+class EventBroker:
+    """Раздает события задач подписчикам текущего процесса"""
+
+    def __init__(self, backend=None, buffer_size: int = EVENTS_BUFFER_SIZE):
+        self.backend = backend or LocalBackend()
+        self.buffer_size = buffer_size
+        self._subscriptions: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    async def publish(self, event: dict) -> None:
+        """Публикация после commit; ошибка брокера не должна ломать запись задачи"""
+        self.published += 1
+        try:
+            await self.backend.publish(json.dumps(event, ensure_ascii=False, default=str))
+        except Exception:
+            logger.exception("task event publish failed", extra={"event_type": event.get("type")})
+
+    def _deliver(self, message: str) -> None:
+        event = json.loads(message)
+        for subscription in self._subscriptions:
+            if subscription.wants(event):
+                if subscription.offer(event):
+                    self.delivered += 1
+                else:
+                    self.overflows += 1
+
+    def subscribe(self, scope: str) -> Subscription:
+        subscription = Subscription(scope, self.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "subscribers": len(self._subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+def format_sse(event: dict) -> bytes:
+    """Событие в формате text/event-stream: имя события - тип изменения"""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+
+
+async def stream_events(broker: EventBroker, scope: str) -> AsyncIterator[bytes]:
+    """Поток SSE для подписчика; раз в EVENTS_HEARTBEAT_SECONDS - комментарий-пинг"""
+    subscription = broker.subscribe(scope)
+    try:
+        yield b"retry: 3000\n\n"
+        yield format_sse({"type": "ready", "scope": scope})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if event is _CLOSE:
+                return
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+task_events = EventBroker(make_backend())
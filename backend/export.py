@@ -0,0 +1,203 @@
+"""Потоковый экспорт задач в HTML (для Excel), CSV и XLSX
+
+Задачи читаются пачками по (created_at, id) вместе с подзадачами,
+строки отдаются клиенту по мере формирования - память не зависит
+от числа экспортируемых задач.
+"""
+import asyncio
+import csv
+import html
+import io
+import os
+import tempfile
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+
+from database import AsyncSessionLocal, Task as TaskDB
+from months import AVAILABLE_MONTHS, MONTH_NAMES
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "html": ("text/html; charset=utf-8", "tasks.html"),
+    "csv": ("text/csv; charset=utf-8", "tasks.csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "tasks.xlsx"),
+}
+
+HEADER = ["Задача", "Проект"] + [MONTH_NAMES[m] for m in AVAILABLE_MONTHS] + ["Выполнено"]
+
+# Строка экспорта: (это подзадача, название, проект, отметки по месяцам, выполнено)
+ExportRow = Tuple[bool, str, str, List[bool], Optional[bool]]
+
+
+async def iter_task_batches(user_id: Optional[str], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[TaskDB]]:
+    """Читает задачи пачками с подзадачами (selectinload - один запрос на пачку).
+
+    Открывает собственную сессию: генератор работает уже после того,
+    как обработчик вернул StreamingResponse.
+    """
+    async with AsyncSessionLocal() as db:
+        last_key = None
+        while True:
+            query = (
+                select(TaskDB)
+                .options(selectinload(TaskDB.subtasks))
+                .order_by(TaskDB.created_at, TaskDB.id)
+                .limit(batch_size)
+            )
+            if user_id is not None:
+                query = query.where(TaskDB.user_id == user_id)
+            if last_key is not None:
+                query = query.where(tuple_(TaskDB.created_at, TaskDB.id) > tuple_(*last_key))
+            batch = (await db.scalars(query)).all()
+            if not batch:
+                return
+            yield batch
+            last_key = (batch[-1].created_at, batch[-1].id)
+            # Освобождаем объекты пачки, чтобы identity map сессии не рос
+            db.expunge_all()
+
+
+def mask_flags(mask: Optional[int]) -> List[bool]:
+    """Отметки по столбцам месяцев из month_mask - по одной проверке бита на ячейку"""
+    mask = mask or 0
+    return [bool(mask >> slot & 1) for slot in range(len(AVAILABLE_MONTHS))]
+
+
+def task_rows(task: TaskDB) -> Iterator[ExportRow]:
+    """Строки экспорта для задачи и ее подзадач"""
+    yield (False, task.name, task.tag, mask_flags(task.month_mask), bool(task.completed))
+    for subtask in task.subtasks:
+        # Подзадача без своего периода наследует период задачи
+        mask = subtask.month_mask if subtask.month_mask is not None else task.month_mask
+        yield (True, subtask.name, "", mask_flags(mask), None)
+
+
+def _completed_text(completed: Optional[bool]) -> str:
+    if completed is None:
+        return ""
+    return "Да" if completed else "Нет"
+
+
+async def stream_html(user_id: Optional[str]) -> AsyncIterator[bytes]:
+    """HTML таблица, которую Excel открывает с форматированием (задачи жирным)"""
+    head = [
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n<title>Задачи Gantt</title>\n',
+        '<style>\ntable { border-collapse: collapse; width: 100%; }\n',
+        'th, td { border: 1px solid #000; padding: 5px; text-align: left; }\n',
+        'th { background-color: #f0f0f0; font-weight: bold; }\n.subtask { font-weight: 300; }\n',
+        '</style>\n</head>\n<body>\n<table border="1" cellpadding="5" cellspacing="0">',
+        '<tr>', *[f'<th><b>{html.escape(title)}</b></th>' for title in HEADER], '</tr>',
+    ]
+    yield ''.join(head).encode("utf-8")
+
+    empty_row = '<tr>' + '<td></td>' * len(HEADER) + '</tr>'
+    first = True
+    async for batch in iter_task_batches(user_id):
+        parts = []
+        for task in batch:
+            # Пустая строка между основными задачами
+            if not first:
+                parts.append(empty_row)
+            first = False
+            for is_subtask, name, tag, months, completed in task_rows(task):
+                parts.append('<tr>')
+                if is_subtask:
+                    parts.append(f'<td class="subtask" style="font-weight: 300; font-style: normal;">  └─ {html.escape(name)}</td>')
+                    parts.append('<td></td>')
+                else:
+                    parts.append(f'<td><b>{html.escape(name)}</b></td>')
+                    parts.append(f'<td><b>{html.escape(tag)}</b></td>')
+                parts.extend('<td>X</td>' if flag else '<td></td>' for flag in months)
+                parts.append(f'<td>{_completed_text(completed)}</td>')
+                parts.append('</tr>')
+        yield ''.join(parts).encode("utf-8")
+
+    yield b'</table>\n</body>\n</html>\n'
+
+
+async def stream_csv(user_id: Optional[str]) -> AsyncIterator[bytes]:
+    """CSV в UTF-8 с BOM, чтобы Excel правильно определил кодировку"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(HEADER)
+    yield buffer.getvalue().encode("utf-8")
+
+    async for batch in iter_task_batches(user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        for task in batch:
+            for is_subtask, name, tag, months, completed in task_rows(task):
+                writer.writerow(
+                    [f"└─ {name}" if is_subtask else name, tag]
+                    + ["X" if flag else "" for flag in months]
+                    + [_completed_text(completed)]
+                )
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def stream_xlsx(user_id: Optional[str]) -> AsyncIterator[bytes]:
+    """XLSX через write-only режим openpyxl.
+
+    Строки сразу сбрасываются во временный файл на диске, готовая книга
+    отдается кусками и удаляется после отправки.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Задачи")
+    bold = Font(bold=True)
+
+    def bold_row(values):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.font = bold
+            cells.append(cell)
+        return cells
+
+    sheet.append(bold_row(HEADER))
+    async for batch in iter_task_batches(user_id):
+        for task in batch:
+            for is_subtask, name, tag, months, completed in task_rows(task):
+                values = (
+                    [f"└─ {name}" if is_subtask else name, tag]
+                    + ["X" if flag else None for flag in months]
+                    + [_completed_text(completed) or None]
+                )
+                sheet.append(values if is_subtask else bold_row(values[:2]) + values[2:])
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+STREAMERS = {
+    "html": stream_html,
+    "csv": stream_csv,
+    "xlsx": stream_xlsx,
+}
+
+
+async def legacy_html_table(user_id: Optional[str]) -> str:
+    """Только таблица без обертки документа - для старого JSON-эндпоинта экспорта"""
+    parts = []
+    async for chunk in stream_html(user_id):
+        parts.append(chunk.decode("utf-8"))
+    document = ''.join(parts)
+    return document[document.index('<table'):document.index('</table>') + len('</table>')]
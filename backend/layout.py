@@ -0,0 +1,132 @@
+"""Раскладка Gantt-диаграммы на сервере
+
+По отфильтрованному списку задач (словари task_row_to_dict с подзадачами)
+строит готовую к отрисовке раскладку: порядок строк, группы, занятые столбцы
+месяцев и смещения в днях. Клиенту остается нарисовать строки по индексам.
+
+Строки отдаются по колонкам (rows.name[i], rows.spans[i], ...): так ответ
+компактнее, чем список объектов с повторяющимися ключами.
+"""
+import calendar
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from months import AVAILABLE_MONTHS
+
+GROUP_BY = ("none", "tag", "user")
+
+# Вид строки раскладки
+ROW_TASK = "task"
+ROW_SUBTASK = "subtask"
+
+ROW_FIELDS = (
+    "kind", "id", "task_id", "name", "tag", "user_id", "completed",
+    "spans", "day_start", "day_end", "fill",
+)
+
+
+def mask_spans(mask: Optional[int]) -> List[Tuple[int, int]]:
+    """Отрезки подряд занятых столбцов месяцев: 0b1100011 -> [(0, 1), (5, 6)]"""
+    spans = []
+    start = None
+    for slot in range(len(AVAILABLE_MONTHS) + 1):
+        occupied = slot < len(AVAILABLE_MONTHS) and bool((mask or 0) >> slot & 1)
+        if occupied and start is None:
+            start = slot
+        elif not occupied and start is not None:
+            spans.append((start, slot - 1))
+            start = None
+    return spans
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+def _day_period(item: dict) -> Tuple[Optional[date], Optional[date]]:
+    return _parse_date(item.get("start_date")), _parse_date(item.get("end_date"))
+
+
+def _fill(spans: List[Tuple[int, int]], start: Optional[date], end: Optional[date]) -> float:
+    """Доля столбца под полосой: короткая задача в пределах одного месяца рисуется не на всю ширину"""
+    if start is None or end is None or len(spans) != 1 or spans[0][0] != spans[0][1]:
+        return 1.0
+    if (start.year, start.month) != (end.year, end.month):
+        return 1.0
+    days = (end - start).days + 1
+    days_in_month = calendar.monthrange(start.year, start.month)[1]
+    return round(days / days_in_month, 4) if days < days_in_month else 1.0
+
+
+def _group_key(task: dict, group_by: str) -> Optional[str]:
+    if group_by == "tag":
+        return task["tag"]
+    if group_by == "user":
+        return task["user_id"]
+    return None
+
+
+def build_gantt_layout(tasks: List[dict], group_by: str = "none") -> dict:
+    """Раскладка для списка задач в порядке выдачи (created_at, id).
+
+    Группы идут по ключу (тег или пользователь), внутри группы сохраняется
+    порядок задач; подзадачи - строками сразу после своей задачи.
+    spans - занятые столбцы месяцев, day_start/day_end - смещения в днях
+    от origin (самой ранней даты начала) для задач в режиме дней.
+    """
+    groups: Dict[Optional[str], List[dict]] = {}
+    for task in tasks:
+        groups.setdefault(_group_key(task, group_by), []).append(task)
+    ordered = sorted(groups.items(), key=lambda item: "" if item[0] is None else item[0])
+
+    starts = [_day_period(task)[0] for task in tasks if task["duration_type"] == "days"]
+    starts = [start for start in starts if start is not None]
+    origin = min(starts) if starts else None
+
+    rows: Dict[str, list] = {field: [] for field in ROW_FIELDS}
+
+    def add_row(kind: str, item: dict, task: dict, mask: Optional[int], period) -> None:
+        spans = mask_spans(mask)
+        start, end = period
+        rows["kind"].append(kind)
+        rows["id"].append(item["id"])
+        rows["task_id"].append(task["id"])
+        rows["name"].append(item["name"])
+        rows["tag"].append(task["tag"])
+        rows["user_id"].append(task["user_id"])
+        rows["completed"].append(bool(task["completed"]))
+        rows["spans"].append(spans)
+        rows["day_start"].append((start - origin).days if origin is not None and start is not None else None)
+        rows["day_end"].append((end - origin).days if origin is not None and end is not None else None)
+        rows["fill"].append(_fill(spans, start, end))
+
+    layout_groups = []
+    for key, group_tasks in ordered:
+        first_row = len(rows["id"])
+        for task in group_tasks:
+            is_days = task["duration_type"] == "days"
+            period = _day_period(task) if is_days else (None, None)
+            add_row(ROW_TASK, task, task, task.get("month_mask"), period)
+            for subtask in task.get("subtasks", []):
+                # Подзадача без своего периода рисуется по периоду задачи
+                mask = subtask.get("month_mask")
+                if mask is None:
+                    mask = task.get("month_mask")
+                subtask_period = _day_period(subtask) if is_days else (None, None)
+                if subtask_period[0] is None:
+                    subtask_period = period
+                add_row(ROW_SUBTASK, subtask, task, mask, subtask_period)
+        layout_groups.append({
+            "key": key,
+            "start": first_row,
+            "count": len(rows["id"]) - first_row,
+            "tasks": len(group_tasks),
+        })
+
+    return {
+        "months": AVAILABLE_MONTHS,
+        "group_by": group_by,
+        "origin": origin.isoformat() if origin is not None else None,
+        "groups": layout_groups,
+        "rows": rows,
+    }
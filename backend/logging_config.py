@@ -0,0 +1,229 @@
+"""Структурированное логирование: JSON-записи через QueueHandler/QueueListener
+
+Обработчики запросов только кладут запись в очередь, форматирование в JSON
+и запись в stdout выполняет отдельный поток слушателя.
+
+Настройка через переменные окружения:
+    LOG_LEVEL        - общий уровень логгеров приложения (по умолчанию INFO)
+    LOG_ROUTE_LEVELS - уровни по маршрутам: "GET /api/tasks=WARNING,/api/health=ERROR"
+    LOG_SAMPLE_RATES - доля логируемых запросов по маршрутам: "GET /api/tasks=0.1"
+    LOG_SLOW_MS      - запросы дольше порога логируются всегда (по умолчанию 1000)
+
+Маршрут задается шаблоном пути FastAPI (например /api/tasks/{task_id}),
+с методом или без. Записи уровня WARNING и выше, ошибки (статус >= 500)
+и медленные запросы выборкой не отбрасываются.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from starlette.routing import Match
+
+LOGGER_NAME = "gantt"
+
+# Поля текущего запроса (request_id, route, user_id, rows, ...): изменяемый словарь,
+# чтобы значения, добавленные в зависимостях и обработчиках, были видны middleware
+_request_context: ContextVar[Optional[dict]] = ContextVar("request_log_context", default=None)
+
+# Стандартные атрибуты LogRecord - все остальные считаются структурированными полями
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _parse_route_map(value: str, convert) -> Dict[str, object]:
+    """"GET /api/tasks=0.1,/api/health=0" -> {"GET /api/tasks": 0.1, "/api/health": 0.0}"""
+    result = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        route, setting = item.rsplit("=", 1)
+        result[route.strip()] = convert(setting.strip())
+    return result
+
+
+def _level(value: str) -> int:
+    return logging.getLevelName(value.upper()) if not value.isdigit() else int(value)
+
+
+LOG_LEVEL = _level(os.getenv("LOG_LEVEL", "INFO"))
+LOG_ROUTE_LEVELS = _parse_route_map(os.getenv("LOG_ROUTE_LEVELS", ""), _level)
+LOG_SAMPLE_RATES = _parse_route_map(os.getenv("LOG_SAMPLE_RATES", ""), float)
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "1000"))
+
+
+def _route_setting(settings: dict, method: str, route: str, default):
+    """Настройка маршрута: сначала "METHOD /path", затем "/path" """
+    value = settings.get(f"{method} {route}")
+    if value is None:
+        value = settings.get(route, default)
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; дополнительные поля из extra= попадают в корень"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Добавляет к записи поля текущего запроса и применяет уровни и выборку маршрута.
+
+    Работает на QueueHandler, то есть в потоке запроса, где доступен contextvar.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is None:
+            return True
+        if record.levelno < context["_level"]:
+            return False
+        if record.levelno < logging.WARNING and not context["_sampled"]:
+            return False
+        for key, value in context.items():
+            if not key.startswith("_") and not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler, который сохраняет трассировку исключения отдельным полем"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """Подключает очередь к логгеру приложения и запускает поток записи (идемпотентно)"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+
+def stop_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и останавливает поток"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def log_context(**fields) -> None:
+    """Добавляет поля (user_id, rows, ...) к записям текущего запроса и к его итоговой записи"""
+    context = _request_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+access_logger = get_logger("access")
+
+# Ключ scope, под которым middleware сохраняют найденный шаблон маршрута
+ROUTE_SCOPE_KEY = "gantt.route"
+
+
+def route_template(scope) -> Optional[str]:
+    """Шаблон пути FastAPI для запроса (/api/tasks/{task_id}) или None, если маршрут не найден.
+
+    Результат кэшируется в scope, чтобы несколько middleware не искали маршрут повторно.
+    """
+    if ROUTE_SCOPE_KEY not in scope:
+        template = None
+        router = scope["app"].router if "app" in scope else None
+        for route in getattr(router, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+        scope[ROUTE_SCOPE_KEY] = template
+    return scope[ROUTE_SCOPE_KEY]
+
+
+class RequestLogMiddleware:
+    """ASGI middleware: одна итоговая запись на запрос с маршрутом, статусом и длительностью"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope) or scope["path"]
+        context = {
+            "request_id": uuid.uuid4().hex[:16],
+            "method": method,
+            "route": route,
+            "_level": _route_setting(LOG_ROUTE_LEVELS, method, route, logging.NOTSET),
+            "_sampled": random.random() < _route_setting(LOG_SAMPLE_RATES, method, route, 1.0),
+        }
+        token = _request_context.set(context)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            level = logging.INFO
+            if status_code >= 500:
+                level = logging.ERROR
+            elif duration_ms >= LOG_SLOW_MS:
+                level = logging.WARNING
+            access_logger.log(
+                level, "%s %s %s", method, route, status_code,
+                extra={"status": status_code, "duration_ms": duration_ms},
+            )
+            _request_context.reset(token)
@@ -1,24 +1,53 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Body, Request, Request as FastAPIRequest
+from fastapi import FastAPI, HTTPException, Depends, Query, status, Body, Request, Request as FastAPIRequest, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr, field_validator, Field, model_validator, ConfigDict
-from typing import List, Optional, Union, Any
+from pydantic import BaseModel, EmailStr, field_validator, Field, model_validator, ConfigDict, ValidationError
+from typing import List, Optional, Tuple, Union, Any
 import json
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session, joinedload  # pyright: ignore[reportMissingImports]
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, delete, insert, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload  # pyright: ignore[reportMissingImports]
+import asyncio
 import json
+import os
+import secrets
 import uuid
 from auth import (
-    User as AuthUser, UserCreate, UserUpdate, UserResponse, Token,
-    verify_password, get_password_hash, create_access_token,
-    decode_token, ACCESS_TOKEN_EXPIRE_MINUTES, oauth2_scheme
+    User as AuthUser, UserCreate, UserUpdate, UserResponse, Token, RefreshRequest,
+    get_password_hash_async, verify_and_update_password, password_hash_stats, issue_tokens,
+    decode_token, user_from_claims, revoke_token, revoke_user_tokens, token_stats,
+    REFRESH_TOKEN, oauth2_scheme
 )
 from database import (
-    Base, engine, SessionLocal, get_db,
+    Base, engine, async_engine, get_db, pool_status,
     User, Task as TaskDB, SubTask as SubTaskDB
 )
-from db_helpers import task_db_to_pydantic, user_db_to_pydantic
-from models import Task, SubTask
+from db_helpers import (
+    task_db_to_pydantic, user_db_to_pydantic, task_row_to_dict, load_subtask_dicts, TASK_COLUMNS,
+    apply_task_filters, apply_task_cursor, period_overlap, encode_cursor, sync_subtasks,
+    diff_subtasks, write_subtask_changes, chunked
+)
+from models import Task, SubTask, TaskPatch
+from cache import token_cache, stats_cache, layout_cache, snapshot_cache, task_versions, user_versions
+from events import task_events, stream_events
+from store import shared_store
+from startup import STARTUP_TASKS, prepare_database
+from responses import FastJSONResponse, dumps_json, drop_nulls, negotiate_format, render_task_list, task_list_response
+from compression import CompressionMiddleware
+from layout import GROUP_BY, build_gantt_layout
+from search import search_task_ids, suggest_tags
+from tags import tag_ids, count_state, apply_count_changes, list_tags, delete_user_counts, overdue_refresher
+from metrics import MetricsMiddleware, Gauge, instrument_engine, registry, render_metrics
+from etag import listing_etag, etag_matches, etag_headers, not_modified, set_etag
+from stats import compute_task_stats
+from export import EXPORT_FORMATS, STREAMERS, legacy_html_table
+from months import AVAILABLE_MONTHS, MONTH_NAMES, months_window, months_in_dates, period_mask
+from logging_config import RequestLogMiddleware, get_logger, log_context, setup_logging
+
+setup_logging()
+logger = get_logger("api")
 
 app = FastAPI(title="Gantt Chart API")
 
@@ -29,64 +58,128 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition", "ETag"],
 )
+# Сжатие ответов (gzip/br) - самый внутренний слой: метрики и лог видят время сжатия
+app.add_middleware(CompressionMiddleware)
+# Метрики запроса (внутренний слой: число запросов к БД попадает и в итоговую запись лога)
+app.add_middleware(MetricsMiddleware)
+# Итоговая запись на каждый запрос: маршрут, статус, длительность, пользователь
+app.add_middleware(RequestLogMiddleware)
+instrument_engine(async_engine.sync_engine)
 
-# Инициализация базы данных
-Base.metadata.create_all(bind=engine)
-
-# Инициализация супер-админа
-def init_super_admin(db: Session):
-    admin_email = "admin@admin.ru"
-    admin_exists = db.query(User).filter(User.email == admin_email).first()
-    if not admin_exists:
-        admin_user = User(
-            id=str(uuid.uuid4()),
-            email=admin_email,
-            full_name="Супер Администратор",
-            position="Супер Администратор",
-            is_super_admin=True,
-            password_hash=get_password_hash("admin123")
-        )
-        db.add(admin_user)
-        db.commit()
+# Максимальный размер страницы для GET /api/tasks
+MAX_TASKS_PAGE_SIZE = 1000
+# Максимальное число задач в одном запросе к /api/tasks/bulk
+MAX_BULK_TASKS = 5000
+# Самое длинное окно календаря за один запрос (дней)
+MAX_CALENDAR_DAYS = 366
+# Максимальный размер страницы поиска и число подсказок проектов
+MAX_SEARCH_PAGE_SIZE = 200
+MAX_TAG_SUGGESTIONS = 20
+# Время жизни одноразового билета для /api/tasks/stream (секунд)
+STREAM_TICKET_TTL = float(os.getenv("STREAM_TICKET_TTL", "30"))
+# Область видимости супер-админа, просматривающего задачи всех пользователей
+ALL_TASKS_SCOPE = "*"
+# Единственная область версий списка пользователей
+ALL_USERS_SCOPE = "*"
 
-# Инициализируем супер-админа при старте
 @app.on_event("startup")
 async def startup_event():
-    db = SessionLocal()
-    try:
-        init_super_admin(db)
-    finally:
-        db.close()
+    # Миграции, супер-админ и маски месяцев (см. startup.py); в воркерах
+    # manage.py serve это уже сделано до их запуска
+    if STARTUP_TASKS:
+        await asyncio.to_thread(prepare_database)
+    await shared_store.start()
+    await task_events.start()
+    await overdue_refresher.start()
 
-# Доступные месяцы в порядке отображения
-AVAILABLE_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7]  # Декабрь, Январь, Февраль, Март, Апрель, Май, Июнь, Июль
-MONTH_NAMES = {
-    1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
-    5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
-    9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
-}
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Закрываем открытые потоки /api/tasks/stream, иначе сервер ждет их завершения
+    await task_events.stop()
+    await overdue_refresher.stop()
+    await shared_store.close()
+    # Закрываем соединения пула (потоки aiosqlite иначе не дают процессу завершиться)
+    await async_engine.dispose()
 
 
 # Функции для работы с пользователями
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.email == email))
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.id == user_id))
+
+async def get_task_by_id(db: AsyncSession, task_id: str) -> Optional[TaskDB]:
+    """Загружает задачу вместе с подзадачами (ленивая загрузка в async-сессии недоступна)"""
+    return await db.scalar(
+        select(TaskDB)
+        .options(selectinload(TaskDB.subtasks))
+        .where(TaskDB.id == task_id)
+        .execution_options(populate_existing=True)
+    )
+
+def user_db_to_auth(user: User) -> AuthUser:
+    """Снимок пользователя для claims токена - без хэша пароля и без привязки к сессии"""
+    return AuthUser(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        position=user.position,
+        is_super_admin=user.is_super_admin
+    )
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token_data = decode_token(token)
-    if token_data is None:
-        raise credentials_exception
-    user = get_user_by_email(db, token_data.email)
-    if user is None:
-        raise credentials_exception
+
+async def authenticate_token(token: str) -> AuthUser:
+    """Пользователь по claims access-токена, без обращения к БД; 401, если токен недействителен.
+
+    Изменения пользователя доходят до токенов через отзыв (revoke_user_tokens):
+    клиент получает 401 и обновляет пару через /api/auth/refresh, где данные читаются из БД.
+    """
+    claims = await decode_token(token)
+    if claims is None:
+        raise credentials_exception()
+    user = user_from_claims(claims)
+    log_context(user_id=user.id)
     return user
 
-def get_current_super_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthUser:
+    return await authenticate_token(token)
+
+def get_tasks_scope(current_user: AuthUser, user_id: Optional[str] = None) -> str:
+    """Чьи задачи видит пользователь: свои, выбранного пользователя (супер-админ) или все"""
+    if current_user.is_super_admin:
+        return user_id or ALL_TASKS_SCOPE
+    return current_user.id
+
+async def notify_tasks_changed(user_id: str):
+    """Вызывается после каждой записи задач пользователя: новая версия меняет ETag и ключи кэшей"""
+    await task_versions.bump(user_id, ALL_TASKS_SCOPE)
+    snapshot_cache.invalidate_scopes(user_id, ALL_TASKS_SCOPE)
+
+async def publish_task_event(event_type: str, user_id: str, task_id: str, task: Optional[Task] = None):
+    """Рассылает изменение задачи подписчикам /api/tasks/stream (вызывается после commit)"""
+    event = {"type": event_type, "task_id": task_id, "user_id": user_id, "version": await task_versions.get(user_id)}
+    if task is not None:
+        event["task"] = task.model_dump()
+    await task_events.publish(event)
+
+async def publish_tasks_resync(user_ids):
+    """Массовое изменение: вместо тысяч событий - просьба перезагрузить список"""
+    await task_events.publish({"type": "resync", "user_ids": sorted(user_ids)})
+
+async def notify_users_changed():
+    """Вызывается после изменения состава или данных пользователей (меняет ETag списка)"""
+    await user_versions.bump(ALL_USERS_SCOPE)
+
+def get_current_super_admin(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if not current_user.is_super_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -98,35 +191,85 @@ def get_current_super_admin(current_user: User = Depends(get_current_user)) -> U
 def read_root():
     return {"message": "Gantt Chart API"}
 
+# Состояние пула, кэшей и ленты событий - gauges, обновляются при каждом запросе /metrics
+db_pool_gauge = registry.register(Gauge("db_pool_connections", "DB pool connections by state", ("state",)))
+db_pool_wait_gauge = registry.register(Gauge("db_pool_wait_seconds", "DB pool checkout wait", ("stat",)))
+db_pool_timeouts_gauge = registry.register(Gauge("db_pool_timeouts", "DB pool checkout timeouts"))
+cache_gauge = registry.register(Gauge("cache_events", "In-process cache hits, misses and evictions", ("cache", "event")))
+cache_size_gauge = registry.register(Gauge("cache_entries", "In-process cache size", ("cache",)))
+cache_bytes_gauge = registry.register(Gauge("cache_bytes", "In-process cache size in bytes", ("cache",)))
+task_events_gauge = registry.register(Gauge("task_event_subscribers", "Open /api/tasks/stream connections"))
+
+def collect_runtime_gauges():
+    pool = pool_status()
+    for state in ("checked_out", "checked_in", "overflow"):
+        if state in pool:
+            db_pool_gauge.set((state,), pool[state])
+    db_pool_wait_gauge.set(("avg",), pool["wait_avg_ms"] / 1000)
+    db_pool_wait_gauge.set(("max",), pool["wait_max_ms"] / 1000)
+    db_pool_timeouts_gauge.set((), pool["timeouts"])
+    for name, cache in (
+        ("tokens", token_cache), ("stats", stats_cache), ("layout", layout_cache), ("snapshots", snapshot_cache),
+    ):
+        for key in ("hits", "misses", "evictions"):
+            cache_gauge.set((name, key), getattr(cache, key))
+        cache_size_gauge.set((name,), len(cache))
+    cache_gauge.set(("snapshots", "invalidations"), snapshot_cache.invalidations)
+    cache_bytes_gauge.set(("snapshots",), snapshot_cache.bytes)
+    task_events_gauge.set((), task_events.stats()["subscribers"])
+
+registry.add_collector(collect_runtime_gauges)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/health")
-def health_check(db: Session = Depends(get_db)):
-    users_count = db.query(User).count()
-    return {"status": "ok", "users_count": users_count}
+async def health_check(db: AsyncSession = Depends(get_db)):
+    """Дешевая проверка: БД отвечает (SELECT 1, без чтения таблиц) плюс счетчики процесса"""
+    await db.execute(select(1))
+    return {
+        "status": "ok",
+        "tokens": token_stats(),
+        "stats_cache": stats_cache.stats(),
+        "layout_cache": layout_cache.stats(),
+        "snapshot_cache": snapshot_cache.stats(),
+        "shared_store": shared_store.stats(),
+        "password_hashing": password_hash_stats(),
+        "task_events": task_events.stats(),
+        "db_pool": pool_status(),
+    }
+
+@app.get("/api/months")
+def get_month_window():
+    """Окно месяцев диаграммы (GANTT_MONTHS): бит i в month_mask - месяц months[i]"""
+    return {"months": AVAILABLE_MONTHS, "names": {month: MONTH_NAMES[month] for month in AVAILABLE_MONTHS}}
 
 # ========== АВТОРИЗАЦИЯ ==========
 
 @app.post("/api/auth/login", response_model=Token, tags=["auth"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     try:
-        user = get_user_by_email(db, form_data.username)
+        user = await get_user_by_email(db, form_data.username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        if not verify_password(form_data.password, user.password_hash):
+        verified, new_hash = await verify_and_update_password(form_data.password, user.password_hash)
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.email, "is_super_admin": user.is_super_admin},
-            expires_delta=access_token_expires
-        )
-        return {"access_token": access_token, "token_type": "bearer"}
+        if new_hash:
+            # Число раундов изменилось - пересохраняем хэш с новыми параметрами
+            user.password_hash = new_hash
+            await db.commit()
+        return issue_tokens(user_db_to_auth(user))
     except HTTPException:
         raise
     except Exception as e:
@@ -136,7 +279,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
         )
 
 @app.get("/api/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: AuthUser = Depends(get_current_user)):
     return UserResponse(
         id=current_user.id,
         email=current_user.email,
@@ -145,6 +288,31 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         is_super_admin=current_user.is_super_admin
     )
 
+@app.post("/api/auth/refresh", response_model=Token, tags=["auth"])
+async def refresh_tokens(body: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Меняет refresh-токен на новую пару; старый refresh-токен отзывается"""
+    claims = await decode_token(body.refresh_token, REFRESH_TOKEN)
+    if claims is None:
+        raise credentials_exception()
+    user = await get_user_by_id(db, claims["uid"])
+    if user is None:
+        raise credentials_exception()
+    await revoke_token(claims)
+    return issue_tokens(user_db_to_auth(user))
+
+@app.post("/api/auth/logout", tags=["auth"])
+async def logout(body: Optional[RefreshRequest] = None, token: str = Depends(oauth2_scheme)):
+    """Отзывает текущий access-токен и, если передан, refresh-токен"""
+    claims = await decode_token(token)
+    if claims is None:
+        raise credentials_exception()
+    await revoke_token(claims)
+    if body is not None:
+        refresh_claims = await decode_token(body.refresh_token, REFRESH_TOKEN)
+        if refresh_claims is not None and refresh_claims["uid"] == claims["uid"]:
+            await revoke_token(refresh_claims)
+    return {"message": "Logged out"}
+
 class CredentialsUpdate(BaseModel):
     new_email: Optional[str] = None
     new_password: Optional[str] = None
@@ -152,47 +320,57 @@ class CredentialsUpdate(BaseModel):
 class PasswordReset(BaseModel):
     new_password: str
 
-@app.put("/api/auth/update-credentials")
+@app.put("/api/auth/update-credentials", response_model=Token)
 async def update_credentials(
     credentials: CredentialsUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = await get_user_by_id(db, current_user.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if credentials.new_email:
         # Проверяем, что email не занят другим пользователем
-        existing_user = get_user_by_email(db, credentials.new_email)
+        existing_user = await get_user_by_email(db, credentials.new_email)
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(status_code=400, detail="Email already in use")
         user.email = credentials.new_email
     
     if credentials.new_password:
-        user.password_hash = get_password_hash(credentials.new_password)
+        user.password_hash = await get_password_hash_async(credentials.new_password)
     
-    db.commit()
-    return {"message": "Credentials updated successfully"}
+    await db.commit()
+    # Старые токены (в том числе на других устройствах) больше не действуют,
+    # текущий клиент продолжает работу с новой парой
+    await revoke_user_tokens(user.id)
+    await notify_users_changed()
+    return issue_tokens(user_db_to_auth(user))
 
 # ========== УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ (только для супер-админа) ==========
 
 @app.get("/api/users", response_model=List[UserResponse])
 async def get_all_users(
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    users = db.query(User).all()
+    etag = await listing_etag(request, user_versions, ALL_USERS_SCOPE)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    users = (await db.scalars(select(User))).all()
     return [user_db_to_pydantic(u) for u in users]
 
 @app.post("/api/users", response_model=UserResponse)
 async def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
     # Проверяем, что email не занят
-    if get_user_by_email(db, user_data.email):
+    if await get_user_by_email(db, user_data.email):
         raise HTTPException(status_code=400, detail="Email already in use")
     
     new_user = User(
@@ -201,21 +379,22 @@ async def create_user(
         full_name=user_data.full_name,
         position=user_data.position,
         is_super_admin=False,
-        password_hash=get_password_hash(user_data.password)
+        password_hash=await get_password_hash_async(user_data.password)
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    await notify_users_changed()
     
     return user_db_to_pydantic(new_user)
 
 @app.get("/api/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user_db_to_pydantic(user)
@@ -224,10 +403,10 @@ async def get_user(
 async def update_user(
     user_id: str,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -236,7 +415,7 @@ async def update_user(
         raise HTTPException(status_code=403, detail="Cannot modify other super admin")
     
     if user_data.email:
-        existing_user = get_user_by_email(db, user_data.email)
+        existing_user = await get_user_by_email(db, user_data.email)
         if existing_user and existing_user.id != user_id:
             raise HTTPException(status_code=400, detail="Email already in use")
         user.email = user_data.email
@@ -248,80 +427,422 @@ async def update_user(
         user.position = user_data.position
     
     if user_data.password:
-        user.password_hash = get_password_hash(user_data.password)
+        user.password_hash = await get_password_hash_async(user_data.password)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    # Данные в access-токенах устарели; refresh-токены отзываются только при смене пароля
+    await revoke_user_tokens(user.id, refresh=bool(user_data.password))
+    await notify_users_changed()
     return user_db_to_pydantic(user)
 
 @app.delete("/api/users/{user_id}")
 async def delete_user(
     user_id: str,
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if user.is_super_admin:
         raise HTTPException(status_code=403, detail="Cannot delete super admin")
     
-    db.delete(user)
-    db.commit()
+    # Задачи пользователя удаляются в той же транзакции: tasks.user_id и tag_counts
+    # ссылаются на users, а суммы проектов (tag_totals) должны уменьшиться
+    owned = (await db.execute(
+        select(TaskDB.tag_id, TaskDB.user_id, TaskDB.completed, TaskDB.duration_type, TaskDB.end_date, TaskDB.end_time)
+        .where(TaskDB.user_id == user.id)
+    )).all()
+    await apply_count_changes(db, [(count_state(row), None) for row in owned])
+    owned_ids = select(TaskDB.id).where(TaskDB.user_id == user.id)
+    await db.execute(delete(SubTaskDB).where(SubTaskDB.task_id.in_(owned_ids)))
+    await db.execute(delete(TaskDB).where(TaskDB.user_id == user.id))
+    await delete_user_counts(db, user.id)
+    await db.delete(user)
+    await db.commit()
+    await revoke_user_tokens(user.id)
+    await notify_users_changed()
+    await notify_tasks_changed(user.id)
+    await publish_tasks_resync([user.id])
     return {"message": "User deleted successfully"}
 
 @app.post("/api/users/{user_id}/reset-password")
 async def reset_user_password(
     user_id: str,
     password_data: PasswordReset,
-    current_user: User = Depends(get_current_super_admin),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
+    user.password_hash = await get_password_hash_async(password_data.new_password)
+    await db.commit()
+    await revoke_user_tokens(user.id)
     return {"message": "Password reset successfully"}
 
 @app.get("/api/tasks", response_model=List[Task])
 async def get_tasks(
+    request: Request,
     user_id: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tag: Optional[str] = None,
+    completed: Optional[bool] = None,
+    duration_type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    month_from: Optional[int] = None,
+    month_to: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_TASKS_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    print(f"[GET TASKS] User: {current_user.email}, is_super_admin: {current_user.is_super_admin}, requested user_id: {user_id}")
+    """Список задач с фильтрами, keyset-пагинацией и проекцией полей.
+
+    Без limit возвращаются все подходящие задачи. С limit в заголовке
+    X-Next-Cursor приходит курсор следующей страницы (если она есть).
+    fields=id,name,... оставляет в ответе только перечисленные поля;
+    подзадачи загружаются только если запрошено поле subtasks.
+    Ответ несет ETag версии области видимости: при совпадении If-None-Match
+    возвращается 304 без запроса к БД и без сериализации.
+    Формат (JSON без null, колоночный JSON или MessagePack) выбирается по Accept.
+    Полный список области без фильтров отдается из snapshot_cache без запроса к БД.
+    """
+    fmt = negotiate_format(request.headers.get("accept"))
+    scope = get_tasks_scope(current_user, user_id)
+    etag = await listing_etag(request, task_versions, scope, fmt)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    snapshot_version = None
+    if not request.query_params.keys() - {"user_id"}:
+        # Версия читается до запроса к БД: запись после нее сменит версию, и снимок не подойдет
+        snapshot_version = (task_versions.epoch, await task_versions.get(scope))
+        body = snapshot_cache.get(scope, fmt, snapshot_version)
+        if body is not None:
+            log_context(snapshot=True)
+            return task_list_response(body, fmt, etag_headers(etag))
+    logger.debug("get tasks", extra={"is_super_admin": current_user.is_super_admin, "requested_user_id": user_id})
+    projection = None
+    if fields:
+        projection = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in projection if f not in Task.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    # Быстрый путь чтения: колонки вместо ORM-объектов, словари вместо Pydantic моделей
+    query = select(*TASK_COLUMNS, TaskDB.created_at)
+
     # Супер-админ может видеть все задачи или задачи конкретного пользователя
-    query = db.query(TaskDB).options(joinedload(TaskDB.subtasks))
-    
     if current_user.is_super_admin:
         if user_id:
-            tasks = query.filter(TaskDB.user_id == user_id).all()
-            print(f"[GET TASKS] Super admin filtering by user_id: {user_id}, found {len(tasks)} tasks")
-        else:
-            tasks = query.all()
-            print(f"[GET TASKS] Super admin viewing all tasks, found {len(tasks)} tasks")
+            query = query.where(TaskDB.user_id == user_id)
     else:
         # Обычный пользователь видит только свои задачи
-        tasks = query.filter(TaskDB.user_id == current_user.id).all()
-        print(f"[GET TASKS] Regular user viewing own tasks, found {len(tasks)} tasks")
-    
-    result = [task_db_to_pydantic(task) for task in tasks]
-    print(f"[GET TASKS] Returning {len(result)} tasks: {[t.name for t in result]}")
-    return result
+        query = query.where(TaskDB.user_id == current_user.id)
+
+    months = None
+    if month_from is not None or month_to is not None:
+        month_from = month_from if month_from is not None else month_to
+        month_to = month_to if month_to is not None else month_from
+        if not validate_month(month_from) or not validate_month(month_to):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Месяц должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
+            )
+        months = months_window(month_from, month_to)
+    query = apply_task_filters(
+        query,
+        tag=tag,
+        completed=completed,
+        duration_type=duration_type,
+        date_from=date_from,
+        date_to=date_to,
+        months=months,
+    )
+    try:
+        query = apply_task_cursor(query, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is not None:
+        # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+        query = query.limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    log_context(rows=len(rows))
+
+    tasks = [task_row_to_dict(row) for row in rows]
+    if projection is None or "subtasks" in projection:
+        subtasks = await load_subtask_dicts(db, [task["id"] for task in tasks])
+        for task in tasks:
+            task["subtasks"] = subtasks.get(task["id"], [])
+    if projection is not None:
+        tasks = [{field: task[field] for field in projection} for task in tasks]
+
+    headers = etag_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # Готовые словари отдаются как есть: response_model здесь только для документации
+    body = render_task_list(tasks, fmt)
+    if snapshot_version is not None:
+        snapshot_cache.set(scope, fmt, snapshot_version, body)
+    return task_list_response(body, fmt, headers)
+
+@app.get("/api/tasks/stats")
+async def get_task_stats(
+    user_id: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Агрегаты для дашборда: по проектам, пользователям, месяцам, выполненные и просроченные"""
+    scope = get_tasks_scope(current_user, user_id)
+    key = (scope, task_versions.epoch, await task_versions.get(scope))
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = await compute_task_stats(db, None if scope == ALL_TASKS_SCOPE else scope)
+        stats_cache.set(key, stats)
+    return stats
+
+@app.get("/api/tags")
+async def get_tags(
+    user_id: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Проекты со счетчиками задач: [{"id", "tag", "tasks", "completed", "overdue"}].
+
+    Счетчики хранятся в tag_counts и tag_totals и обновляются при записи задач;
+    просрочку пересчитывает фоновый tags.overdue_refresher, так что запрос только читает.
+    """
+    scope = get_tasks_scope(current_user, user_id)
+    return FastJSONResponse(content=await list_tags(db, None if scope == ALL_TASKS_SCOPE else scope))
 
-@app.get("/api/tasks/{task_id}", response_model=Task)
+@app.get("/api/tasks/calendar", response_model=List[Task])
+async def get_calendar_tasks(
+    request: Request,
+    date_from: date = Query(alias="from"),
+    date_to: date = Query(alias="to"),
+    user_id: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Задачи и подзадачи, период которых пересекается с окном from..to (для календаря).
+
+    Задачи в режиме дней сравниваются по start_date/end_date, в режиме месяцев -
+    по start_month/end_month с месяцами окна из AVAILABLE_MONTHS. Размер ответа
+    зависит от видимого окна, а не от всей истории задач.
+    """
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="Дата начала окна не может быть позже даты окончания")
+    if (date_to - date_from).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Окно календаря не больше {MAX_CALENDAR_DAYS} дней")
+    fmt = negotiate_format(request.headers.get("accept"))
+    etag = await listing_etag(request, task_versions, get_tasks_scope(current_user, user_id), fmt)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    query = select(*TASK_COLUMNS)
+    if current_user.is_super_admin:
+        if user_id:
+            query = query.where(TaskDB.user_id == user_id)
+    else:
+        query = query.where(TaskDB.user_id == current_user.id)
+    months = months_in_dates(date_from, date_to)
+    query = apply_task_filters(query, date_from=date_from, date_to=date_to, months=months)
+    rows = (await db.execute(query.order_by(TaskDB.created_at, TaskDB.id))).all()
+    log_context(rows=len(rows))
+
+    tasks = [task_row_to_dict(row) for row in rows]
+    # Подзадачи без собственного периода показываются вместе с задачей
+    subtask_window = or_(
+        period_overlap(SubTaskDB, date_from, date_to, months),
+        and_(SubTaskDB.start_date.is_(None), SubTaskDB.start_month.is_(None)),
+    )
+    subtasks = await load_subtask_dicts(db, [task["id"] for task in tasks], where=subtask_window)
+    for task in tasks:
+        task["subtasks"] = subtasks.get(task["id"], [])
+    return task_list_response(render_task_list(tasks, fmt), fmt, etag_headers(etag))
+
+@app.get("/api/tasks/search")
+async def search_tasks(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    mode: str = "tasks",
+    user_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Полнотекстовый поиск (см. search.py) по названиям задач, проектам и подзадачам.
+
+    mode=tasks - задачи по убыванию релевантности, у каждой поле match
+    (score и id совпавших подзадач); следующая страница - по курсору из X-Next-Cursor.
+    mode=tags - автодополнение проектов по префиксу: [{"tag", "tasks"}].
+    """
+    if mode not in ("tasks", "tags"):
+        raise HTTPException(status_code=400, detail="mode должен быть tasks или tags")
+    scope = get_tasks_scope(current_user, user_id)
+    owner = None if scope == ALL_TASKS_SCOPE else scope
+    etag = await listing_etag(request, task_versions, scope)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if mode == "tags":
+        tags = await suggest_tags(db, q, owner, min(limit, MAX_TAG_SUGGESTIONS))
+        return FastJSONResponse(content=tags, headers=etag_headers(etag))
+
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Лишняя строка показывает, есть ли следующая страница
+    matches = await search_task_ids(db, q, owner, limit + 1, offset)
+    has_more = len(matches) > limit
+    matches = matches[:limit]
+    log_context(rows=len(matches))
+
+    ids = [task_id for task_id, _, _ in matches]
+    rows = (await db.execute(select(*TASK_COLUMNS).where(TaskDB.id.in_(ids)))).all() if ids else []
+    by_id = {row.id: task_row_to_dict(row) for row in rows}
+    subtasks = await load_subtask_dicts(db, ids)
+    tasks = []
+    for task_id, score, subtask_ids in matches:
+        task = by_id.get(task_id)
+        if task is None:
+            continue
+        task["subtasks"] = subtasks.get(task_id, [])
+        task["match"] = {"score": score, "subtask_ids": subtask_ids}
+        tasks.append(task)
+
+    headers = etag_headers(etag)
+    if has_more:
+        headers["X-Next-Cursor"] = str(offset + limit)
+    return FastJSONResponse(content=drop_nulls(tasks), headers=headers)
+
+@app.get("/api/tasks/layout")
+async def get_gantt_layout(
+    request: Request,
+    user_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    completed: Optional[bool] = None,
+    duration_type: Optional[str] = None,
+    group_by: str = "none",
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Готовая раскладка Gantt-диаграммы (см. layout.py) для отфильтрованных задач.
+
+    Тело ответа кэшируется по (область, фильтры, версия области): пока задачи
+    области не менялись, раскладка не пересчитывается и не сериализуется заново.
+    """
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by должен быть одним из: {', '.join(GROUP_BY)}")
+    scope = get_tasks_scope(current_user, user_id)
+    etag = await listing_etag(request, task_versions, scope)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    key = (scope, tag, completed, duration_type, group_by, task_versions.epoch, await task_versions.get(scope))
+    body = layout_cache.get(key)
+    if body is None:
+        query = select(*TASK_COLUMNS)
+        if scope != ALL_TASKS_SCOPE:
+            query = query.where(TaskDB.user_id == scope)
+        query = apply_task_filters(query, tag=tag, completed=completed, duration_type=duration_type)
+        rows = (await db.execute(query.order_by(TaskDB.created_at, TaskDB.id))).all()
+        tasks = [task_row_to_dict(row) for row in rows]
+        subtasks = await load_subtask_dicts(db, [task["id"] for task in tasks])
+        for task in tasks:
+            task["subtasks"] = subtasks.get(task["id"], [])
+        body = dumps_json(build_gantt_layout(tasks, group_by))
+        layout_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
+
+@app.get("/api/tasks/export")
+async def export_tasks(
+    format: str = "html",
+    current_user: AuthUser = Depends(get_current_user)
+):
+    """Потоковый экспорт задач: html (таблица для Excel), csv или xlsx"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if format == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="XLSX export requires openpyxl")
+
+    # Фильтруем задачи в зависимости от пользователя
+    user_id = None if current_user.is_super_admin else current_user.id
+    media_type, filename = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        STREAMERS[format](user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.post("/api/tasks/stream/ticket")
+async def create_stream_ticket(token: str = Depends(oauth2_scheme)):
+    """Одноразовый короткий билет для подключения к /api/tasks/stream.
+
+    EventSource в браузере не умеет передавать заголовки, а access-токен в URL
+    попал бы в логи сервера и прокси. Билет действует STREAM_TICKET_TTL секунд
+    и одно подключение; за ним в общем хранилище лежит токен, который
+    проверяется при подключении, как обычно.
+    """
+    await authenticate_token(token)
+    ticket = secrets.token_urlsafe(24)
+    await shared_store.set(f"stream-ticket:{ticket}", token, STREAM_TICKET_TTL)
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_TTL}
+
+@app.get("/api/tasks/stream")
+async def stream_task_changes(
+    request: Request,
+    user_id: Optional[str] = None,
+    ticket: Optional[str] = None
+):
+    """Лента изменений задач (Server-Sent Events): created, updated, deleted, resync.
+
+    Авторизация - заголовком Authorization или билетом ?ticket= из
+    POST /api/tasks/stream/ticket (для EventSource). Область видимости - как у GET /api/tasks.
+    """
+    token = None
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[len("bearer "):]
+    elif ticket:
+        token = await shared_store.pop(f"stream-ticket:{ticket}")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    current_user = await authenticate_token(token)
+    return StreamingResponse(
+        stream_events(task_events, get_tasks_scope(current_user, user_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/tasks/{task_id}", response_model=Task, response_model_exclude_none=True)
 async def get_task(
     task_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    task = db.query(TaskDB).filter(TaskDB.id == task_id).first()
+    task = await get_task_by_id(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -335,20 +856,325 @@ def validate_month(month):
     """Валидация месяца - должен быть в списке доступных"""
     return month in AVAILABLE_MONTHS if month else False
 
-@app.post("/api/tasks")
+def validate_task_period(task: Task) -> Tuple[Optional[date], Optional[date]]:
+    """Проверяет период задачи в зависимости от режима.
+
+    Возвращает даты начала и окончания (для режима месяцев - None, None).
+    """
+    start_date = end_date = None
+    if task.duration_type == "months":
+        if not task.start_month or not validate_month(task.start_month):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Месяц начала должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
+            )
+        if not task.end_month or not validate_month(task.end_month):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Месяц конца должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
+            )
+    else:  # days
+        if not task.start_date or not task.end_date:
+            raise HTTPException(
+                status_code=400,
+                detail="Для режима дней необходимо указать дату начала и дату окончания"
+            )
+        try:
+            start_dt = datetime.strptime(task.start_date, "%Y-%m-%d")
+            end_dt = datetime.strptime(task.end_date, "%Y-%m-%d")
+            if start_dt > end_dt:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Дата начала не может быть позже даты окончания"
+                )
+            start_date, end_date = start_dt.date(), end_dt.date()
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Неверный формат даты. Используйте формат YYYY-MM-DD"
+            )
+    return start_date, end_date
+
+def task_month_mask(task: Task, start_date: Optional[date], end_date: Optional[date]) -> Optional[int]:
+    """Маска слотов AVAILABLE_MONTHS для провалидированного периода задачи"""
+    return period_mask(task.duration_type, task.start_month, task.end_month, start_date, end_date)
+
+def subtask_period(task: Task, start_date: Optional[date], end_date: Optional[date]) -> dict:
+    """Период, который подзадачи наследуют от основной задачи"""
+    return {
+        "start_month": task.start_month if task.duration_type == "months" else None,
+        "end_month": task.end_month if task.duration_type == "months" else None,
+        "start_date": start_date,
+        "end_date": end_date,
+        "month_mask": task_month_mask(task, start_date, end_date),
+    }
+
+def apply_task_fields(task_db: TaskDB, task: Task, start_date: Optional[date], end_date: Optional[date], tag_id: int):
+    """Переносит поля провалидированной задачи в запись БД (без подзадач); tag_id - id проекта task.tag"""
+    task_db.name = task.name
+    task_db.tag_id = tag_id
+    task_db.duration_type = task.duration_type
+    task_db.start_month = task.start_month
+    task_db.end_month = task.end_month
+    task_db.start_date = start_date
+    task_db.end_date = end_date
+    task_db.month_mask = task_month_mask(task, start_date, end_date)
+    task_db.end_time = task.end_time
+    task_db.completed = task.completed
+
+# Массовые операции с задачами: все элементы проверяются заранее,
+# запись идет одной транзакцией через executemany
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+def check_bulk_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Список задач пуст")
+    if len(items) > MAX_BULK_TASKS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {MAX_BULK_TASKS} задач за один запрос"
+        )
+
+def validation_error_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+def validate_bulk_task(data: Any) -> Tuple[Task, Optional[date], Optional[date]]:
+    """Те же проверки, что у одиночных create/update; ошибка - HTTPException с причиной"""
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Ожидается объект задачи")
+    try:
+        task = Task.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=validation_error_detail(e))
+    if not task.duration_type:
+        task.duration_type = "months"
+    start_date, end_date = validate_task_period(task)
+    return task, start_date, end_date
+
+def bulk_result(results: List[dict], done_status: str, atomic: bool) -> dict:
+    """Итог массовой операции; в атомарном режиме любая ошибка отменяет весь запрос"""
+    failed = sum(1 for result in results if result["status"] == "error")
+    if failed and atomic:
+        results = [
+            result if result["status"] == "error" else {"index": result["index"], "status": "skipped"}
+            for result in results
+        ]
+        raise HTTPException(
+            status_code=400,
+            detail={"message": f"Ошибок: {failed}, изменения не применены", "results": results}
+        )
+    return {done_status: len(results) - failed, "failed": failed, "results": results}
+
+async def load_tasks_for_bulk(db: AsyncSession, task_ids: List[str], with_subtasks: bool = False) -> dict:
+    """Загружает задачи по списку id частями, чтобы не упереться в лимит параметров"""
+    tasks = {}
+    for ids in chunked(list(dict.fromkeys(task_ids))):
+        query = select(TaskDB).where(TaskDB.id.in_(ids))
+        if with_subtasks:
+            query = query.options(selectinload(TaskDB.subtasks))
+        for task_db in (await db.scalars(query)).all():
+            tasks[task_db.id] = task_db
+    return tasks
+
+@app.post("/api/tasks/bulk")
+async def create_tasks_bulk(
+    items: List[Any] = Body(...),
+    atomic: bool = True,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Создает задачи списком. Порядок задач сохраняется (created_at растет по списку).
+
+    atomic=true (по умолчанию) - при ошибке хотя бы в одной задаче ничего не создается;
+    atomic=false - создаются корректные задачи, ошибки возвращаются по элементам.
+    """
+    check_bulk_size(items)
+    results, task_rows, subtask_rows = [], [], []
+    now = datetime.utcnow()
+    for index, data in enumerate(items):
+        try:
+            task, start_date, end_date = validate_bulk_task(data)
+        except HTTPException as e:
+            results.append({"index": index, "status": "error", "detail": e.detail})
+            continue
+        task_id = str(uuid.uuid4())
+        task_rows.append({
+            "id": task_id,
+            "name": task.name,
+            "tag": task.tag,
+            "duration_type": task.duration_type,
+            "start_month": task.start_month,
+            "end_month": task.end_month,
+            "start_date": start_date,
+            "end_date": end_date,
+            "month_mask": task_month_mask(task, start_date, end_date),
+            "end_time": task.end_time,
+            "completed": task.completed if task.completed is not None else False,
+            "user_id": current_user.id,
+            # Одинаковый created_at перемешал бы задачи при сортировке по (created_at, id)
+            "created_at": now + timedelta(microseconds=index),
+            "updated_at": now,
+        })
+        period = subtask_period(task, start_date, end_date)
+        for subtask_data in task.subtasks:
+            if subtask_data.name and subtask_data.name.strip():
+                subtask_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "name": subtask_data.name.strip(),
+                    "task_id": task_id,
+                    **period
+                })
+        results.append({"index": index, "status": "created", "id": task_id})
+
+    summary = bulk_result(results, "created", atomic)
+    if task_rows:
+        ids = await tag_ids(db, [row["tag"] for row in task_rows])
+        for row in task_rows:
+            row["tag_id"] = ids[row.pop("tag")]
+        await db.execute(insert(TaskDB), task_rows)
+        await apply_count_changes(db, [(None, count_state(row)) for row in task_rows])
+        if subtask_rows:
+            await db.execute(insert(SubTaskDB), subtask_rows)
+        await db.commit()
+        await notify_tasks_changed(current_user.id)
+        await publish_tasks_resync([current_user.id])
+    log_context(rows=summary["created"])
+    logger.info("bulk create", extra={"count": summary["created"], "failed": summary["failed"]})
+    return summary
+
+@app.put("/api/tasks/bulk")
+async def update_tasks_bulk(
+    items: List[Any] = Body(...),
+    atomic: bool = True,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Полное обновление задач списком (как PUT /api/tasks/{task_id}, id - в теле задачи).
+
+    Задачи обновляются одним executemany UPDATE, подзадачи всех задач
+    синхронизируются общими INSERT/UPDATE/DELETE.
+    """
+    check_bulk_size(items)
+    existing = await load_tasks_for_bulk(
+        db, [data["id"] for data in items if isinstance(data, dict) and isinstance(data.get("id"), str)],
+        with_subtasks=True
+    )
+    results, task_rows, seen = [], [], set()
+    old_states = []
+    subtask_changes = ([], [], [])
+    owners = set()
+    now = datetime.utcnow()
+    for index, data in enumerate(items):
+        try:
+            task, start_date, end_date = validate_bulk_task(data)
+            task_db = existing.get(task.id)
+            if task_db is None:
+                raise HTTPException(status_code=404, detail="Task not found")
+            if not current_user.is_super_admin and task_db.user_id != current_user.id:
+                raise HTTPException(status_code=403, detail="Not enough permissions")
+            if task.id in seen:
+                raise HTTPException(status_code=400, detail="Задача повторяется в списке")
+        except HTTPException as e:
+            results.append({"index": index, "status": "error", "detail": e.detail})
+            continue
+        seen.add(task.id)
+        owners.add(task_db.user_id)
+        completed = bool(task.completed)
+        # now - UTC для updated_at (как default в модели), completed_at - локальное время, как у /complete
+        completed_at = completed_at_after(task_db, completed)
+        old_states.append(count_state(task_db))
+        task_rows.append({
+            "id": task.id,
+            "name": task.name,
+            "tag": task.tag,
+            "duration_type": task.duration_type,
+            "start_month": task.start_month,
+            "end_month": task.end_month,
+            "start_date": start_date,
+            "end_date": end_date,
+            "month_mask": task_month_mask(task, start_date, end_date),
+            "end_time": task.end_time,
+            "completed": completed,
+            "completed_at": completed_at,
+            "updated_at": now,
+        })
+        for rows, changes in zip(subtask_changes, diff_subtasks(task_db, task.subtasks, subtask_period(task, start_date, end_date))):
+            rows.extend(changes)
+        results.append({"index": index, "status": "updated", "id": task.id})
+
+    summary = bulk_result(results, "updated", atomic)
+    if task_rows:
+        ids = await tag_ids(db, [row["tag"] for row in task_rows])
+        for row in task_rows:
+            row["tag_id"] = ids[row.pop("tag")]
+        await db.execute(update(TaskDB), task_rows)
+        await apply_count_changes(db, [
+            (old, count_state({**row, "user_id": old[1]})) for old, row in zip(old_states, task_rows)
+        ])
+        await write_subtask_changes(db, *subtask_changes)
+        await db.commit()
+        for owner in owners:
+            await notify_tasks_changed(owner)
+        await publish_tasks_resync(owners)
+    log_context(rows=summary["updated"])
+    logger.info("bulk update", extra={"count": summary["updated"], "failed": summary["failed"]})
+    return summary
+
+@app.delete("/api/tasks/bulk")
+async def delete_tasks_bulk(
+    request: BulkDeleteRequest,
+    atomic: bool = True,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Удаляет задачи (вместе с подзадачами) по списку id"""
+    check_bulk_size(request.ids)
+    existing = await load_tasks_for_bulk(db, request.ids)
+    results, to_delete = [], {}
+    for index, task_id in enumerate(request.ids):
+        task_db = existing.get(task_id)
+        if task_db is None:
+            results.append({"index": index, "status": "error", "id": task_id, "detail": "Task not found"})
+        elif not current_user.is_super_admin and task_db.user_id != current_user.id:
+            results.append({"index": index, "status": "error", "id": task_id, "detail": "Not enough permissions"})
+        elif task_id in to_delete:
+            results.append({"index": index, "status": "error", "id": task_id, "detail": "Задача повторяется в списке"})
+        else:
+            to_delete[task_id] = task_db.user_id
+            results.append({"index": index, "status": "deleted", "id": task_id})
+
+    summary = bulk_result(results, "deleted", atomic)
+    if to_delete:
+        await apply_count_changes(db, [(count_state(existing[task_id]), None) for task_id in to_delete])
+        for ids in chunked(list(to_delete)):
+            await db.execute(delete(SubTaskDB).where(SubTaskDB.task_id.in_(ids)))
+            await db.execute(delete(TaskDB).where(TaskDB.id.in_(ids)))
+        await db.commit()
+        owners = set(to_delete.values())
+        for owner in owners:
+            await notify_tasks_changed(owner)
+        await publish_tasks_resync(owners)
+    log_context(rows=summary["deleted"])
+    logger.info("bulk delete", extra={"count": summary["deleted"], "failed": summary["failed"]})
+    return summary
+
+@app.post("/api/tasks", response_model=Task, response_model_exclude_none=True)
 async def create_task(
     request: FastAPIRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # Получаем сырое тело запроса и парсим JSON вручную
         body_bytes = await request.body()
         try:
             body = json.loads(body_bytes.decode('utf-8'))
-            print(f"[CREATE TASK] User: {current_user.email}, Task data: {json.dumps(body, ensure_ascii=False)}")
+            logger.debug("create task", extra={"task_data": body})
         except json.JSONDecodeError as e:
-            print(f"[CREATE TASK ERROR] JSON decode error: {str(e)}")
+            logger.warning("create task: invalid JSON", extra={"error": str(e)})
             raise HTTPException(
                 status_code=400,
                 detail=f"Неверный формат JSON: {str(e)}"
@@ -370,48 +1196,20 @@ async def create_task(
             task.duration_type = "months"
         
         # Валидация в зависимости от типа периода
-        if task.duration_type == "months":
-            if not task.start_month or not validate_month(task.start_month):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Месяц начала должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
-                )
-            if not task.end_month or not validate_month(task.end_month):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Месяц конца должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
-                )
-        else:  # days
-            if not task.start_date or not task.end_date:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Для режима дней необходимо указать дату начала и дату окончания"
-                )
-            try:
-                start_dt = datetime.strptime(task.start_date, "%Y-%m-%d")
-                end_dt = datetime.strptime(task.end_date, "%Y-%m-%d")
-                if start_dt > end_dt:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Дата начала не может быть позже даты окончания"
-                    )
-            except ValueError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Неверный формат даты. Используйте формат YYYY-MM-DD"
-                )
+        start_date, end_date = validate_task_period(task)
         
         # Создаем задачу в БД
         task_id = str(uuid.uuid4())
         new_task = TaskDB(
             id=task_id,
             name=task.name,
-            tag=task.tag,
+            tag_id=(await tag_ids(db, [task.tag]))[task.tag],
             duration_type=task.duration_type,
             start_month=task.start_month,
             end_month=task.end_month,
-            start_date=task.start_date,
-            end_date=task.end_date,
+            start_date=start_date,
+            end_date=end_date,
+            month_mask=task_month_mask(task, start_date, end_date),
             end_time=task.end_time,
             completed=task.completed if task.completed is not None else False,
             user_id=current_user.id
@@ -426,35 +1224,36 @@ async def create_task(
                         id=str(uuid.uuid4()),
                         name=subtask_data.name.strip(),
                         task_id=task_id,
-                        start_month=task.start_month if task.duration_type == "months" else None,
-                        end_month=task.end_month if task.duration_type == "months" else None,
-                        start_date=task.start_date if task.duration_type == "days" else None,
-                        end_date=task.end_date if task.duration_type == "days" else None
+                        **subtask_period(task, start_date, end_date)
                     )
                     db.add(subtask)
         
-        db.commit()
-        db.refresh(new_task)
+        await apply_count_changes(db, [(None, count_state(new_task))])
+        await db.commit()
+        await notify_tasks_changed(current_user.id)
+        new_task = await get_task_by_id(db, task_id)
         result = task_db_to_pydantic(new_task)
-        print(f"[CREATE TASK SUCCESS] Task created: id={result.id}, name={result.name}, duration_type={result.duration_type}, user_id={current_user.id}")
+        await publish_task_event("created", current_user.id, task_id, result)
+        logger.info("task created", extra={"task_id": result.id, "duration_type": result.duration_type})
         return result
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        logger.exception("create task failed")
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при создании задачи: {str(e)}"
         )
 
-@app.put("/api/tasks/{task_id}", response_model=Task)
+@app.put("/api/tasks/{task_id}", response_model=Task, response_model_exclude_none=True)
 async def update_task(
     task_id: str,
     task: Task,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    existing_task = db.query(TaskDB).filter(TaskDB.id == task_id).first()
+    existing_task = await get_task_by_id(db, task_id)
     if not existing_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -463,75 +1262,79 @@ async def update_task(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     # Валидация в зависимости от типа периода
-    if task.duration_type == "months":
-        if not task.start_month or not validate_month(task.start_month):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Месяц начала должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
-            )
-        if not task.end_month or not validate_month(task.end_month):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Месяц конца должен быть одним из: {', '.join([MONTH_NAMES[m] for m in AVAILABLE_MONTHS])}"
-            )
-    else:  # days
-        if not task.start_date or not task.end_date:
-            raise HTTPException(
-                status_code=400,
-                detail="Для режима дней необходимо указать дату начала и дату окончания"
-            )
-        try:
-            start_dt = datetime.strptime(task.start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(task.end_date, "%Y-%m-%d")
-            if start_dt > end_dt:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Дата начала не может быть позже даты окончания"
-                )
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="Неверный формат даты. Используйте формат YYYY-MM-DD"
-            )
+    start_date, end_date = validate_task_period(task)
     
     # Обновляем задачу
-    existing_task.name = task.name
-    existing_task.tag = task.tag
-    existing_task.duration_type = task.duration_type
-    existing_task.start_month = task.start_month
-    existing_task.end_month = task.end_month
-    existing_task.start_date = task.start_date
-    existing_task.end_date = task.end_date
-    existing_task.end_time = task.end_time
-    existing_task.completed = task.completed
-    
-    # Удаляем старые подзадачи
-    db.query(SubTaskDB).filter(SubTaskDB.task_id == task_id).delete()
-    
-    # Создаем новые подзадачи
-    for subtask_data in task.subtasks:
-        subtask = SubTaskDB(
-            id=subtask_data.id if subtask_data.id else str(uuid.uuid4()),
-            name=subtask_data.name,
-            task_id=task_id,
-            start_month=task.start_month if task.duration_type == "months" else None,
-            end_month=task.end_month if task.duration_type == "months" else None,
-            start_date=task.start_date if task.duration_type == "days" else None,
-            end_date=task.end_date if task.duration_type == "days" else None
-        )
-        db.add(subtask)
+    old_state = count_state(existing_task)
+    existing_task.completed_at = completed_at_after(existing_task, task.completed)
+    apply_task_fields(existing_task, task, start_date, end_date, (await tag_ids(db, [task.tag]))[task.tag])
+    await apply_count_changes(db, [(old_state, count_state(existing_task))])
+    
+    # Подзадачи: только нужные INSERT/UPDATE/DELETE вместо удаления и вставки всех заново
+    await sync_subtasks(db, existing_task, task.subtasks, subtask_period(task, start_date, end_date))
     
-    db.commit()
-    db.refresh(existing_task)
-    return task_db_to_pydantic(existing_task)
+    await db.commit()
+    await notify_tasks_changed(existing_task.user_id)
+    existing_task = await get_task_by_id(db, task_id)
+    result = task_db_to_pydantic(existing_task)
+    await publish_task_event("updated", existing_task.user_id, task_id, result)
+    return result
+
+@app.patch("/api/tasks/{task_id}", response_model=Task, response_model_exclude_none=True)
+async def patch_task(
+    task_id: str,
+    patch: TaskPatch,
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Частичное обновление: меняются только переданные поля.
+
+    Подзадачи синхронизируются, только если передан список subtasks;
+    иначе при смене периода им обновляется унаследованный период.
+    """
+    existing_task = await get_task_by_id(db, task_id)
+    if not existing_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    # Проверяем права доступа
+    if not current_user.is_super_admin and existing_task.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    changes = patch.model_dump(exclude_unset=True)
+    try:
+        task = Task.model_validate({**task_db_to_pydantic(existing_task).model_dump(), **changes})
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=validation_error_detail(e))
+    if not task.duration_type:
+        task.duration_type = "months"
+    start_date, end_date = validate_task_period(task)
+    
+    old_period = {field: getattr(existing_task, field) for field in ("start_month", "end_month", "start_date", "end_date", "month_mask")}
+    old_state = count_state(existing_task)
+    existing_task.completed_at = completed_at_after(existing_task, task.completed)
+    apply_task_fields(existing_task, task, start_date, end_date, (await tag_ids(db, [task.tag]))[task.tag])
+    await apply_count_changes(db, [(old_state, count_state(existing_task))])
+    
+    period = subtask_period(task, start_date, end_date)
+    if "subtasks" in changes:
+        await sync_subtasks(db, existing_task, task.subtasks, period)
+    elif period != old_period and existing_task.subtasks:
+        await db.execute(update(SubTaskDB).where(SubTaskDB.task_id == task_id).values(**period))
+    
+    await db.commit()
+    await notify_tasks_changed(existing_task.user_id)
+    existing_task = await get_task_by_id(db, task_id)
+    result = task_db_to_pydantic(existing_task)
+    await publish_task_event("updated", existing_task.user_id, task_id, result)
+    return result
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(
     task_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    task = db.query(TaskDB).filter(TaskDB.id == task_id).first()
+    task = await get_task_by_id(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -539,18 +1342,30 @@ async def delete_task(
     if not current_user.is_super_admin and task.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    db.delete(task)
-    db.commit()
+    await apply_count_changes(db, [(count_state(task), None)])
+    await db.delete(task)
+    await db.commit()
+    await notify_tasks_changed(task.user_id)
+    await publish_task_event("deleted", task.user_id, task_id)
     return {"message": "Task deleted"}
 
-@app.patch("/api/tasks/{task_id}/complete")
+def completed_at_after(task_db: TaskDB, completed: Optional[bool]) -> Optional[datetime]:
+    """completed_at задачи после записи отметки completed (PUT, PATCH, bulk, /complete).
+
+    При смене отметки - текущее локальное время до минут или None; иначе прежнее значение.
+    """
+    if bool(completed) == bool(task_db.completed):
+        return task_db.completed_at
+    return datetime.now().replace(second=0, microsecond=0) if completed else None
+
+@app.patch("/api/tasks/{task_id}/complete", response_model=Task, response_model_exclude_none=True)
 async def toggle_task_complete(
     task_id: str,
     completed: bool,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    task = db.query(TaskDB).filter(TaskDB.id == task_id).first()
+    task = await get_task_by_id(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
@@ -558,116 +1373,26 @@ async def toggle_task_complete(
     if not current_user.is_super_admin and task.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    old_state = count_state(task)
+    task.completed_at = completed_at_after(task, completed)
     task.completed = completed
-    if completed:
-        # Сохраняем дату и время завершения
-        task.completed_at = datetime.now().strftime("%Y-%m-%d %H:%M")
-    else:
-        # Сбрасываем дату завершения при отмене
-        task.completed_at = None
+    await apply_count_changes(db, [(old_state, count_state(task))])
     
-    db.commit()
-    db.refresh(task)
-    return task_db_to_pydantic(task)
-
-def is_month_in_range(check_month, start_month, end_month):
-    """Проверяет, находится ли месяц в диапазоне (с учетом циклического порядка)"""
-    start_idx = AVAILABLE_MONTHS.index(start_month) if start_month in AVAILABLE_MONTHS else -1
-    end_idx = AVAILABLE_MONTHS.index(end_month) if end_month in AVAILABLE_MONTHS else -1
-    check_idx = AVAILABLE_MONTHS.index(check_month) if check_month in AVAILABLE_MONTHS else -1
-    
-    if start_idx == -1 or end_idx == -1 or check_idx == -1:
-        return False
-    
-    # Если диапазон не переходит через конец списка
-    if start_idx <= end_idx:
-        return start_idx <= check_idx <= end_idx
-    # Если диапазон переходит через конец списка (например, декабрь -> январь)
-    else:
-        return check_idx >= start_idx or check_idx <= end_idx
+    await db.commit()
+    await notify_tasks_changed(task.user_id)
+    # Проект (column_property) истекает при flush - перечитываем задачу, как в update_task
+    task = await get_task_by_id(db, task_id)
+    result = task_db_to_pydantic(task)
+    await publish_task_event("updated", task.user_id, task_id, result)
+    return result
 
-@app.get("/api/tasks/export/csv")
+@app.get("/api/tasks/export/csv", deprecated=True)
 async def export_tasks_csv(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: AuthUser = Depends(get_current_user)
 ):
-    import html
-    
-    # Создаем HTML таблицу, которую Excel может открыть с форматированием
-    html_content = []
-    html_content.append('<table border="1" cellpadding="5" cellspacing="0">')
-    
-    # Заголовки - такие же как в Gantt таблице
-    html_content.append('<tr>')
-    html_content.append('<th><b>Задача</b></th>')
-    html_content.append('<th><b>Проект</b></th>')
-    for month in AVAILABLE_MONTHS:
-        html_content.append(f'<th><b>{MONTH_NAMES[month]}</b></th>')
-    html_content.append('<th><b>Выполнено</b></th>')
-    html_content.append('</tr>')
-    
-    # Фильтруем задачи в зависимости от пользователя
-    if current_user.is_super_admin:
-        tasks = db.query(TaskDB).all()
-    else:
-        tasks = db.query(TaskDB).filter(TaskDB.user_id == current_user.id).all()
-    
-    filtered_tasks = [task_db_to_pydantic(task) for task in tasks]
-    
-    # Данные
-    for idx, task in enumerate(filtered_tasks):
-        start_month = task.start_month or AVAILABLE_MONTHS[0]
-        end_month = task.end_month or AVAILABLE_MONTHS[0]
-        completed = task.completed or False
-        
-        # Основная задача - жирным текстом
-        html_content.append('<tr>')
-        task_name = html.escape(task.name)
-        project_name = html.escape(task.tag)
-        completed_text = 'Да' if completed else 'Нет'
-        
-        html_content.append(f'<td><b>{task_name}</b></td>')
-        html_content.append(f'<td><b>{project_name}</b></td>')
-        
-        for month in AVAILABLE_MONTHS:
-            if is_month_in_range(month, start_month, end_month):
-                html_content.append('<td>X</td>')
-            else:
-                html_content.append('<td></td>')
-        
-        html_content.append(f'<td>{completed_text}</td>')
-        html_content.append('</tr>')
-        
-        # Подзадачи - тонким шрифтом
-        for subtask in task.subtasks:
-            st_start_month = subtask.start_month or start_month
-            st_end_month = subtask.end_month or end_month
-            
-            html_content.append('<tr>')
-            subtask_name = html.escape(subtask.name)
-            html_content.append(f'<td class="subtask" style="font-weight: 300; font-style: normal;">  └─ {subtask_name}</td>')
-            html_content.append('<td></td>')  # Пустая колонка для проекта
-            
-            for month in AVAILABLE_MONTHS:
-                if is_month_in_range(month, st_start_month, st_end_month):
-                    html_content.append('<td>X</td>')
-                else:
-                    html_content.append('<td></td>')
-            
-            html_content.append('<td></td>')  # Пустая колонка для "Выполнено"
-            html_content.append('</tr>')
-        
-        # Добавляем пустую строку между основными задачами (кроме последней)
-        if idx < len(filtered_tasks) - 1:
-            html_content.append('<tr>')
-            for _ in range(len(AVAILABLE_MONTHS) + 3):  # Задача, Проект, месяцы, Выполнено
-                html_content.append('<td></td>')
-            html_content.append('</tr>')
-    
-    html_content.append('</table>')
-    
-    # Возвращаем HTML контент (Excel может открыть HTML как таблицу)
-    return {"csv": ''.join(html_content), "format": "html"}
+    """Старый формат экспорта: HTML таблица внутри JSON. Используйте /api/tasks/export"""
+    user_id = None if current_user.is_super_admin else current_user.id
+    return {"csv": await legacy_html_table(user_id), "format": "html"}
 
 if __name__ == "__main__":
     import uvicorn
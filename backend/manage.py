@@ -0,0 +1,68 @@
+"""Команды развертывания
+
+    python manage.py migrate                  # миграции, супер-админ, маски месяцев
+    python manage.py serve --workers 4        # migrate, затем N воркеров uvicorn
+
+serve выполняет подготовку базы один раз в главном процессе и запускает
+воркеры с STARTUP_TASKS=0. С несколькими воркерами задайте общее хранилище
+(CACHE_BACKEND_URL=redis://...) и брокер событий (EVENTS_BROKER_URL=redis://...),
+иначе версии, отзыв токенов и лента изменений будут у каждого воркера свои.
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def migrate(args) -> None:
+    from startup import prepare_database
+
+    prepare_database()
+    print("database is up to date")
+
+
+def serve(args) -> None:
+    import uvicorn
+
+    migrate(args)
+    if args.workers > 1:
+        from store import CACHE_BACKEND_URL
+        from events import EVENTS_BROKER_URL
+
+        if not CACHE_BACKEND_URL or not EVENTS_BROKER_URL:
+            print(
+                "warning: CACHE_BACKEND_URL/EVENTS_BROKER_URL не заданы - "
+                "ETag, отзыв токенов и лента событий не будут общими для воркеров",
+                file=sys.stderr,
+            )
+    # Воркеры импортируют main заново и подготовку базы уже не повторяют
+    os.environ["STARTUP_TASKS"] = "0"
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=BACKEND_DIR,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gantt Chart API: развертывание")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrate", help="применить миграции и создать супер-админа").set_defaults(func=migrate)
+
+    serve_parser = commands.add_parser("serve", help="запустить воркеры uvicorn")
+    serve_parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    serve_parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    serve_parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    serve_parser.set_defaults(func=serve)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
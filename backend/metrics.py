@@ -0,0 +1,229 @@
+"""Метрики в текстовом формате Prometheus (GET /metrics)
+
+Счетчики живут в памяти процесса. MetricsMiddleware считает запросы по
+маршрутам (шаблон пути FastAPI, а не сырой путь - иначе id задач раздули бы
+число серий), задержку, запросы в обработке и коды ответов. События движка
+SQLAlchemy дают число запросов к БД и время в БД на каждый HTTP-запрос.
+"""
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from logging_config import log_context, route_template
+
+# Бакеты по умолчанию, как в клиентских библиотеках Prometheus (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Метка маршрута для запросов, не попавших ни в один маршрут (404)
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: Labels, value: float) -> None:
+        self._values[labels] = value
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [счетчики по бакетам..., сумма, количество]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        inf = 'le="+Inf"'
+        for labels, series in self._series.items():
+            for bound, count in zip(self.buckets, series):
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса; collectors - функции, обновляющие gauges перед выдачей"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status code", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed"))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "SQL statements executed"))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time"))
+db_queries_per_request = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements per HTTP request", ("method", "route"), QUERY_COUNT_BUCKETS))
+db_time_per_request = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in the database per HTTP request", ("method", "route")))
+
+# [число запросов к БД, время в БД] текущего HTTP-запроса
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db_metrics", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_queries_total.inc()
+    db_query_duration.observe((), elapsed)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # Запрос упал - after_cursor_execute не будет, снимаем отметку начала
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Подписывается на выполнение SQL (для async-движка передается engine.sync_engine)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: задержка, коды ответов, запросы в обработке, число запросов и время в БД"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope) or UNMATCHED_ROUTE
+        db_usage = [0, 0.0]
+        token = _request_db.set(db_usage)
+        status_code = 500
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            labels = (method, route)
+            http_request_duration.observe(labels, time.perf_counter() - started)
+            http_requests_total.inc((method, route, str(status_code)))
+            http_requests_in_flight.dec()
+            db_queries_per_request.observe(labels, db_usage[0])
+            db_time_per_request.observe(labels, db_usage[1])
+            log_context(db_queries=db_usage[0], db_ms=round(db_usage[1] * 1000, 2))
+            _request_db.reset(token)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,45 @@
+"""Окружение Alembic: миграции выполняются через синхронный движок из database.py"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import Base, engine
+
+config = context.config
+
+# При запуске из приложения (database.init_db) логирование не перенастраиваем
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Генерация SQL без подключения к базе (alembic upgrade --sql)"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite не умеет ALTER COLUMN - изменения выполняются пересозданием таблицы
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
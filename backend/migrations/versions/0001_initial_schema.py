@@ -0,0 +1,79 @@
+"""Исходная схема: users, tasks, subtasks
+
+Базы, созданные раньше через Base.metadata.create_all, уже содержат эти таблицы -
+для них миграция ничего не делает и только проставляет версию.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("full_name", sa.String(), nullable=False),
+            sa.Column("position", sa.String(), nullable=False),
+            sa.Column("is_super_admin", sa.Boolean(), nullable=True),
+            sa.Column("password_hash", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "tasks" not in existing:
+        op.create_table(
+            "tasks",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("tag", sa.String(), nullable=False),
+            sa.Column("duration_type", sa.String(), nullable=True),
+            sa.Column("start_month", sa.Integer(), nullable=True),
+            sa.Column("end_month", sa.Integer(), nullable=True),
+            sa.Column("start_date", sa.String(), nullable=True),
+            sa.Column("end_date", sa.String(), nullable=True),
+            sa.Column("end_time", sa.String(), nullable=True),
+            sa.Column("completed", sa.Boolean(), nullable=True),
+            sa.Column("completed_at", sa.String(), nullable=True),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_tasks_id", "tasks", ["id"])
+
+    if "subtasks" not in existing:
+        op.create_table(
+            "subtasks",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("task_id", sa.String(), nullable=False),
+            sa.Column("start_month", sa.Integer(), nullable=True),
+            sa.Column("end_month", sa.Integer(), nullable=True),
+            sa.Column("start_date", sa.String(), nullable=True),
+            sa.Column("end_date", sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(["task_id"], ["tasks.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_subtasks_id", "subtasks", ["id"])
+
+
+def downgrade():
+    op.drop_table("subtasks")
+    op.drop_table("tasks")
+    op.drop_table("users")
@@ -0,0 +1,79 @@
+"""Типизированные даты и индексы для фильтров задач
+
+start_date/end_date становятся Date, completed_at - DateTime.
+Добавляются составные индексы под списки задач пользователя,
+keyset-пагинацию, фильтры по датам/выполнению и subtasks(task_id).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+TASK_INDEXES = [
+    ("ix_tasks_user_id_created_at_id", ["user_id", "created_at", "id"]),
+    ("ix_tasks_created_at_id", ["created_at", "id"]),
+    ("ix_tasks_user_id_start_date", ["user_id", "start_date"]),
+    ("ix_tasks_user_id_completed", ["user_id", "completed"]),
+    ("ix_tasks_start_date_end_date", ["start_date", "end_date"]),
+    ("ix_tasks_tag", ["tag"]),
+]
+
+
+def upgrade():
+    is_sqlite = op.get_bind().dialect.name == "sqlite"
+
+    # Пустые строки раньше могли попадать в колонки дат - приводим их к NULL
+    for table in ("tasks", "subtasks"):
+        for column in ("start_date", "end_date"):
+            op.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+    op.execute("UPDATE tasks SET completed_at = NULL WHERE completed_at = ''")
+    if is_sqlite:
+        # В SQLite DateTime хранится строкой с секундами: 'YYYY-MM-DD HH:MM' -> 'YYYY-MM-DD HH:MM:00'
+        op.execute(sa.text(r"UPDATE tasks SET completed_at = completed_at || '\:00' WHERE length(completed_at) = 16"))
+
+    # SQLite хранит значения без строгих типов: строки YYYY-MM-DD уже читаются как Date,
+    # а пересоздание таблицы в batch-режиме превратило бы даты в числа через CAST
+    if not is_sqlite:
+        for table in ("tasks", "subtasks"):
+            for column in ("start_date", "end_date"):
+                op.alter_column(
+                    table, column, existing_type=sa.String(), type_=sa.Date(),
+                    postgresql_using=f"{column}::date",
+                )
+        op.alter_column(
+            "tasks", "completed_at", existing_type=sa.String(), type_=sa.DateTime(),
+            postgresql_using="completed_at::timestamp",
+        )
+
+    for name, columns in TASK_INDEXES:
+        op.create_index(name, "tasks", columns)
+    op.create_index("ix_subtasks_task_id", "subtasks", ["task_id"])
+
+
+def downgrade():
+    op.drop_index("ix_subtasks_task_id", table_name="subtasks")
+    for name, _ in reversed(TASK_INDEXES):
+        op.drop_index(name, table_name="tasks")
+
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE tasks SET completed_at = substr(completed_at, 1, 16) WHERE completed_at IS NOT NULL")
+        return
+
+    op.alter_column(
+        "tasks", "completed_at", existing_type=sa.DateTime(), type_=sa.String(),
+        postgresql_using="to_char(completed_at, 'YYYY-MM-DD HH24:MI')",
+    )
+    for table in ("subtasks", "tasks"):
+        for column in ("end_date", "start_date"):
+            op.alter_column(
+                table, column, existing_type=sa.Date(), type_=sa.String(),
+                postgresql_using=f"to_char({column}, 'YYYY-MM-DD')",
+            )
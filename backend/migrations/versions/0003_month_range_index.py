@@ -0,0 +1,26 @@
+"""Индекс под пересечение задач с окном месяцев
+
+Запрос календаря (/api/tasks/calendar) и фильтр month_from/month_to
+сравнивают пару (start_month, end_month) с конечным списком пар.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_tasks_user_id_start_month_end_month", "tasks", ["user_id", "start_month", "end_month"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_tasks_user_id_start_month_end_month", table_name="tasks")
@@ -0,0 +1,42 @@
+"""Битовые маски месяцев задач и подзадач
+
+month_mask - слоты AVAILABLE_MONTHS, которые занимает период. Значения
+заполняет приложение при старте (db_helpers.sync_month_masks): окно месяцев
+настраивается, и маски пересчитываются при каждой его смене.
+Индекс по паре (start_month, end_month) заменяется индексом по маске.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("month_mask", sa.Integer(), nullable=True))
+    op.add_column("subtasks", sa.Column("month_mask", sa.Integer(), nullable=True))
+    op.drop_index("ix_tasks_user_id_start_month_end_month", table_name="tasks")
+    op.create_index("ix_tasks_user_id_month_mask", "tasks", ["user_id", "month_mask"])
+    op.create_table(
+        "app_settings",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("value", sa.Text(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("app_settings")
+    op.drop_index("ix_tasks_user_id_month_mask", table_name="tasks")
+    op.create_index(
+        "ix_tasks_user_id_start_month_end_month", "tasks", ["user_id", "start_month", "end_month"]
+    )
+    # Без batch-режима: пересоздание таблицы в SQLite испортило бы даты (см. 0002)
+    op.drop_column("subtasks", "month_mask")
+    op.drop_column("tasks", "month_mask")
@@ -0,0 +1,120 @@
+"""Полнотекстовый поиск по названиям задач, проектам и подзадачам
+
+PostgreSQL: генерируемые столбцы search_vector (tsvector, конфигурация simple;
+название - вес A, проект - вес B) с GIN-индексами.
+SQLite: таблица FTS5 task_search (строка на задачу и на подзадачу) и таблица
+task_search_keys, которая связывает id задачи/подзадачи со строкой FTS5.
+Индекс поддерживается самой базой (триггеры), поэтому его не обходят ни
+массовые операции, ни запись в обход ORM. ё заменяется на е при индексации
+и в запросе (search.normalize_text).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def _pg_text(column: str) -> str:
+    return f"translate(coalesce({column}, ''), 'ёЁ', 'еЕ')"
+
+
+def _sqlite_text(column: str) -> str:
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+SQLITE_TRIGGERS = {
+    "tasks_search_insert": f"""
+        CREATE TRIGGER tasks_search_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_search_keys (doc_id) VALUES (new.id);
+            INSERT INTO task_search (rowid, name, tag, task_id, subtask_id)
+            VALUES (last_insert_rowid(), {_sqlite_text('new.name')}, {_sqlite_text('new.tag')}, new.id, NULL);
+        END""",
+    "tasks_search_update": f"""
+        CREATE TRIGGER tasks_search_update AFTER UPDATE OF name, tag ON tasks BEGIN
+            UPDATE task_search SET name = {_sqlite_text('new.name')}, tag = {_sqlite_text('new.tag')}
+            WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = new.id);
+        END""",
+    "tasks_search_delete": """
+        CREATE TRIGGER tasks_search_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_search WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = old.id);
+            DELETE FROM task_search_keys WHERE doc_id = old.id;
+        END""",
+    "subtasks_search_insert": f"""
+        CREATE TRIGGER subtasks_search_insert AFTER INSERT ON subtasks BEGIN
+            INSERT INTO task_search_keys (doc_id) VALUES (new.id);
+            INSERT INTO task_search (rowid, name, tag, task_id, subtask_id)
+            VALUES (last_insert_rowid(), {_sqlite_text('new.name')}, NULL, new.task_id, new.id);
+        END""",
+    "subtasks_search_update": f"""
+        CREATE TRIGGER subtasks_search_update AFTER UPDATE OF name, task_id ON subtasks BEGIN
+            UPDATE task_search SET name = {_sqlite_text('new.name')}, task_id = new.task_id
+            WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = new.id);
+        END""",
+    "subtasks_search_delete": """
+        CREATE TRIGGER subtasks_search_delete AFTER DELETE ON subtasks BEGIN
+            DELETE FROM task_search WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = old.id);
+            DELETE FROM task_search_keys WHERE doc_id = old.id;
+        END""",
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('simple', {_pg_text('name')}), 'A') || "
+            f"setweight(to_tsvector('simple', {_pg_text('tag')}), 'B')) STORED"
+        )
+        op.execute(
+            "ALTER TABLE subtasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('simple', {_pg_text('name')}), 'A')) STORED"
+        )
+        op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], postgresql_using="gin")
+        op.create_index("ix_subtasks_search_vector", "subtasks", ["search_vector"], postgresql_using="gin")
+        return
+
+    op.execute("CREATE TABLE task_search_keys (fts_rowid INTEGER PRIMARY KEY, doc_id VARCHAR NOT NULL UNIQUE)")
+    # prefix - дополнительные индексы префиксов длиной 2-4 для поиска по мере ввода
+    op.execute(
+        "CREATE VIRTUAL TABLE task_search USING fts5("
+        "name, tag, task_id UNINDEXED, subtask_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    )
+    # Ранжирование по умолчанию: совпадение в названии весит больше, чем в проекте
+    op.execute("INSERT INTO task_search (task_search, rank) VALUES ('rank', 'bm25(10.0, 4.0)')")
+
+    op.execute("INSERT INTO task_search_keys (doc_id) SELECT id FROM tasks")
+    op.execute("INSERT INTO task_search_keys (doc_id) SELECT id FROM subtasks")
+    op.execute(
+        "INSERT INTO task_search (rowid, name, tag, task_id, subtask_id) "
+        f"SELECT k.fts_rowid, {_sqlite_text('t.name')}, {_sqlite_text('t.tag')}, t.id, NULL "
+        "FROM tasks t JOIN task_search_keys k ON k.doc_id = t.id"
+    )
+    op.execute(
+        "INSERT INTO task_search (rowid, name, tag, task_id, subtask_id) "
+        f"SELECT k.fts_rowid, {_sqlite_text('s.name')}, NULL, s.task_id, s.id "
+        "FROM subtasks s JOIN task_search_keys k ON k.doc_id = s.id"
+    )
+    for ddl in SQLITE_TRIGGERS.values():
+        op.execute(ddl)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_subtasks_search_vector", table_name="subtasks")
+        op.drop_index("ix_tasks_search_vector", table_name="tasks")
+        op.execute("ALTER TABLE subtasks DROP COLUMN search_vector")
+        op.execute("ALTER TABLE tasks DROP COLUMN search_vector")
+        return
+
+    for name in SQLITE_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS task_search")
+    op.execute("DROP TABLE IF EXISTS task_search_keys")
@@ -0,0 +1,196 @@
+"""Справочник проектов и счетчики задач по проектам
+
+tasks.tag (строка в каждой задаче) заменяется ссылкой tasks.tag_id на таблицу
+tags. Таблица tag_counts хранит для каждой пары (проект, владелец) число
+задач, выполненных и просроченных; дальше ее поддерживает приложение
+(tags.apply_count_changes). Просроченные здесь не считаются: next_deadline -
+ближайший срок открытой задачи, и первое чтение /api/tags пересчитает их.
+
+Поиск (0005) индексировал tasks.tag: триггеры FTS5 в SQLite и search_vector
+в PostgreSQL теперь берут название проекта из tags. Названия проектов не
+меняются (новое название - новая строка tags), поэтому триггера на tags не нужно.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _pg_text(column: str) -> str:
+    return f"translate(coalesce({column}, ''), 'ёЁ', 'еЕ')"
+
+
+def _sqlite_text(column: str) -> str:
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+TAG_NAME = "(SELECT name FROM tags WHERE id = new.tag_id)"
+
+# Не меняется, но пересоздается вместе с остальными: batch_alter_table удаляет триггеры таблицы
+TASKS_SEARCH_DELETE = """
+        CREATE TRIGGER tasks_search_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_search WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = old.id);
+            DELETE FROM task_search_keys WHERE doc_id = old.id;
+        END"""
+
+SQLITE_TRIGGERS = {
+    "tasks_search_insert": f"""
+        CREATE TRIGGER tasks_search_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_search_keys (doc_id) VALUES (new.id);
+            INSERT INTO task_search (rowid, name, tag, task_id, subtask_id)
+            VALUES (last_insert_rowid(), {_sqlite_text('new.name')}, {_sqlite_text(TAG_NAME)}, new.id, NULL);
+        END""",
+    "tasks_search_update": f"""
+        CREATE TRIGGER tasks_search_update AFTER UPDATE OF name, tag_id ON tasks BEGIN
+            UPDATE task_search SET name = {_sqlite_text('new.name')}, tag = {_sqlite_text(TAG_NAME)}
+            WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = new.id);
+        END""",
+    "tasks_search_delete": TASKS_SEARCH_DELETE,
+}
+
+# Триггеры 0005 - для downgrade
+SQLITE_TRIGGERS_0005 = {
+    "tasks_search_insert": f"""
+        CREATE TRIGGER tasks_search_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_search_keys (doc_id) VALUES (new.id);
+            INSERT INTO task_search (rowid, name, tag, task_id, subtask_id)
+            VALUES (last_insert_rowid(), {_sqlite_text('new.name')}, {_sqlite_text('new.tag')}, new.id, NULL);
+        END""",
+    "tasks_search_update": f"""
+        CREATE TRIGGER tasks_search_update AFTER UPDATE OF name, tag ON tasks BEGIN
+            UPDATE task_search SET name = {_sqlite_text('new.name')}, tag = {_sqlite_text('new.tag')}
+            WHERE rowid = (SELECT fts_rowid FROM task_search_keys WHERE doc_id = new.id);
+        END""",
+    "tasks_search_delete": TASKS_SEARCH_DELETE,
+}
+
+# search_vector задачи: генерируемый столбец не может читать другую таблицу,
+# поэтому его заполняет триггер
+PG_SEARCH_FUNCTION = f"""
+    CREATE FUNCTION tasks_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', {_pg_text('NEW.name')}), 'A') ||
+            setweight(to_tsvector('simple', {_pg_text('(SELECT name FROM tags WHERE id = NEW.tag_id)')}), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql"""
+
+
+def _deadline(dialect: str) -> str:
+    """Срок задачи строкой YYYY-MM-DD HH:MM (как tags.deadline_key)"""
+    end_date = "to_char(end_date, 'YYYY-MM-DD')" if dialect == "postgresql" else "end_date"
+    return f"{end_date} || ' ' || coalesce(end_time, '18:00')"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    if dialect == "postgresql":
+        op.drop_index("ix_tasks_search_vector", table_name="tasks")
+        op.execute("ALTER TABLE tasks DROP COLUMN search_vector")
+        op.add_column("tasks", sa.Column("tag_id", sa.Integer(), nullable=True))
+        op.create_foreign_key("fk_tasks_tag_id_tags", "tasks", "tags", ["tag_id"], ["id"])
+    else:
+        # NOT NULL и внешний ключ SQLite добавляет только пересозданием таблицы - после заполнения
+        op.add_column("tasks", sa.Column("tag_id", sa.Integer(), nullable=True))
+
+    op.execute("INSERT INTO tags (name) SELECT DISTINCT tag FROM tasks")
+    op.execute("UPDATE tasks SET tag_id = (SELECT id FROM tags WHERE tags.name = tasks.tag)")
+
+    if dialect == "postgresql":
+        op.alter_column("tasks", "tag_id", nullable=False)
+        op.execute("ALTER TABLE tasks ADD COLUMN search_vector tsvector")
+        op.execute(PG_SEARCH_FUNCTION)
+        op.execute(
+            "CREATE TRIGGER tasks_search_vector BEFORE INSERT OR UPDATE OF name, tag_id ON tasks "
+            "FOR EACH ROW EXECUTE FUNCTION tasks_search_vector()"
+        )
+        # UPDATE OF name запускает триггер и заполняет search_vector
+        op.execute("UPDATE tasks SET name = name")
+        op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], postgresql_using="gin")
+        op.drop_index("ix_tasks_tag", table_name="tasks")
+        op.drop_column("tasks", "tag")
+    else:
+        # Пересоздание таблицы (batch) удаляет ее триггеры: триггеры 0005 читают tasks.tag,
+        # новые создаются после пересоздания
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.drop_index("ix_tasks_tag", table_name="tasks")
+        with op.batch_alter_table("tasks") as batch:
+            batch.drop_column("tag")
+            batch.alter_column("tag_id", existing_type=sa.Integer(), nullable=False)
+            batch.create_foreign_key("fk_tasks_tag_id_tags", "tags", ["tag_id"], ["id"])
+        for ddl in SQLITE_TRIGGERS.values():
+            op.execute(ddl)
+
+    op.create_index("ix_tasks_user_id_tag_id", "tasks", ["user_id", "tag_id"])
+
+    op.create_table(
+        "tag_counts",
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("tasks", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("overdue", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_deadline", sa.String(), nullable=True),
+        sa.Column("as_of", sa.String(), nullable=False, server_default=""),
+    )
+    op.create_index("ix_tag_counts_user_id", "tag_counts", ["user_id"])
+    op.create_index("ix_tag_counts_next_deadline", "tag_counts", ["next_deadline"])
+    op.execute(
+        "INSERT INTO tag_counts (tag_id, user_id, tasks, completed, overdue, next_deadline, as_of) "
+        "SELECT tag_id, user_id, count(*), "
+        "sum(CASE WHEN completed THEN 1 ELSE 0 END), 0, "
+        f"min(CASE WHEN NOT completed AND duration_type = 'days' AND end_date IS NOT NULL "
+        f"THEN {_deadline(dialect)} END), '' "
+        "FROM tasks GROUP BY tag_id, user_id"
+    )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    op.drop_table("tag_counts")
+
+    op.add_column("tasks", sa.Column("tag", sa.String(), nullable=True))
+    op.execute("UPDATE tasks SET tag = (SELECT name FROM tags WHERE tags.id = tasks.tag_id)")
+    op.create_index("ix_tasks_tag", "tasks", ["tag"])
+    op.drop_index("ix_tasks_user_id_tag_id", table_name="tasks")
+
+    if dialect == "postgresql":
+        op.alter_column("tasks", "tag", nullable=False)
+        op.drop_index("ix_tasks_search_vector", table_name="tasks")
+        op.execute("DROP TRIGGER tasks_search_vector ON tasks")
+        op.execute("DROP FUNCTION tasks_search_vector()")
+        op.execute("ALTER TABLE tasks DROP COLUMN search_vector")
+        op.drop_constraint("fk_tasks_tag_id_tags", "tasks", type_="foreignkey")
+        op.execute(
+            "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('simple', {_pg_text('name')}), 'A') || "
+            f"setweight(to_tsvector('simple', {_pg_text('tag')}), 'B')) STORED"
+        )
+        op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], postgresql_using="gin")
+        op.drop_column("tasks", "tag_id")
+    else:
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        with op.batch_alter_table("tasks") as batch:
+            batch.alter_column("tag", existing_type=sa.String(), nullable=False)
+            batch.drop_constraint("fk_tasks_tag_id_tags", type_="foreignkey")
+            batch.drop_column("tag_id")
+        for ddl in SQLITE_TRIGGERS_0005.values():
+            op.execute(ddl)
+
+    op.drop_table("tags")
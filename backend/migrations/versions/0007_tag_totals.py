@@ -0,0 +1,36 @@
+"""Счетчики проектов по всем владельцам
+
+tag_totals - суммы tag_counts по проекту: список проектов для области "все
+задачи" читается без GROUP BY. Дальше таблицу поддерживает приложение
+вместе с tag_counts (tags.apply_count_changes, tags.refresh_overdue).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tag_totals",
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True),
+        sa.Column("tasks", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("overdue", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO tag_totals (tag_id, tasks, completed, overdue) "
+        "SELECT tag_id, sum(tasks), sum(completed), sum(overdue) FROM tag_counts GROUP BY tag_id"
+    )
+
+
+def downgrade():
+    op.drop_table("tag_totals")
@@ -0,0 +1,47 @@
+"""Название проекта для подсказок
+
+tags.search_name - название в нижнем регистре, ё -> е, слова через пробел
+(tags.tag_search_name): подсказки проектов ищут префиксы слов по справочнику
+проектов, а не по задачам. lower() в SQLite не меняет регистр кириллицы,
+поэтому значение считается здесь и в приложении, а не в SQL.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+_WORD = re.compile(r"\w+")
+
+
+def _search_name(name: str) -> str:
+    """То же, что tags.tag_search_name"""
+    return " ".join(_WORD.findall(name.replace("ё", "е").replace("Ё", "Е").lower()))
+
+
+def upgrade():
+    # NOT NULL с пустым значением по умолчанию: SQLite добавляет такой столбец без
+    # пересборки tags (пересборку не переживают триггеры поиска из 0005/0006)
+    op.add_column("tags", sa.Column("search_name", sa.String(), nullable=False, server_default=""))
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, name FROM tags")).all()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE tags SET search_name = :search_name WHERE id = :id"),
+            [{"id": row.id, "search_name": _search_name(row.name)} for row in rows],
+        )
+    if bind.dialect.name != "sqlite":
+        op.alter_column("tags", "search_name", existing_type=sa.String(), server_default=None)
+
+
+def downgrade():
+    op.drop_column("tags", "search_name")
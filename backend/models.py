@@ -9,6 +9,7 @@ class SubTask(BaseModel):
     end_month: Optional[int] = Field(default=None)    # Месяц из AVAILABLE_MONTHS (для режима месяцев)
     start_date: Optional[str] = Field(default=None)   # Дата начала в формате YYYY-MM-DD (для режима дней)
     end_date: Optional[str] = Field(default=None)     # Дата окончания в формате YYYY-MM-DD (для режима дней)
+    month_mask: Optional[int] = Field(default=None)   # Занятые слоты AVAILABLE_MONTHS битами (вычисляет сервер)
     
     model_config = ConfigDict(
         from_attributes=True,
@@ -33,6 +34,7 @@ class Task(BaseModel):
     end_month: Optional[int] = Field(default=None)    # Месяц из AVAILABLE_MONTHS (для режима месяцев)
     start_date: Optional[str] = Field(default=None)   # Дата начала в формате YYYY-MM-DD (для режима дней)
     end_date: Optional[str] = Field(default=None)     # Дата окончания в формате YYYY-MM-DD (для режима дней)
+    month_mask: Optional[int] = Field(default=None)   # Занятые слоты AVAILABLE_MONTHS битами (вычисляет сервер)
     end_time: Optional[str] = Field(default="18:00")  # Время окончания по умолчанию 18:00
     completed: Optional[bool] = Field(default=False)  # Отметка о выполнении
     completed_at: Optional[str] = Field(default=None)  # Дата и время завершения задачи в формате YYYY-MM-DD HH:MM
@@ -78,3 +80,24 @@ class Task(BaseModel):
         extra='allow'  # Разрешаем дополнительные поля
     )
 
+
+class TaskPatch(BaseModel):
+    """Частичное обновление задачи (PATCH): передаются только изменяемые поля"""
+    name: Optional[str] = None
+    tag: Optional[str] = None
+    duration_type: Optional[str] = None
+    start_month: Optional[int] = None
+    end_month: Optional[int] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    end_time: Optional[str] = None
+    completed: Optional[bool] = None
+    subtasks: Optional[List[SubTask]] = None
+
+    @field_validator('name', 'tag', 'duration_type', 'completed')
+    @classmethod
+    def reject_null(cls, v, info):
+        # Поле можно не передавать, но null в обязательном поле задачи - ошибка
+        if v is None:
+            raise ValueError(f"{info.field_name} не может быть null")
+        return v
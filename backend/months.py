@@ -0,0 +1,131 @@
+"""Доступные месяцы Gantt-диаграммы и работа с циклическими диапазонами месяцев
+
+Окно месяцев задается переменной окружения GANTT_MONTHS (по умолчанию
+"12,1,2,3,4,5,6,7" - декабрь..июль) в порядке отображения.
+
+Период задачи хранится еще и битовой маской month_mask: бит i установлен,
+если задача занимает слот AVAILABLE_MONTHS[i]. Проверка "задача идет в марте"
+сводится к mask & bit, а фильтр в SQL - к IN по конечному списку масок.
+"""
+import os
+from datetime import date
+from typing import Iterable, List, Optional
+
+MONTH_NAMES = {
+    1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
+    5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
+    9: "Сентябрь", 10: "Октябрь", 11: "Ноябрь", 12: "Декабрь"
+}
+
+
+def parse_months(value: str) -> List[int]:
+    """"12,1,2" -> [12, 1, 2]; месяцы 1..12 без повторов"""
+    months = [int(item) for item in value.split(",") if item.strip()]
+    if not months or len(set(months)) != len(months) or any(not 1 <= month <= 12 for month in months):
+        raise ValueError(f"GANTT_MONTHS: ожидается список разных месяцев 1..12, получено {value!r}")
+    return months
+
+
+# Доступные месяцы в порядке отображения
+AVAILABLE_MONTHS = parse_months(os.getenv("GANTT_MONTHS", "12,1,2,3,4,5,6,7"))
+# Месяц -> номер слота (бита маски)
+MONTH_SLOTS = {month: slot for slot, month in enumerate(AVAILABLE_MONTHS)}
+# Ключ окна: при его смене маски в БД пересчитываются (см. db_helpers.sync_month_masks)
+MONTH_WINDOW_KEY = ",".join(str(month) for month in AVAILABLE_MONTHS)
+
+
+def month_bit(month: int) -> int:
+    """Бит слота месяца (0, если месяца нет в окне)"""
+    slot = MONTH_SLOTS.get(month)
+    return 0 if slot is None else 1 << slot
+
+
+def months_mask(months: Iterable[int]) -> int:
+    mask = 0
+    for month in months:
+        mask |= month_bit(month)
+    return mask
+
+
+def mask_months(mask: int) -> List[int]:
+    """Месяцы окна, занятые маской, в порядке AVAILABLE_MONTHS"""
+    return [month for slot, month in enumerate(AVAILABLE_MONTHS) if mask >> slot & 1]
+
+
+def month_range_mask(start_month: int, end_month: int) -> int:
+    """Маска циклического диапазона start_month..end_month (0, если месяцев нет в окне)"""
+    start_idx = MONTH_SLOTS.get(start_month)
+    end_idx = MONTH_SLOTS.get(end_month)
+    if start_idx is None or end_idx is None:
+        return 0
+    if start_idx <= end_idx:
+        return (1 << (end_idx + 1)) - (1 << start_idx)
+    # Диапазон переходит через конец списка (например, декабрь -> январь)
+    return ((1 << len(AVAILABLE_MONTHS)) - (1 << start_idx)) | ((1 << (end_idx + 1)) - 1)
+
+
+def is_month_in_range(check_month, start_month, end_month):
+    """Проверяет, находится ли месяц в диапазоне (с учетом циклического порядка)"""
+    return bool(month_range_mask(start_month, end_month) & month_bit(check_month))
+
+
+def months_in_dates(date_from: date, date_to: date) -> List[int]:
+    """Доступные месяцы, которые задевает окно дат date_from..date_to, в порядке AVAILABLE_MONTHS.
+
+    Задачи в режиме месяцев хранят только номер месяца без года, поэтому окно
+    длиной в год и больше задевает все доступные месяцы.
+    """
+    covered = set()
+    year, month = date_from.year, date_from.month
+    while (year, month) <= (date_to.year, date_to.month) and len(covered) < 12:
+        covered.add(month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return [month for month in AVAILABLE_MONTHS if month in covered]
+
+
+def period_mask(
+    duration_type: Optional[str],
+    start_month: Optional[int],
+    end_month: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date],
+) -> Optional[int]:
+    """Маска периода задачи или подзадачи; None, если период не задан.
+
+    Режим месяцев - циклический диапазон start_month..end_month,
+    режим дней - месяцы окна, которые задевают даты start_date..end_date.
+    """
+    if duration_type == "days":
+        if start_date is None or end_date is None:
+            return None
+        return months_mask(months_in_dates(start_date, end_date))
+    if start_month is None or end_month is None:
+        return None
+    return month_range_mask(start_month, end_month)
+
+
+def _possible_masks() -> List[int]:
+    # Маски диапазонов месяцев и маски отрезков календаря (режим дней):
+    # отрезок - не больше 12 подряд идущих месяцев, пересеченных с окном
+    masks = {month_range_mask(start, end) for start in AVAILABLE_MONTHS for end in AVAILABLE_MONTHS}
+    for first in range(1, 13):
+        for length in range(1, 13):
+            masks.add(months_mask((first - 1 + i) % 12 + 1 for i in range(length)))
+    masks.discard(0)
+    return sorted(masks)
+
+
+# Все маски, которые может получить задача: их немного, поэтому фильтр
+# "задевает месяц" в SQL - это IN по списку, который использует индекс
+POSSIBLE_MASKS = _possible_masks()
+
+
+def masks_touching(months: Iterable[int]) -> List[int]:
+    """Возможные маски, занимающие хотя бы один из месяцев"""
+    wanted = months_mask(months)
+    return [mask for mask in POSSIBLE_MASKS if mask & wanted]
+
+
+def months_window(month_from: int, month_to: int) -> List[int]:
+    """Месяцы окна month_from..month_to в порядке AVAILABLE_MONTHS (с переходом через конец списка)"""
+    return mask_months(month_range_mask(month_from, month_to))
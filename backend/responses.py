@@ -0,0 +1,132 @@
+"""Быстрые ответы для списков: сериализация через orjson и выбор формата по Accept
+
+Списки задач отдаются в одном из форматов:
+- json (по умолчанию) - список задач без полей со значением null: у задачи
+  в режиме месяцев нет дат, в режиме дней - месяцев;
+- columnar (application/vnd.gantt.columnar+json) - имена полей один раз,
+  значения столбцами, как строки раскладки в layout.py:
+  {"count", "tasks": {поле: [...]}, "subtasks": {"task": [номер задачи], поле: [...]}};
+- msgpack (application/msgpack) - те же данные, что в json, в двоичном виде;
+  доступен, если установлен пакет msgpack.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # без orjson - стандартный json, ответ тот же
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # без msgpack формат не предлагается
+    msgpack = None
+
+JSON_TYPE = "application/json"
+COLUMNAR_TYPE = "application/vnd.gantt.columnar+json"
+MSGPACK_TYPE = "application/msgpack"
+
+# Media type из Accept -> формат
+MEDIA_TYPES = {
+    JSON_TYPE: "json",
+    COLUMNAR_TYPE: "columnar",
+    MSGPACK_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+FORMAT_MEDIA_TYPES = {"json": JSON_TYPE, "columnar": COLUMNAR_TYPE, "msgpack": MSGPACK_TYPE}
+
+
+def dumps_json(content: Any) -> bytes:
+    """JSON-совместимое значение -> байты ответа (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Отдает уже готовые словари без jsonable_encoder и повторной валидации response_model.
+
+    Содержимое должно состоять из JSON-совместимых типов (даты - строками).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def available_formats() -> tuple:
+    return ("json", "columnar", "msgpack") if msgpack is not None else ("json", "columnar")
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Формат списка по заголовку Accept (с учетом q); неизвестное и */* - json"""
+    if not accept:
+        return "json"
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranges.append((-q, position, media_type.lower()))
+    formats = available_formats()
+    for _, _, media_type in sorted(ranges):
+        fmt = MEDIA_TYPES.get(media_type)
+        if fmt in formats:
+            return fmt
+        if media_type in ("*/*", "application/*"):
+            return "json"
+    return "json"
+
+
+def drop_nulls(tasks: List[dict]) -> List[dict]:
+    """Задачи (и их подзадачи) без полей со значением None"""
+    result = []
+    for task in tasks:
+        compact = {key: value for key, value in task.items() if value is not None}
+        if "subtasks" in compact:
+            compact["subtasks"] = [
+                {key: value for key, value in subtask.items() if value is not None}
+                for subtask in compact["subtasks"]
+            ]
+        result.append(compact)
+    return result
+
+
+def to_columnar(tasks: List[dict]) -> dict:
+    """Список задач -> столбцы; подзадачи - отдельной таблицей со ссылкой на номер задачи"""
+    fields = [key for key in tasks[0] if key != "subtasks"] if tasks else []
+    columns: Dict[str, list] = {field: [task[field] for task in tasks] for field in fields}
+    result = {"count": len(tasks), "tasks": columns}
+    if tasks and "subtasks" in tasks[0]:
+        subtask_fields = next((list(task["subtasks"][0]) for task in tasks if task["subtasks"]), ["id"])
+        subtasks: Dict[str, list] = {"task": [], **{field: [] for field in subtask_fields}}
+        for index, task in enumerate(tasks):
+            for subtask in task["subtasks"]:
+                subtasks["task"].append(index)
+                for field in subtask_fields:
+                    subtasks[field].append(subtask[field])
+        result["subtasks"] = subtasks
+    return result
+
+
+def render_task_list(tasks: List[dict], fmt: str) -> bytes:
+    """Тело ответа со списком задач в формате fmt (см. negotiate_format)"""
+    if fmt == "columnar":
+        return dumps_json(to_columnar(tasks))
+    if fmt == "msgpack":
+        return msgpack.packb(drop_nulls(tasks), use_bin_type=True)
+    return dumps_json(drop_nulls(tasks))
+
+
+def task_list_response(body: bytes, fmt: str, headers: Optional[dict] = None) -> Response:
+    """Ответ с готовым телом render_task_list; Vary: Accept - формат зависит от заголовка"""
+    headers = {**(headers or {}), "Vary": "Accept"}
+    return Response(content=body, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,131 @@
+"""Полнотекстовый поиск по задачам и подзадачам (GET /api/tasks/search)
+
+Индексы создают миграции 0005 и 0006: в PostgreSQL - столбцы search_vector
+с GIN, в SQLite - таблица FTS5 task_search; название проекта берется из
+справочника tags. Индексы поддерживает сама база, поэтому здесь только запросы.
+Каждое слово запроса ищется как префикс ("отч прод" находит "Отчет по
+продажам"), все слова должны совпасть. Подсказки проектов ищут по справочнику
+tags (tags.search_name) и счетчикам tag_counts / tag_totals.
+
+Результат - задачи по убыванию релевантности (score); совпадение в подзадаче
+находит ее задачу, а id совпавших подзадач возвращаются рядом.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tags import tag_search_name
+
+# Больше слов в запросе не учитывается
+MAX_SEARCH_TERMS = 8
+# Совпадение в подзадаче весит меньше, чем в самой задаче (PostgreSQL)
+SUBTASK_WEIGHT = 0.5
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(value: str) -> str:
+    """Та же нормализация, что при индексации: ё -> е"""
+    return value.replace("ё", "е").replace("Ё", "Е")
+
+
+def search_terms(query: str) -> List[str]:
+    """Слова запроса без служебных символов FTS5/tsquery"""
+    return _WORD.findall(normalize_text(query))[:MAX_SEARCH_TERMS]
+
+
+def fts5_query(terms: List[str], column: Optional[str] = None) -> str:
+    """["отч", "прод"] -> '"отч"* "прод"*' (каждое слово - префикс, все обязательны)"""
+    query = " ".join(f'"{term}"*' for term in terms)
+    return f"{column} : ({query})" if column else query
+
+
+def ts_query(terms: List[str], weights: str = "") -> str:
+    """["отч", "прод"] -> 'отч:* & прод:*'; weights ограничивает поиск столбцами с весом (B - проект)"""
+    return " & ".join(f"{term}:*{weights}" for term in terms)
+
+
+async def search_task_ids(
+    db: AsyncSession,
+    query: str,
+    user_id: Optional[str],
+    limit: int,
+    offset: int = 0,
+) -> List[Tuple[str, float, List[str]]]:
+    """Страница результатов: [(task_id, score, id совпавших подзадач)], лучшие первыми"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    params = {"limit": limit, "offset": offset, "user_id": user_id}
+    owner = "AND t.user_id = :user_id" if user_id is not None else ""
+    if db.bind.dialect.name == "postgresql":
+        params["q"] = ts_query(terms)
+        sql = f"""
+            SELECT task_id, max(score) AS score,
+                   array_remove(array_agg(subtask_id), NULL) AS subtask_ids
+            FROM (
+                SELECT t.id AS task_id, NULL AS subtask_id, ts_rank(t.search_vector, q) AS score
+                FROM tasks t, to_tsquery('simple', :q) q
+                WHERE t.search_vector @@ q {owner}
+                UNION ALL
+                SELECT s.task_id, s.id, ts_rank(s.search_vector, q) * {SUBTASK_WEIGHT}
+                FROM subtasks s JOIN tasks t ON t.id = s.task_id, to_tsquery('simple', :q) q
+                WHERE s.search_vector @@ q {owner}
+            ) matches
+            GROUP BY task_id
+            ORDER BY score DESC, task_id
+            LIMIT :limit OFFSET :offset
+        """
+        rows = (await db.execute(text(sql), params)).all()
+        return [(row.task_id, float(row.score), list(row.subtask_ids or [])) for row in rows]
+
+    # SQLite FTS5: rank - bm25 с весами из миграции (чем меньше, тем лучше)
+    params["q"] = fts5_query(terms)
+    join = "JOIN tasks t ON t.id = task_search.task_id" if user_id is not None else ""
+    sql = f"""
+        SELECT task_search.task_id AS task_id, min(task_search.rank) AS rank,
+               group_concat(task_search.subtask_id) AS subtask_ids
+        FROM task_search {join}
+        WHERE task_search MATCH :q {owner}
+        GROUP BY task_search.task_id
+        ORDER BY rank, task_search.task_id
+        LIMIT :limit OFFSET :offset
+    """
+    rows = (await db.execute(text(sql), params)).all()
+    # Без округления: на маленьком корпусе bm25 порядка 1e-6, и округление уравняло бы результаты
+    return [
+        (row.task_id, -row.rank, row.subtask_ids.split(",") if row.subtask_ids else [])
+        for row in rows
+    ]
+
+
+async def suggest_tags(db: AsyncSession, query: str, user_id: Optional[str], limit: int) -> List[dict]:
+    """Проекты, в названии которых есть слова с префиксами из запроса; самые частые первыми.
+
+    Ищет по справочнику tags (tags.search_name), число задач берет из
+    tag_counts владельца или из tag_totals для всех задач - задачи не читаются.
+    """
+    terms = [tag_search_name(term) for term in search_terms(query)]
+    if not terms:
+        return []
+    params = {"limit": limit, "user_id": user_id}
+    conditions = []
+    for i, term in enumerate(terms):
+        # Префикс слова: перед словом в search_name всегда пробел; в словах есть только "_" из спецсимволов LIKE
+        params[f"t{i}"] = "% " + term.replace("_", "\\_") + "%"
+        conditions.append(f"(' ' || g.search_name) LIKE :t{i} ESCAPE '\\'")
+    if user_id is not None:
+        counts = "JOIN tag_counts c ON c.tag_id = g.id AND c.user_id = :user_id"
+    else:
+        counts = "JOIN tag_totals c ON c.tag_id = g.id"
+    sql = f"""
+        SELECT g.name AS tag, c.tasks AS tasks
+        FROM tags g {counts}
+        WHERE c.tasks > 0 AND {" AND ".join(conditions)}
+        ORDER BY c.tasks DESC, g.name
+        LIMIT :limit
+    """
+    rows = (await db.execute(text(sql), params)).all()
+    return [{"tag": row.tag, "tasks": row.tasks} for row in rows]
@@ -0,0 +1,107 @@
+"""Подготовка базы при запуске: миграции, супер-админ, пересчет масок месяцев
+
+Выполняется один раз на развертывание - командой `python manage.py migrate`
+перед запуском воркеров (`manage.py serve` делает это сам) - или при старте
+каждого воркера (STARTUP_TASKS=1, по умолчанию). Во втором случае воркеры
+выполняют подготовку по очереди под межпроцессной блокировкой: advisory lock
+в PostgreSQL или блокировка файла рядом с базой SQLite.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+from typing import Optional
+
+from sqlalchemy import select, text
+
+from auth import get_password_hash
+from database import engine, async_engine, AsyncSessionLocal, init_db, env_flag, is_memory_sqlite, DATABASE_URL, User
+from db_helpers import sync_month_masks
+from logging_config import get_logger
+
+# Выполнять ли подготовку при старте приложения (manage.py serve выключает ее в воркерах)
+STARTUP_TASKS = env_flag("STARTUP_TASKS", "1")
+# Ключ advisory lock PostgreSQL (любое число, общее для всех воркеров)
+STARTUP_LOCK_KEY = 0x47414E54
+
+ADMIN_EMAIL = "admin@admin.ru"
+ADMIN_PASSWORD = "admin123"
+
+logger = get_logger("startup")
+
+
+class StartupLock:
+    """Межпроцессная блокировка на время подготовки базы"""
+
+    def __init__(self):
+        self._connection = None
+        self._file = None
+
+    def _lock_path(self) -> str:
+        database = engine.url.database
+        if not database or is_memory_sqlite(DATABASE_URL):
+            return os.path.join(tempfile.gettempdir(), "gantt-startup.lock")
+        return os.path.abspath(database) + ".lock"
+
+    def acquire(self) -> None:
+        if engine.dialect.name == "postgresql":
+            self._connection = engine.connect()
+            self._connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+            return
+        import fcntl
+        self._file = open(self._lock_path(), "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        if self._connection is not None:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": STARTUP_LOCK_KEY})
+            self._connection.close()
+            self._connection = None
+        if self._file is not None:
+            import fcntl
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+async def init_super_admin(db) -> Optional[User]:
+    """Создает супер-админа, если его еще нет"""
+    if await db.scalar(select(User).where(User.email == ADMIN_EMAIL)):
+        return None
+    admin_user = User(
+        id=str(uuid.uuid4()),
+        email=ADMIN_EMAIL,
+        full_name="Супер Администратор",
+        position="Супер Администратор",
+        is_super_admin=True,
+        password_hash=get_password_hash(ADMIN_PASSWORD),
+    )
+    db.add(admin_user)
+    await db.commit()
+    logger.info("super admin created", extra={"email": ADMIN_EMAIL})
+    return admin_user
+
+
+async def _seed() -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await init_super_admin(db)
+            await sync_month_masks(db)
+    finally:
+        # Соединения этого event loop не должны попасть в пул основного
+        await async_engine.dispose()
+
+
+def prepare_database() -> None:
+    """Миграции (alembic upgrade head), супер-админ и маски месяцев под блокировкой.
+
+    Синхронная функция со своим event loop: вызывается из manage.py или
+    в отдельном потоке при старте приложения.
+    """
+    lock = StartupLock()
+    lock.acquire()
+    try:
+        init_db()
+        asyncio.run(_seed())
+    finally:
+        lock.release()
@@ -0,0 +1,98 @@
+"""Агрегированная статистика по задачам для дашборда (считается в SQL)"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Task as TaskDB, SubTask as SubTaskDB
+from months import AVAILABLE_MONTHS
+from tags import list_tags
+
+
+def _scoped(query, user_id: Optional[str]):
+    if user_id is not None:
+        query = query.where(TaskDB.user_id == user_id)
+    return query
+
+
+async def compute_task_stats(db: AsyncSession, user_id: Optional[str] = None) -> dict:
+    """Считает агрегаты по задачам пользователя (или по всем задачам, если user_id=None).
+
+    Просроченными считаются незавершенные задачи в режиме дней,
+    у которых end_date + end_time уже в прошлом.
+    """
+    completed_count = func.sum(case((TaskDB.completed == True, 1), else_=0))  # noqa: E712
+    now = datetime.now()
+    today, now_time = now.date(), now.strftime("%H:%M")
+    # Срок прошел: день окончания в прошлом или сегодня, но время окончания уже наступило
+    past_deadline = (TaskDB.end_date < today) | (
+        (TaskDB.end_date == today) & (func.coalesce(TaskDB.end_time, "18:00") < now_time)
+    )
+
+    totals = (await db.execute(_scoped(
+        select(
+            func.count(TaskDB.id),
+            completed_count,
+            func.sum(case(
+                (
+                    (TaskDB.completed == False)  # noqa: E712
+                    & (TaskDB.duration_type == "days")
+                    & past_deadline,
+                    1,
+                ),
+                else_=0,
+            )),
+        ),
+        user_id,
+    ))).one()
+    total_tasks, completed, overdue = totals[0], totals[1] or 0, totals[2] or 0
+
+    total_subtasks = await db.scalar(_scoped(
+        select(func.count(SubTaskDB.id)).join(TaskDB, SubTaskDB.task_id == TaskDB.id),
+        user_id,
+    ))
+
+    # Счетчики проектов поддерживаются при записи задач (tags.py) - без GROUP BY по задачам
+    by_tag = await list_tags(db, user_id)
+
+    by_user = (await db.execute(_scoped(
+        select(TaskDB.user_id, func.count(TaskDB.id), completed_count)
+        .group_by(TaskDB.user_id),
+        user_id,
+    ))).all()
+
+    # Группируем по маске месяцев - различных масок немного (months.POSSIBLE_MASKS),
+    # поэтому разложить их по месяцам дешево. Маску несут задачи в обоих режимах:
+    # у задачи в режиме дней это месяцы окна, которые задевают ее даты
+    month_masks = (await db.execute(_scoped(
+        select(TaskDB.month_mask, func.count(TaskDB.id))
+        .where(TaskDB.month_mask.is_not(None))
+        .group_by(TaskDB.month_mask),
+        user_id,
+    ))).all()
+    by_month = {month: 0 for month in AVAILABLE_MONTHS}
+    for mask, count in month_masks:
+        for slot, month in enumerate(AVAILABLE_MONTHS):
+            if mask >> slot & 1:
+                by_month[month] += count
+
+    return {
+        "total_tasks": total_tasks,
+        "total_subtasks": total_subtasks or 0,
+        "completed": completed,
+        "open": total_tasks - completed,
+        "overdue": overdue,
+        "by_tag": [
+            {"tag": tag["tag"], "tasks": tag["tasks"], "completed": tag["completed"] or 0}
+            for tag in by_tag
+        ],
+        "by_user": [
+            {"user_id": owner, "tasks": count, "completed": done or 0}
+            for owner, count, done in by_user
+        ],
+        "by_month": [
+            {"month": month, "tasks": by_month[month]}
+            for month in AVAILABLE_MONTHS
+        ],
+    }
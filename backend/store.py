@@ -0,0 +1,117 @@
+"""Общее состояние воркеров: версии данных (ETag, ключи кэшей) и отзыв токенов
+
+MemoryStore хранит все в памяти процесса - для одного воркера и для тестов.
+RedisStore (CACHE_BACKEND_URL=redis://...) держит состояние в Redis, и все
+воркеры видят одни и те же версии и отзывы; пакет redis нужен только в этом режиме.
+"""
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+CACHE_BACKEND_URL = os.getenv("CACHE_BACKEND_URL", "")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "gantt:")
+
+# Ключ, под которым в общем хранилище лежит epoch версий
+EPOCH_KEY = "epoch"
+
+
+class MemoryStore:
+    """Счетчики и значения с TTL в памяти процесса"""
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self):
+        # Счетчики начинаются заново при перезапуске - epoch отличает их от прошлых
+        self.epoch = uuid.uuid4().hex[:8]
+        self._counters: Dict[str, int] = {}
+        # key -> (value, когда истекает)
+        self._values: Dict[str, tuple] = {}
+        self._next_purge = 0.0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def incr(self, key: str) -> int:
+        value = self._counters.get(key, 0) + 1
+        self._counters[key] = value
+        return value
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._values[key] = (value, time.time() + ttl)
+
+    async def pop(self, key: str) -> Optional[str]:
+        """Значение и его удаление одной операцией (одноразовые ключи)"""
+        item = self._values.pop(key, None)
+        return item[0] if item is not None and item[1] > time.time() else None
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        now = time.time()
+        if now >= self._next_purge:
+            self._values = {key: item for key, item in self._values.items() if item[1] > now}
+            self._next_purge = now + self.PURGE_INTERVAL
+        result = []
+        for key in keys:
+            item = self._values.get(key)
+            result.append(item[0] if item is not None and item[1] > now else None)
+        return result
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "epoch": self.epoch, "counters": len(self._counters), "values": len(self._values)}
+
+
+class RedisStore:
+    """Состояние в Redis: одно на все воркеры и переживает их перезапуск"""
+
+    def __init__(self, url: str, prefix: str = CACHE_KEY_PREFIX):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("Для CACHE_BACKEND_URL=redis://... установите пакет redis")
+        self.url = url
+        self.prefix = prefix
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.epoch: Optional[str] = None
+
+    async def start(self) -> None:
+        # Первый воркер задает epoch, остальные его читают. Если Redis очищен,
+        # epoch будет новым и ETag, выданные до очистки, не совпадут
+        await self._redis.set(self.prefix + EPOCH_KEY, uuid.uuid4().hex[:8], nx=True)
+        self.epoch = await self._redis.get(self.prefix + EPOCH_KEY)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+    async def incr(self, key: str) -> int:
+        return await self._redis.incr(self.prefix + key)
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._redis.get(self.prefix + key) or 0)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._redis.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def pop(self, key: str) -> Optional[str]:
+        return await self._redis.getdel(self.prefix + key)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[str]]:
+        return await self._redis.mget([self.prefix + key for key in keys])
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "epoch": self.epoch}
+
+
+def make_store(url: str = CACHE_BACKEND_URL):
+    if url.startswith(("redis://", "rediss://")):
+        return RedisStore(url)
+    return MemoryStore()
+
+
+# Общее хранилище процесса: start() при запуске приложения, close() при остановке
+shared_store = make_store()
@@ -0,0 +1,364 @@
+"""Справочник проектов и счетчики задач по проектам (GET /api/tags)
+
+Задача ссылается на проект по tags.id. Для каждой пары (проект, владелец)
+tag_counts хранит число задач, выполненных и просроченных. Обработчики
+записи меняют счетчики в той же транзакции, что и задачи
+(apply_count_changes): список проектов читается без агрегации по задачам.
+
+Для области "все задачи" те же счетчики по проекту хранит tag_totals
+(суммы tag_counts по владельцам): GET /api/tags читает готовые строки.
+
+Просрочка зависит от времени, а не только от записи. Счетчик overdue верен
+на момент as_of, next_deadline - ближайший срок открытой задачи после as_of.
+Пока next_deadline не наступил, overdue актуален; иначе refresh_overdue
+пересчитывает просрочку только таких проектов (по индексу ix_tasks_user_id_tag_id).
+refresh_overdue вызывает фоновый OverdueRefresher раз в OVERDUE_REFRESH_SECONDS,
+поэтому чтение списка проектов ничего не пишет.
+"""
+import asyncio
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, case, cast, func, insert, literal, or_, select, tuple_, update, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import AsyncSessionLocal, Tag, TagCount, TagTotal, Task as TaskDB
+from db_helpers import chunked
+from logging_config import get_logger
+
+logger = get_logger("tags")
+
+# Как часто пересчитывать просрочку проектов, у которых наступил срок задачи (0 - не пересчитывать)
+OVERDUE_REFRESH_SECONDS = float(os.getenv("OVERDUE_REFRESH_SECONDS", "60"))
+
+# Время окончания задачи в режиме дней, если оно не задано
+DEFAULT_END_TIME = "18:00"
+
+# Состояние задачи для счетчиков: (tag_id, user_id, completed, срок или None)
+CountState = Tuple[int, str, bool, Optional[str]]
+
+# Запись идет через Core-таблицы: executemany с выражениями, без ORM bulk по первичному ключу
+_tags = Tag.__table__
+_counts = TagCount.__table__
+_totals = TagTotal.__table__
+
+
+def now_key(now: Optional[datetime] = None) -> str:
+    """Текущий момент в формате сроков: YYYY-MM-DD HH:MM (локальное время, как в stats.py)"""
+    return (now or datetime.now()).strftime("%Y-%m-%d %H:%M")
+
+
+def deadline_key(duration_type: str, completed: bool, end_date: Optional[date], end_time: Optional[str]) -> Optional[str]:
+    """Срок открытой задачи в режиме дней строкой YYYY-MM-DD HH:MM; строки сравниваются как моменты"""
+    if completed or duration_type != "days" or end_date is None:
+        return None
+    return f"{end_date.isoformat()} {end_time or DEFAULT_END_TIME}"
+
+
+_WORD = re.compile(r"\w+")
+
+
+def tag_search_name(name: str) -> str:
+    """Название проекта для подсказок: "Отчёт  по-продажам" -> "отчет по продажам" """
+    return " ".join(_WORD.findall(name.replace("ё", "е").replace("Ё", "Е").lower()))
+
+
+def count_state(task) -> CountState:
+    """Состояние для счетчиков из записи TaskDB или словаря строки INSERT/UPDATE"""
+    field = task.get if isinstance(task, dict) else lambda name: getattr(task, name)
+    completed = bool(field("completed"))
+    return (
+        field("tag_id"), field("user_id"), completed,
+        deadline_key(field("duration_type"), completed, field("end_date"), field("end_time")),
+    )
+
+
+async def tag_ids(db, names: Iterable[str]) -> Dict[str, int]:
+    """id проектов по названиям; недостающие создаются (INSERT ... ON CONFLICT DO NOTHING)"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    found = dict((await db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names)))).all())
+    missing = [name for name in names if name not in found]
+    if missing:
+        dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        await db.execute(
+            dialect_insert(_tags).on_conflict_do_nothing(index_elements=["name"]),
+            [{"name": name, "search_name": tag_search_name(name)} for name in missing],
+        )
+        found.update((await db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing)))).all())
+    return found
+
+
+# Один executemany UPDATE на все затронутые пары (проект, владелец)
+_COUNT_UPDATE = (
+    update(_counts)
+    .where(_counts.c.tag_id == bindparam("b_tag_id"), _counts.c.user_id == bindparam("b_user_id"))
+    .values(
+        tasks=_counts.c.tasks + bindparam("d_tasks"),
+        completed=_counts.c.completed + bindparam("d_completed"),
+        overdue=_counts.c.overdue + bindparam("d_overdue"),
+        next_deadline=case(
+            (bindparam("deadline", type_=String).is_(None), _counts.c.next_deadline),
+            (
+                or_(_counts.c.next_deadline.is_(None), bindparam("deadline", type_=String) < _counts.c.next_deadline),
+                bindparam("deadline", type_=String),
+            ),
+            else_=_counts.c.next_deadline,
+        ),
+    )
+)
+
+
+_TOTAL_UPDATE = (
+    update(_totals)
+    .where(_totals.c.tag_id == bindparam("b_tag_id"))
+    .values(
+        tasks=_totals.c.tasks + bindparam("d_tasks"),
+        completed=_totals.c.completed + bindparam("d_completed"),
+        overdue=_totals.c.overdue + bindparam("d_overdue"),
+    )
+)
+
+
+async def apply_count_changes(db, changes: Iterable[Tuple[Optional[CountState], Optional[CountState]]]) -> None:
+    """Переносит изменения задач в tag_counts: пары (было, стало), None - задачи нет.
+
+    Вызывается до commit в той же транзакции, что и запись задач.
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+    keys = {state[:2] for pair in changes for state in pair if state is not None}
+    as_of = await _ensure_rows(db, keys)
+
+    deltas: Dict[Tuple[int, str], dict] = {}
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            key = state[:2]
+            delta = deltas.setdefault(key, {"d_tasks": 0, "d_completed": 0, "d_overdue": 0, "deadline": None})
+            delta["d_tasks"] += sign
+            delta["d_completed"] += sign * state[2]
+            deadline = state[3]
+            if deadline is None:
+                continue
+            if deadline < as_of[key]:
+                delta["d_overdue"] += sign
+            elif sign > 0 and (delta["deadline"] is None or deadline < delta["deadline"]):
+                # Ушедший срок next_deadline не сдвигает: лишний пересчет дешевле поиска следующего
+                delta["deadline"] = deadline
+    rows = [
+        {"b_tag_id": tag_id, "b_user_id": user_id, **delta}
+        for (tag_id, user_id), delta in deltas.items()
+        if delta["d_tasks"] or delta["d_completed"] or delta["d_overdue"] or delta["deadline"]
+    ]
+    if rows:
+        await db.execute(_COUNT_UPDATE, rows)
+
+    totals: Dict[int, dict] = {}
+    for (tag_id, _), delta in deltas.items():
+        total = totals.setdefault(tag_id, {"d_tasks": 0, "d_completed": 0, "d_overdue": 0})
+        for field in total:
+            total[field] += delta[field]
+    await _ensure_totals(db, list(totals))
+    rows = [{"b_tag_id": tag_id, **total} for tag_id, total in totals.items() if any(total.values())]
+    if rows:
+        await db.execute(_TOTAL_UPDATE, rows)
+
+
+async def _ensure_totals(db, tag_id_list: List[int]) -> None:
+    """Создает недостающие строки tag_totals"""
+    if not tag_id_list:
+        return
+    dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        dialect_insert(_totals).on_conflict_do_nothing(index_elements=["tag_id"]),
+        [{"tag_id": tag_id, "tasks": 0, "completed": 0, "overdue": 0} for tag_id in tag_id_list],
+    )
+
+
+async def _ensure_rows(db, keys) -> Dict[Tuple[int, str], str]:
+    """Создает недостающие строки tag_counts; возвращает as_of каждой пары"""
+    as_of = await _load_as_of(db, keys)
+    missing = [key for key in keys if key not in as_of]
+    if missing:
+        as_of_now = now_key()
+        dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+        await db.execute(
+            dialect_insert(_counts).on_conflict_do_nothing(index_elements=["tag_id", "user_id"]),
+            [
+                # Новая пара без задач: overdue = 0 верен на текущий момент
+                {"tag_id": tag_id, "user_id": user_id, "tasks": 0, "completed": 0, "overdue": 0, "as_of": as_of_now}
+                for tag_id, user_id in missing
+            ],
+        )
+        as_of.update(await _load_as_of(db, missing))
+    return as_of
+
+
+async def _load_as_of(db, keys) -> Dict[Tuple[int, str], str]:
+    result = {}
+    for part in chunked(list(keys)):
+        rows = await db.execute(
+            select(TagCount.tag_id, TagCount.user_id, TagCount.as_of)
+            .where(tuple_(TagCount.tag_id, TagCount.user_id).in_(part))
+        )
+        result.update({(tag_id, user_id): value for tag_id, user_id, value in rows})
+    return result
+
+
+async def delete_user_counts(db, user_id: str) -> None:
+    """Удаляет счетчики пользователя (строки с tasks = 0 остаются после удаления задач)"""
+    await db.execute(_counts.delete().where(_counts.c.user_id == user_id))
+
+
+def _deadline_column():
+    """Срок задачи в SQL - то же, что deadline_key (для открытых задач в режиме дней)"""
+    return cast(TaskDB.end_date, String) + " " + func.coalesce(TaskDB.end_time, DEFAULT_END_TIME)
+
+
+async def refresh_overdue(db, user_id: Optional[str] = None, now: Optional[str] = None) -> int:
+    """Пересчитывает overdue у пар, чей next_deadline уже прошел. Возвращает их число"""
+    now = now or now_key()
+    query = select(TagCount.tag_id, TagCount.user_id).where(TagCount.next_deadline < now)
+    if user_id is not None:
+        query = query.where(TagCount.user_id == user_id)
+    # Один порядок строк у всех воркеров: параллельные пересчеты не ждут друг друга по кругу
+    stale = (await db.execute(query.order_by(TagCount.tag_id, TagCount.user_id))).all()
+    if not stale:
+        return 0
+    deadline = _deadline_column()
+    rows = []
+    for tag_id, owner in stale:
+        overdue, next_deadline = (await db.execute(
+            select(
+                func.count(case((deadline < now, 1))),
+                func.min(case((deadline >= now, deadline))),
+            ).where(
+                TaskDB.user_id == owner,
+                TaskDB.tag_id == tag_id,
+                TaskDB.completed == False,  # noqa: E712
+                TaskDB.duration_type == "days",
+                TaskDB.end_date.is_not(None),
+            )
+        )).one()
+        rows.append({
+            "b_tag_id": tag_id, "b_user_id": owner,
+            "overdue": overdue or 0, "next_deadline": next_deadline, "as_of": now,
+        })
+    await db.execute(
+        update(_counts).where(_counts.c.tag_id == bindparam("b_tag_id"), _counts.c.user_id == bindparam("b_user_id")),
+        rows,
+    )
+    # overdue в tag_totals - сумма по владельцам: пересчитывается целиком, а не разницей,
+    # чтобы два одновременных пересчета не учли одну просрочку дважды.
+    # FOR UPDATE дожидается записей, которые меняют эти строки, и следующий запрос их видит
+    tag_id_list = sorted({tag_id for tag_id, _ in stale})
+    await db.execute(select(_totals.c.tag_id).where(_totals.c.tag_id.in_(tag_id_list)).with_for_update())
+    await db.execute(
+        update(_totals)
+        .where(_totals.c.tag_id.in_(tag_id_list))
+        .values(overdue=select(func.coalesce(func.sum(_counts.c.overdue), 0))
+                .where(_counts.c.tag_id == _totals.c.tag_id)
+                .scalar_subquery())
+    )
+    return len(rows)
+
+
+class OverdueRefresher:
+    """Фоновый пересчет просрочки: раз в interval секунд refresh_overdue по всем владельцам.
+
+    Выбирает только пары с прошедшим next_deadline (индекс ix_tag_counts_next_deadline),
+    так что тик без наступивших сроков - один запрос по индексу.
+    """
+
+    def __init__(self, interval: float = OVERDUE_REFRESH_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def tick(self) -> int:
+        async with AsyncSessionLocal() as db:
+            refreshed = await refresh_overdue(db)
+            if refreshed:
+                await db.commit()
+            return refreshed
+
+    async def _run(self) -> None:
+        # Первый тик - через interval, а не сразу: первое соединение пула движок открывает
+        # под блокировкой потока, и тик одновременно с первым запросом к API ее не поделит
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                refreshed = await self.tick()
+                if refreshed:
+                    logger.debug("overdue refreshed", extra={"pairs": refreshed})
+            except Exception:
+                logger.exception("overdue refresh failed")
+
+
+overdue_refresher = OverdueRefresher()
+
+
+async def list_tags(db, user_id: Optional[str] = None) -> List[dict]:
+    """Проекты со счетчиками: владельца или всех пользователей (user_id=None); частые первыми"""
+    if user_id is not None:
+        query = (
+            select(Tag.id, Tag.name, TagCount.tasks, TagCount.completed, TagCount.overdue)
+            .join(TagCount, TagCount.tag_id == Tag.id)
+            .where(TagCount.user_id == user_id, TagCount.tasks > 0)
+            .order_by(TagCount.tasks.desc(), Tag.name)
+        )
+    else:
+        query = (
+            select(Tag.id, Tag.name, TagTotal.tasks, TagTotal.completed, TagTotal.overdue)
+            .join(TagTotal, TagTotal.tag_id == Tag.id)
+            .where(TagTotal.tasks > 0)
+            .order_by(TagTotal.tasks.desc(), Tag.name)
+        )
+    rows = (await db.execute(query)).all()
+    return [
+        {"id": row.id, "tag": row.name, "tasks": row.tasks, "completed": row.completed, "overdue": row.overdue}
+        for row in rows
+    ]
+
+
+def rebuild_tag_counts(session) -> None:
+    """Пересчитывает tag_counts и tag_totals по задачам целиком (синхронная сессия: сиды, бенчмарки).
+
+    Из асинхронного кода: await db.run_sync(rebuild_tag_counts).
+    """
+    session.execute(_totals.delete())
+    session.execute(_counts.delete())
+    completed = func.sum(case((TaskDB.completed == True, 1), else_=0))  # noqa: E712
+    next_deadline = func.min(case((
+        and_(TaskDB.completed == False, TaskDB.duration_type == "days", TaskDB.end_date.is_not(None)),  # noqa: E712
+        _deadline_column(),
+    )))
+    session.execute(insert(_counts).from_select(
+        ["tag_id", "user_id", "tasks", "completed", "overdue", "next_deadline", "as_of"],
+        select(TaskDB.tag_id, TaskDB.user_id, func.count(TaskDB.id), completed, literal(0), next_deadline, literal(""))
+        .group_by(TaskDB.tag_id, TaskDB.user_id),
+    ))
+    session.execute(insert(_totals).from_select(
+        ["tag_id", "tasks", "completed", "overdue"],
+        select(_counts.c.tag_id, func.sum(_counts.c.tasks), func.sum(_counts.c.completed), func.sum(_counts.c.overdue))
+        .group_by(_counts.c.tag_id),
+    ))
@@ -0,0 +1,27 @@
+"""Общие фикстуры: приложение на временной SQLite базе"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# База создается до импорта main: database.py читает DATABASE_URL при импорте
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    os.chdir(BACKEND_DIR)  # alembic.ini и migrations ищутся от каталога backend
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/api/auth/login", data={"username": "admin@admin.ru", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,19 @@
+"""GET /api/tasks/stats"""
+
+
+def test_by_month_counts_both_period_modes(client, auth_headers):
+    client.post("/api/tasks", headers=auth_headers, json={
+        "name": "По месяцам", "tag": "Статистика", "duration_type": "months", "start_month": 12, "end_month": 1,
+    })
+    client.post("/api/tasks", headers=auth_headers, json={
+        "name": "По дням", "tag": "Статистика", "duration_type": "days",
+        "start_date": "2025-01-20", "end_date": "2025-02-05",
+    })
+
+    stats = client.get("/api/tasks/stats", headers=auth_headers).json()
+    by_month = {item["month"]: item["tasks"] for item in stats["by_month"]}
+
+    assert by_month[12] == 1
+    assert by_month[1] == 2
+    assert by_month[2] == 1
+    assert by_month[3] == 0
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Container,
   AppBar,
@@ -23,6 +23,8 @@ import Login from './components/Login';
 import UserManagement from './components/UserManagement';
 import Settings from './components/Settings';
 import axios from 'axios';
+import { clearSession, refreshAccessToken } from './session';
+import { COLUMNAR_TYPE, readTaskList } from './wire';
 
 const API_URL = 'http://localhost:8001/api';
 
@@ -40,13 +42,25 @@ axios.interceptors.request.use(
   }
 );
 
-// Interceptor для обработки ошибок авторизации
+// Interceptor для обработки ошибок авторизации: access-токен короткий,
+// поэтому на 401 сначала пробуем обновить его и повторить запрос
 axios.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      localStorage.removeItem('token');
-      localStorage.removeItem('user');
+  async (error) => {
+    const original = error.config;
+    const isTokenRequest = /\/auth\/(login|refresh|logout)/.test(original?.url || '');
+    if (error.response?.status === 401 && original && !original._retried && !isTokenRequest) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return axios(original);
+      } catch (refreshError) {
+        // refresh-токен истек или отозван - ниже выходим из системы
+      }
+    }
+    if (error.response?.status === 401 && !isTokenRequest) {
+      clearSession();
       window.location.reload();
     }
     return Promise.reject(error);
@@ -61,6 +75,10 @@ function App() {
   const [editingTask, setEditingTask] = useState(null);
   const [selectedUserId, setSelectedUserId] = useState(null); // Для супер-админа
   const [anchorEl, setAnchorEl] = useState(null);
+  // Открыт ли поток изменений задач: тогда после своих изменений список не перезагружаем
+  const streamOpenRef = useRef(false);
+  // Увеличивается, когда поток нужно открыть заново с обновленным токеном
+  const [streamGeneration, setStreamGeneration] = useState(0);
 
   useEffect(() => {
     const storedUser = localStorage.getItem('user');
@@ -96,6 +114,65 @@ function App() {
     }
   }, []);
 
+  // Лента изменений задач (SSE): применяем изменения к списку без полной перезагрузки
+  useEffect(() => {
+    if (!user || !localStorage.getItem('token')) {
+      return undefined;
+    }
+    let source = null;
+    let cancelled = false;
+    const upsertTask = (event) => {
+      const { task } = JSON.parse(event.data);
+      setTasks((prev) => {
+        const index = prev.findIndex((t) => t.id === task.id);
+        if (index === -1) {
+          return [...prev, task];
+        }
+        const next = [...prev];
+        next[index] = task;
+        return next;
+      });
+    };
+    const openStream = async () => {
+      // В URL EventSource уходит одноразовый билет, а не access-токен (URL попадает в логи)
+      const { data } = await axios.post(`${API_URL}/tasks/stream/ticket`);
+      if (cancelled) {
+        return;
+      }
+      const params = new URLSearchParams({ ticket: data.ticket });
+      if (selectedUserId) {
+        params.set('user_id', selectedUserId);
+      }
+      source = new EventSource(`${API_URL}/tasks/stream?${params.toString()}`);
+      source.addEventListener('ready', () => {
+        streamOpenRef.current = true;
+      });
+      source.addEventListener('created', upsertTask);
+      source.addEventListener('updated', upsertTask);
+      source.addEventListener('deleted', (event) => {
+        const { task_id: taskId } = JSON.parse(event.data);
+        setTasks((prev) => prev.filter((t) => t.id !== taskId));
+      });
+      // Сервер просит перезагрузить список (массовые изменения или переполнение буфера)
+      source.addEventListener('resync', () => fetchTasks(selectedUserId));
+      source.onerror = () => {
+        streamOpenRef.current = false;
+        // Билет одноразовый: переподключение с ним сервер отклоняет - открываем поток с новым билетом
+        if (source.readyState === EventSource.CLOSED) {
+          setStreamGeneration((generation) => generation + 1);
+        }
+      };
+    };
+    openStream().catch((error) => console.error('Error opening task stream:', error));
+    return () => {
+      cancelled = true;
+      streamOpenRef.current = false;
+      if (source) {
+        source.close();
+      }
+    };
+  }, [user, selectedUserId, streamGeneration]);
+
   const fetchUsers = async () => {
     try {
       const response = await axios.get(`${API_URL}/users`);
@@ -109,9 +186,13 @@ function App() {
     try {
       const params = userId ? { user_id: userId } : {};
       console.log('Fetching tasks with params:', params);
-      const response = await axios.get(`${API_URL}/tasks`, { params });
-      console.log('Tasks fetched:', response.data.length, 'tasks');
-      setTasks(response.data);
+      const response = await axios.get(`${API_URL}/tasks`, {
+        params,
+        headers: { Accept: `${COLUMNAR_TYPE}, application/json;q=0.9` },
+      });
+      const fetched = readTaskList(response);
+      console.log('Tasks fetched:', fetched.length, 'tasks');
+      setTasks(fetched);
     } catch (error) {
       console.error('Error fetching tasks:', error);
       if (error.response?.status === 401) {
@@ -131,8 +212,17 @@ function App() {
   };
 
   const handleLogout = () => {
-    localStorage.removeItem('token');
-    localStorage.removeItem('user');
+    const token = localStorage.getItem('token');
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (token) {
+      // Отзываем токены на сервере; ответ не ждем
+      axios.post(
+        `${API_URL}/auth/logout`,
+        refreshToken ? { refresh_token: refreshToken } : undefined,
+        { headers: { Authorization: `Bearer ${token}` } }
+      ).catch(() => {});
+    }
+    clearSession();
     setUser(null);
     setTasks([]);
     setTabValue(0);
@@ -142,8 +232,10 @@ function App() {
     // После создания задачи обновляем список задач для текущего выбранного пользователя
     console.log('handleTaskCreated called, selectedUserId:', selectedUserId, 'user?.id:', user?.id);
     const userIdToFetch = selectedUserId || user?.id;
-    console.log('Fetching tasks for userId:', userIdToFetch);
-    fetchTasks(userIdToFetch);
+    if (!streamOpenRef.current) {
+      console.log('Fetching tasks for userId:', userIdToFetch);
+      fetchTasks(userIdToFetch);
+    }
     setEditingTask(null);
   };
 
@@ -410,14 +502,19 @@ function App() {
         {tabValue === 2 && (
           <GanttChart 
             tasks={tasks} 
-            onTasksUpdate={() => fetchTasks(selectedUserId || user?.id)}
+            userId={selectedUserId}
+            onTasksUpdate={() => {
+              if (!streamOpenRef.current) {
+                fetchTasks(selectedUserId || user?.id);
+              }
+            }}
             onEditTask={handleEditTask}
           />
         )}
 
         {/* Календарный вид */}
         {tabValue === 3 && (
-          <CalendarView tasks={tasks} />
+          <CalendarView tasks={tasks} userId={selectedUserId} />
         )}
 
         {/* Управление пользователями (только для супер-админа) */}
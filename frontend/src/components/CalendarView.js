@@ -1,4 +1,4 @@
-import React, { useState, useMemo, useRef } from 'react';
+import React, { useState, useMemo, useRef, useEffect } from 'react';
 import {
   Box,
   Card,
@@ -18,6 +18,10 @@ import {
 } from '@mui/icons-material';
 import jsPDF from 'jspdf';
 import html2canvas from 'html2canvas';
+import axios from 'axios';
+import { useAvailableMonths } from '../months';
+
+const API_URL = 'http://localhost:8001/api';
 
 const monthNames = {
   1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
@@ -43,10 +47,52 @@ const generateTaskColors = (tasks) => {
   return taskColorMap;
 };
 
-function CalendarView({ tasks }) {
+// Дата в формате YYYY-MM-DD по локальному времени (toISOString сдвигает дату в UTC)
+const formatLocalDate = (date) => {
+  const month = String(date.getMonth() + 1).padStart(2, '0');
+  const day = String(date.getDate()).padStart(2, '0');
+  return `${date.getFullYear()}-${month}-${day}`;
+};
+
+function CalendarView({ tasks: allTasks, userId }) {
   const [currentDate, setCurrentDate] = useState(new Date());
+  const [monthTasks, setMonthTasks] = useState(null);
+  const AVAILABLE_MONTHS = useAvailableMonths();
   const calendarRef = useRef(null);
 
+  // Загружаем только задачи, пересекающиеся с отображаемым месяцем.
+  // allTasks в зависимостях: список в App обновился - перезапрашиваем окно
+  useEffect(() => {
+    let cancelled = false;
+    const year = currentDate.getFullYear();
+    const month = currentDate.getMonth();
+    const params = {
+      from: formatLocalDate(new Date(year, month, 1)),
+      to: formatLocalDate(new Date(year, month + 1, 0)),
+    };
+    if (userId) {
+      params.user_id = userId;
+    }
+    axios.get(`${API_URL}/tasks/calendar`, { params })
+      .then(response => {
+        if (!cancelled) {
+          setMonthTasks(response.data);
+        }
+      })
+      .catch(error => {
+        console.error('Error fetching calendar tasks:', error);
+        if (!cancelled) {
+          setMonthTasks(null);
+        }
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [currentDate, userId, allTasks]);
+
+  // Пока окно не загружено (или запрос не удался) - показываем полный список
+  const tasks = monthTasks ?? allTasks;
+
   // Генерируем цвета для задач
   const taskColors = useMemo(() => generateTaskColors(tasks), [tasks]);
 
@@ -80,8 +126,6 @@ function CalendarView({ tasks }) {
         }
       } else if (task.duration_type === 'months' && task.start_month && task.end_month) {
         // Для режима месяцев - показываем каждый день месяца
-        const AVAILABLE_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7];
-        
         const startMonth = task.start_month;
         const endMonth = task.end_month;
         const startIdx = AVAILABLE_MONTHS.indexOf(startMonth);
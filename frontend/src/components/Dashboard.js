@@ -20,6 +20,7 @@ import {
   Schedule as ScheduleIcon,
   Lightbulb as LightbulbIcon
 } from '@mui/icons-material';
+import { useAvailableMonths } from '../months';
 
 const monthNames = {
   1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
@@ -27,9 +28,9 @@ const monthNames = {
   9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
 };
 
-const AVAILABLE_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7];
-
 function Dashboard({ tasks }) {
+  const AVAILABLE_MONTHS = useAvailableMonths();
+
   // Общая статистика
   const totalTasks = tasks.length;
   const totalSubtasks = tasks.reduce((sum, task) => sum + (task.subtasks?.length || 0), 0);
@@ -31,11 +31,13 @@ import CheckCircleIcon from '@mui/icons-material/CheckCircle';
 import axios from 'axios';
 import jsPDF from 'jspdf';
 import html2canvas from 'html2canvas';
+import { useAvailableMonths, maskHasSlot } from '../months';
+import { useTags } from '../tags';
 
 const API_URL = 'http://localhost:8001/api';
-
-// Доступные месяцы в порядке отображения
-const AVAILABLE_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7]; // Декабрь, Январь, Февраль, Март, Апрель, Май, Июнь, Июль
+// Сколько задач запрашивать из поиска и пауза в наборе перед запросом
+const SEARCH_LIMIT = 200;
+const SEARCH_DEBOUNCE_MS = 250;
 
 const monthNames = {
   1: 'Янв', 2: 'Фев', 3: 'Мар', 4: 'Апр',
@@ -49,24 +51,101 @@ const monthNamesFull = {
   9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
 };
 
-function GanttChart({ tasks, onTasksUpdate, onEditTask }) {
+function GanttChart({ tasks, userId, onTasksUpdate, onEditTask }) {
+  // Доступные месяцы в порядке отображения (окно задается на сервере)
+  const AVAILABLE_MONTHS = useAvailableMonths();
   const ganttRef = useRef(null);
   const [filterProject, setFilterProject] = useState('');
   const [searchQuery, setSearchQuery] = useState('');
+  // id задач, найденных сервером по searchQuery (null - поиск не выполнялся)
+  const [searchMatches, setSearchMatches] = useState(null);
+  // Раскладка с сервера: id задачи/подзадачи -> { mask, fill }
+  const [layoutRows, setLayoutRows] = useState({});
+  // Окно месяцев для зависимостей эффекта: массив может создаваться заново
+  const monthsKey = AVAILABLE_MONTHS.join(',');
+
+  // Поиск выполняет сервер (GET /api/tasks/search, полнотекстовый индекс): он находит
+  // задачи и по названиям подзадач и проектам. Запрос уходит после паузы в наборе
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchMatches(null);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      const params = { q: query, limit: SEARCH_LIMIT };
+      if (userId) params.user_id = userId;
+      axios.get(`${API_URL}/tasks/search`, { params })
+        .then(response => {
+          if (!cancelled) setSearchMatches(new Set(response.data.map(task => task.id)));
+        })
+        .catch(error => {
+          console.error('Error searching tasks:', error);
+          if (!cancelled) setSearchMatches(null);
+        });
+    }, SEARCH_DEBOUNCE_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, userId, tasks]);
+
+  // Ширину полос считает сервер (GET /api/tasks/layout, кэш по версии задач).
+  // Раскладка запрашивается только при смене окна месяцев или фильтров, а не при
+  // каждом обновлении списка: столбцы берутся из month_mask задачи, а fill строки
+  // используется, пока ее маска совпадает с маской задачи
+  useEffect(() => {
+    let cancelled = false;
+    const params = {};
+    if (userId) params.user_id = userId;
+    if (filterProject) params.tag = filterProject;
+    axios.get(`${API_URL}/tasks/layout`, { params })
+      .then(response => {
+        if (cancelled) return;
+        const { rows } = response.data;
+        const byId = {};
+        rows.id.forEach((id, i) => {
+          let mask = 0;
+          rows.spans[i].forEach(([start, end]) => {
+            for (let col = start; col <= end; col++) mask |= 1 << col;
+          });
+          byId[id] = { mask, fill: rows.fill[i] };
+        });
+        setLayoutRows(byId);
+      })
+      .catch(error => {
+        console.error('Error fetching gantt layout:', error);
+        if (!cancelled) setLayoutRows({});
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [userId, filterProject, monthsKey]);
+
+  // Доля столбца под полосой: из раскладки, если строка в ней не устарела
+  const barFill = (id, mask) => {
+    const laidOut = layoutRows[id];
+    return laidOut && laidOut.mask === (mask || 0) ? laidOut.fill : 1;
+  };
   
   // Логирование для отладки
   useEffect(() => {
     console.log('GanttChart received tasks:', tasks.length, tasks);
   }, [tasks]);
   
-  // Получаем список уникальных проектов
-  const uniqueProjects = [...new Set(tasks.map(task => task.tag).filter(Boolean))].sort();
+  // Проекты для фильтра - со счетчиками с сервера, обновляются вместе со списком задач
+  const projectTags = useTags(userId, tasks);
+  const uniqueProjects = projectTags.map(tag => tag.tag).sort();
+  const projectCounts = Object.fromEntries(projectTags.map(tag => [tag.tag, tag]));
   
   // Фильтруем задачи по проекту и поисковому запросу
   const filteredTasks = tasks.filter(task => {
     const matchesProject = !filterProject || task.tag === filterProject;
-    const matchesSearch = !searchQuery || 
-      task.name.toLowerCase().includes(searchQuery.toLowerCase());
+    // Пока нет ответа сервера, фильтруем по названию локально
+    const matchesSearch = !searchQuery.trim() || (searchMatches
+      ? searchMatches.has(task.id)
+      : task.name.toLowerCase().includes(searchQuery.toLowerCase()));
     return matchesProject && matchesSearch;
   });
   
@@ -75,26 +154,6 @@ function GanttChart({ tasks, onTasksUpdate, onEditTask }) {
     console.log('Filtered tasks:', filteredTasks.length, filteredTasks);
   }, [filteredTasks]);
 
-  const isMonthInRange = (checkMonth, startMonth, endMonth) => {
-    // Проверяем, находится ли месяц в диапазоне (с учетом циклического порядка)
-    const startIdx = AVAILABLE_MONTHS.indexOf(startMonth);
-    const endIdx = AVAILABLE_MONTHS.indexOf(endMonth);
-    const checkIdx = AVAILABLE_MONTHS.indexOf(checkMonth);
-    
-    if (startIdx === -1 || endIdx === -1 || checkIdx === -1) {
-      return false;
-    }
-    
-    // Если диапазон не переходит через конец списка
-    if (startIdx <= endIdx) {
-      return startIdx <= checkIdx && checkIdx <= endIdx;
-    }
-    // Если диапазон переходит через конец списка (например, декабрь -> январь)
-    else {
-      return checkIdx >= startIdx || checkIdx <= endIdx;
-    }
-  };
-
   const handleExportPDF = async () => {
     if (!ganttRef.current) return;
 
@@ -230,52 +289,23 @@ function GanttChart({ tasks, onTasksUpdate, onEditTask }) {
 
   const handleExportCSV = async () => {
     try {
-      const response = await axios.get(`${API_URL}/tasks/export/csv`);
-      let content = response.data.csv;
-      const format = response.data.format || 'csv';
-      
-      let blob;
-      let filename;
-      let mimeType;
-      
-      if (format === 'html') {
-        // Создаем HTML файл, который Excel может открыть с форматированием
-        const htmlDoc = `<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="UTF-8">
-  <title>Задачи Gantt</title>
-  <style>
-    table { border-collapse: collapse; width: 100%; }
-    th, td { border: 1px solid #000; padding: 5px; text-align: left; }
-    th { background-color: #f0f0f0; font-weight: bold; }
-    .subtask { font-weight: 300; }
-  </style>
-</head>
-<body>
-${content}
-</body>
-</html>`;
-        blob = new Blob([htmlDoc], { type: 'text/html;charset=utf-8;' });
-        filename = 'tasks.html';
-        mimeType = 'text/html';
-      } else {
-        // Стандартный CSV
-        const BOM = '\uFEFF';
-        content = BOM + content;
-        blob = new Blob([content], { type: 'text/csv;charset=utf-8;' });
-        filename = 'tasks.csv';
-        mimeType = 'text/csv';
-      }
+      // Сервер отдает готовый HTML документ потоком - Excel откроет его с форматированием
+      const format = 'html';
+      const response = await axios.get(`${API_URL}/tasks/export`, {
+        params: { format },
+        responseType: 'blob',
+      });
+      const filename = `tasks.${format}`;
       
       const link = document.createElement('a');
-      const url = URL.createObjectURL(blob);
+      const url = URL.createObjectURL(response.data);
       link.setAttribute('href', url);
       link.setAttribute('download', filename);
       link.style.visibility = 'hidden';
       document.body.appendChild(link);
       link.click();
       document.body.removeChild(link);
+      URL.revokeObjectURL(url);
       
       if (format === 'html') {
         alert('Файл сохранен в формате HTML. Откройте его в Excel для просмотра с форматированием (основные задачи будут жирными).');
@@ -423,7 +453,8 @@ ${content}
                   </MenuItem>
                   {uniqueProjects.map(project => (
                     <MenuItem key={project} value={project}>
-                      {project}
+                      {project} ({projectCounts[project].completed}/{projectCounts[project].tasks}
+                      {projectCounts[project].overdue > 0 && `, просрочено: ${projectCounts[project].overdue}`})
                     </MenuItem>
                   ))}
                 </Select>
@@ -508,31 +539,6 @@ ${content}
                 </TableRow>
               ) : (
                 filteredTasks.map((task) => {
-                  // Получаем значения из задачи с fallback значениями
-                  // Определяем месяцы для отображения
-                  let startMonth, endMonth;
-                  if (task.duration_type === 'days' && task.start_date && task.end_date) {
-                    // Для задач по дням конвертируем даты в месяцы
-                    const startDate = new Date(task.start_date);
-                    const endDate = new Date(task.end_date);
-                    startMonth = startDate.getMonth() + 1; // getMonth() возвращает 0-11
-                    endMonth = endDate.getMonth() + 1;
-                    
-                      // Проверяем, что месяцы входят в AVAILABLE_MONTHS, иначе используем ближайшие
-                    if (!AVAILABLE_MONTHS.includes(startMonth)) {
-                      // Находим ближайший доступный месяц
-                      const sortedMonths = [...AVAILABLE_MONTHS].sort((a, b) => a - b);
-                      startMonth = sortedMonths.find(m => m >= startMonth) || sortedMonths[0];
-                    }
-                    if (!AVAILABLE_MONTHS.includes(endMonth)) {
-                      const sortedMonths = [...AVAILABLE_MONTHS].sort((a, b) => a - b);
-                      endMonth = sortedMonths.reverse().find(m => m <= endMonth) || sortedMonths[0];
-                    }
-                  } else {
-                    // Для задач по месяцам используем существующие поля
-                    startMonth = (task.start_month !== undefined && task.start_month !== null) ? task.start_month : AVAILABLE_MONTHS[0];
-                    endMonth = (task.end_month !== undefined && task.end_month !== null) ? task.end_month : AVAILABLE_MONTHS[0];
-                  }
                   const isCompleted = task.completed || false;
                   
                   return (
@@ -563,25 +569,12 @@ ${content}
                           />
                         </TableCell>
                         {AVAILABLE_MONTHS.map((month, idx) => {
-                          const isInRange = isMonthInRange(month, startMonth, endMonth);
-                          if (!isInRange) {
+                          if (!maskHasSlot(task.month_mask || 0, idx)) {
                             return <TableCell key={`${month}-${idx}`} align="center" />;
                           }
                           
-                          // Для задач по дням вычисляем ширину полоски
-                          let barWidth = '100%';
-                          if (task.duration_type === 'days' && task.start_date && task.end_date) {
-                            const startDate = new Date(task.start_date);
-                            const endDate = new Date(task.end_date);
-                            const daysDiff = Math.ceil((endDate - startDate) / (1000 * 60 * 60 * 24)) + 1;
-                            const daysInMonth = new Date(startDate.getFullYear(), startDate.getMonth() + 1, 0).getDate();
-                            
-                            // Если задача в одном месяце и меньше месяца, делаем полоску пропорционально
-                            if (startMonth === endMonth && daysDiff < daysInMonth) {
-                              barWidth = `${(daysDiff / daysInMonth) * 100}%`;
-                            }
-                          }
-                          
+                          const barWidth = `${barFill(task.id, task.month_mask) * 100}%`;
+
                           return (
                             <TableCell key={`${month}-${idx}`} align="center">
                               <Box
@@ -640,18 +633,9 @@ ${content}
                         </TableCell>
                       </TableRow>
                       {task.subtasks?.map((subtask) => {
-                        // Подзадачи наследуют даты от основной задачи, но могут иметь свои
-                        // Для подзадач используем те же месяцы, что и у родительской задачи
-                        let stStartMonth, stEndMonth;
-                        if (task.duration_type === 'days' && task.start_date && task.end_date) {
-                          // Подзадачи наследуют месяцы от родительской задачи
-                          stStartMonth = startMonth;
-                          stEndMonth = endMonth;
-                        } else {
-                          stStartMonth = subtask.start_month !== undefined && subtask.start_month !== null ? subtask.start_month : startMonth;
-                          stEndMonth = subtask.end_month !== undefined && subtask.end_month !== null ? subtask.end_month : endMonth;
-                        }
-                        
+                        // Подзадача без своего периода рисуется по периоду задачи
+                        const subtaskMask = subtask.month_mask ?? task.month_mask ?? 0;
+
                         return (
                           <TableRow 
                             key={subtask.id}
@@ -666,7 +650,7 @@ ${content}
                             <TableCell />
                             {AVAILABLE_MONTHS.map((month, idx) => (
                               <TableCell key={`${month}-${idx}`} align="center">
-                                {isMonthInRange(month, stStartMonth, stEndMonth) && (
+                                {maskHasSlot(subtaskMask, idx) && (
                                   <Box
                                     sx={{
                                       width: '100%',
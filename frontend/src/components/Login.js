@@ -9,6 +9,7 @@ import {
   Alert
 } from '@mui/material';
 import LoginIcon from '@mui/icons-material/Login';
+import { storeTokens } from '../session';
 
 const API_URL = 'http://localhost:8001/api';
 
@@ -52,7 +53,7 @@ function Login({ onLogin }) {
       }
 
       const data = await response.json();
-      localStorage.setItem('token', data.access_token);
+      storeTokens(data);
       
       // Получаем информацию о пользователе
       const userResponse = await fetch(`${API_URL}/auth/me`, {
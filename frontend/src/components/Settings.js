@@ -10,6 +10,7 @@ import {
 } from '@mui/material';
 import SettingsIcon from '@mui/icons-material/Settings';
 import axios from 'axios';
+import { storeTokens } from '../session';
 
 const API_URL = 'http://localhost:8001/api';
 
@@ -51,7 +52,8 @@ function Settings({ currentUser, onUpdate }) {
         updateData.new_password = formData.new_password;
       }
 
-      await axios.put(
+      // Сервер отзывает прежние токены и возвращает новую пару
+      const tokenResponse = await axios.put(
         `${API_URL}/auth/update-credentials`,
         updateData,
         {
@@ -59,6 +61,7 @@ function Settings({ currentUser, onUpdate }) {
         }
       );
 
+      storeTokens(tokenResponse.data);
       setSuccess('Данные успешно обновлены');
       
       // Обновляем информацию о пользователе
@@ -20,12 +20,11 @@ import AddIcon from '@mui/icons-material/Add';
 import DeleteIcon from '@mui/icons-material/Delete';
 import CreateIcon from '@mui/icons-material/Create';
 import axios from 'axios';
+import { useAvailableMonths } from '../months';
+import { useTags } from '../tags';
 
 const API_URL = 'http://localhost:8001/api';
 
-// Доступные месяцы в порядке отображения
-const AVAILABLE_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7]; // Декабрь, Январь, Февраль, Март, Апрель, Май, Июнь, Июль
-
 const monthNames = {
   1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
   5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
@@ -33,13 +32,16 @@ const monthNames = {
 };
 
 function TaskForm({ onTaskCreated, editingTask, onCancelEdit, allTasks = [] }) {
+  // Доступные месяцы в порядке отображения (окно задается на сервере)
+  const AVAILABLE_MONTHS = useAvailableMonths();
   const isEditing = !!editingTask;
   
-  // Получаем список проектов из существующих задач и localStorage
+  // Проекты с сервера (GET /api/tags) и из localStorage
+  const projectTags = useTags(null, allTasks);
   const getAvailableProjects = () => {
-    const fromTasks = [...new Set(allTasks.map(task => task.tag).filter(Boolean))];
+    const fromServer = projectTags.map(project => project.tag);
     const fromStorage = JSON.parse(localStorage.getItem('projects') || '[]');
-    const combined = [...new Set([...fromTasks, ...fromStorage])];
+    const combined = [...new Set([...fromServer, ...fromStorage])];
     return combined.sort();
   };
   
@@ -88,10 +90,10 @@ function TaskForm({ onTaskCreated, editingTask, onCancelEdit, allTasks = [] }) {
     }
   }, [editingTask]);
 
-  // Обновляем список проектов при изменении задач
+  // Обновляем список проектов, когда пришел ответ сервера
   useEffect(() => {
     setAvailableProjects(getAvailableProjects());
-  }, [allTasks]);
+  }, [projectTags]);
 
   const handleAddSubtask = () => {
     setSubtasks([...subtasks, { name: '' }]);
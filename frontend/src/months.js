@@ -0,0 +1,51 @@
+import { useEffect, useState } from 'react';
+import axios from 'axios';
+
+const API_URL = 'http://localhost:8001/api';
+
+// Окно по умолчанию, пока не пришел ответ сервера (GANTT_MONTHS на бэкенде)
+export const DEFAULT_MONTHS = [12, 1, 2, 3, 4, 5, 6, 7]; // Декабрь, Январь, Февраль, Март, Апрель, Май, Июнь, Июль
+
+let cachedMonths = null;
+let monthsRequest = null;
+
+// Окно месяцев запрашивается один раз на всё приложение
+const loadMonths = () => {
+  if (!monthsRequest) {
+    monthsRequest = axios.get(`${API_URL}/months`)
+      .then(response => {
+        cachedMonths = response.data.months;
+        return cachedMonths;
+      })
+      .catch(error => {
+        console.error('Error fetching month window:', error);
+        monthsRequest = null;
+        return DEFAULT_MONTHS;
+      });
+  }
+  return monthsRequest;
+};
+
+// Доступные месяцы в порядке отображения: бит i в month_mask задачи - месяц months[i]
+export const useAvailableMonths = () => {
+  const [months, setMonths] = useState(cachedMonths || DEFAULT_MONTHS);
+
+  useEffect(() => {
+    let cancelled = false;
+    if (!cachedMonths) {
+      loadMonths().then(loaded => {
+        if (!cancelled) {
+          setMonths(loaded);
+        }
+      });
+    }
+    return () => {
+      cancelled = true;
+    };
+  }, []);
+
+  return months;
+};
+
+// Занимает ли маска слот idx
+export const maskHasSlot = (mask, idx) => ((mask >> idx) & 1) === 1;
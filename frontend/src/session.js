@@ -0,0 +1,37 @@
+import axios from 'axios';
+
+const API_URL = 'http://localhost:8001/api';
+
+// Сохраняет пару токенов из ответа /auth/login, /auth/refresh или /auth/update-credentials
+export const storeTokens = (data) => {
+  localStorage.setItem('token', data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  }
+};
+
+export const clearSession = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user');
+};
+
+// Обмен refresh-токена на новую пару; параллельные 401 ждут один общий запрос
+let refreshRequest = null;
+export const refreshAccessToken = () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    return Promise.reject(new Error('No refresh token'));
+  }
+  if (!refreshRequest) {
+    refreshRequest = axios.post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        storeTokens(response.data);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshRequest = null;
+      });
+  }
+  return refreshRequest;
+};
@@ -0,0 +1,28 @@
+import { useEffect, useState } from 'react';
+import axios from 'axios';
+
+const API_URL = 'http://localhost:8001/api';
+
+// Проекты со счетчиками задач: [{ id, tag, tasks, completed, overdue }].
+// Сервер хранит счетчики готовыми (GET /api/tags) - список не собирается перебором задач.
+// refreshKey - значение, при смене которого список запрашивается заново (например, задачи)
+export const useTags = (userId, refreshKey) => {
+  const [tags, setTags] = useState([]);
+
+  useEffect(() => {
+    let cancelled = false;
+    const params = userId ? { user_id: userId } : {};
+    axios.get(`${API_URL}/tags`, { params })
+      .then(response => {
+        if (!cancelled) setTags(response.data);
+      })
+      .catch(error => {
+        console.error('Error fetching tags:', error);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [userId, refreshKey]);
+
+  return tags;
+};
@@ -0,0 +1,37 @@
+// Колоночный формат списка задач (Accept: application/vnd.gantt.columnar+json):
+// имена полей приходят один раз, значения - столбцами. Для больших досок ответ
+// заметно меньше обычного JSON; сервер отдает JSON, если формат не поддерживает.
+export const COLUMNAR_TYPE = 'application/vnd.gantt.columnar+json';
+
+// { count, tasks: { поле: [...] }, subtasks: { task: [номер задачи], поле: [...] } } -> [задача]
+export const fromColumnar = ({ count, tasks, subtasks }) => {
+  const fields = Object.keys(tasks);
+  const result = [];
+  for (let i = 0; i < count; i++) {
+    const task = {};
+    fields.forEach(field => {
+      task[field] = tasks[field][i];
+    });
+    if (subtasks) {
+      task.subtasks = [];
+    }
+    result.push(task);
+  }
+  if (subtasks) {
+    const subtaskFields = Object.keys(subtasks).filter(field => field !== 'task');
+    subtasks.task.forEach((index, row) => {
+      const subtask = {};
+      subtaskFields.forEach(field => {
+        subtask[field] = subtasks[field][row];
+      });
+      result[index].subtasks.push(subtask);
+    });
+  }
+  return result;
+};
+
+// Тело ответа со списком задач в обычном виде, в каком бы формате оно ни пришло
+export const readTaskList = (response) => {
+  const contentType = response.headers['content-type'] || '';
+  return contentType.startsWith(COLUMNAR_TYPE) ? fromColumnar(response.data) : response.data;
+};